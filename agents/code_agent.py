@@ -2,18 +2,19 @@ from crewai import Agent, Task
 
 class CodeAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Senior Software Developer',
             goal='Implement high-quality, maintainable code based on specifications',
             backstory="""You are an experienced software developer specializing in 
             writing clean, efficient code. You excel at translating technical 
             specifications into working implementations while following best practices.""",
+            llm=llm,
             verbose=True
         )
 
     @staticmethod
-    def create_task(agent, project_spec, idl_spec, output_file=None):
+    def create_task(agent, project_spec, idl_spec, output_file=None, project_files=None):
         if output_file is None:
             output_file = 'src/app.py'
 
@@ -24,6 +25,7 @@ class CodeAgent:
             
             IDL specification
             {idl_spec}
+            {CodeAgent._describe_project_files(project_files)}
 
             Ensure the implementation:
             0. Is written in the specified language
@@ -41,4 +43,47 @@ class CodeAgent:
             - Implementation of all required functionality
             - The output is in plain text with no markdown formatting""",
             output_file=output_file
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def create_file_task(agent, project_spec, idl_spec, file_path, file_description, project_files=None,
+                         output_file=None):
+        """Create a task that generates a single file of a multi-file project."""
+        if output_file is None:
+            output_file = file_path
+
+        return Task(
+            description=f"""Based on the following IDL specification and project specification, write the file {file_path}:
+            Project Spec:
+            {project_spec}
+
+            IDL specification
+            {idl_spec}
+
+            The file {file_path} {file_description}
+            {CodeAgent._describe_project_files(project_files)}
+
+            Ensure the file:
+            0. Is written in the language its name and description call for
+            1. Only contains the part of the project that belongs in {file_path}
+            2. Imports what it needs from the other project files by their paths
+            3. Includes proper error handling
+            4. Is well-documented
+            5. Follows proper style guidelines""",
+            agent=agent,
+            expected_output=f"""The complete contents of {file_path}:
+            - Consistent with the IDL and the other project files
+            - Proper error handling mechanisms
+            - The output is in plain text with no markdown formatting""",
+            output_file=output_file
+        )
+
+    @staticmethod
+    def _describe_project_files(project_files):
+        """List the files of the project so each task knows what the others generate."""
+        if not project_files:
+            return ""
+        lines = "\n".join(f"            - {path}: {description}" for path, description in project_files.items())
+        return f"""
+            Project files (each file is generated separately):
+{lines}"""
@@ -2,7 +2,7 @@ from crewai import Agent, Task
 
 class DocsAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Technical Writer',
             goal='Create application documentation',
@@ -10,6 +10,7 @@ class DocsAgent:
             documentation for any software project using command-line tools. You excel at explaining any
             concepts and software usage clearly.""",
             tools=[],
+            llm=llm,
             verbose=True
         )
 
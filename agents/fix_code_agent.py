@@ -3,13 +3,14 @@ from crewai import Agent, Task
 
 class FixCodeAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Code Improvement Specialist',
             goal='Analyze code review feedback and implement necessary code changes',
             backstory="""You are an expert software engineer specializing in code refactoring 
             and improvement. You can take detailed review feedback or an error dump and you
             make fixes to the errors, and fixes according to the feedback.""",
+            llm=llm,
             verbose=True
         )
 
@@ -45,4 +46,39 @@ class FixCodeAgent:
             - Added or enhanced documentation
             - Plain text output without markdown formatting""",
             output_file=implementation_file
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def create_patch_task(agent, code, review_feedback, implementation_file=None):
+        if implementation_file is None:
+            implementation_file = 'src/app.py'
+
+        # No output file: the workflow applies the returned edits to the current code itself
+        return Task(
+            description=f"""Analyze the following code from {implementation_file} and the review feedback,
+            then describe the necessary improvements as search/replace edits:
+
+            Original Code:
+            {code}
+
+            Review Feedback:
+            {review_feedback}
+
+            Your task is to:
+            1. Carefully read and understand the review feedback
+            2. Identify the specific lines that need to change
+            3. Output one block per change, in this exact format:
+            <<<<<<< SEARCH
+            lines copied exactly from the original code, including indentation
+            =======
+            the lines that replace them
+            >>>>>>> REPLACE
+            4. Make every SEARCH text long enough to match exactly one place in the code
+            5. Ensure the core functionality remains intact
+            6. Do not repeat code that does not change""",
+            agent=agent,
+            expected_output="""Only search/replace blocks that address all review feedback:
+            - Each SEARCH text copied exactly from the original code
+            - No unchanged code outside the blocks
+            - Plain text output without markdown formatting"""
+        )
@@ -4,13 +4,14 @@ from crewai.tools import BaseTool
 
 class IDLAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='IDL Specification Expert',
             goal='Convert project specifications into detailed Interface Definition Language',
             backstory="""You are an expert in creating Interface Definition Language (IDL) 
             specifications from project requirements. You excel at translating business 
             requirements into technical interfaces and data structures.""",
+            llm=llm,
             verbose=True
         )
 
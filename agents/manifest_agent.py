@@ -4,7 +4,7 @@ import json
 
 class ManifestAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Project Architect',
             goal='Determine project structure and file organization',
@@ -12,12 +12,16 @@ class ManifestAgent:
             requirements and determining optimal file structure. You excel at identifying 
             appropriate file names and organization based on project specifications.""",
             tools=[],
+            llm=llm,
             verbose=True
         )
 
     @staticmethod
-    def create_task(agent, project_spec):
+    def create_task(agent, project_spec, output_file=None):
         """Create a task for determining project file structure."""
+        if output_file is None:
+            output_file = 'src/manifest.json'
+
         return Task(
             description=f"Analyze the following project specification and determine appropriate file structure:{project_spec}"
                         "Your task is to process this specification and return a JSON string with file structure information that"  
@@ -44,81 +48,141 @@ class ManifestAgent:
                             " \"tests/game.test.js\":\"contains javascript\","                            
                             " }} The file-mapping will differ between languages and will identify what a language a "
                             "file contains",
-            output_file='src/manifest.json'
+            output_file=output_file
         )
 
     @staticmethod
-    def determine_language(spec):
-        """Analyze specification to determine primary programming language."""
-        spec = spec.lower() if isinstance(spec, str) else ""
-        language_patterns = {
-            'python': r'\b(python|flask|django|fastapi)\b',
-            'cpp': r'\b(c\+\+|cpp|gcc)\b',
-            'javascript': r'\b(javascript|node|express|react)\b',
-            'java': r'\b(java|spring|maven)\b',
-            'go': r'\b(go|golang)\b',
-        }
+    def create_repair_task(agent, manifest_output, error, output_file=None):
+        """Create a task for correcting a manifest that failed to parse or validate."""
+        return Task(
+            description=f"The following project manifest could not be used: {error}\n\n"
+                        f"Manifest:\n{manifest_output}\n\n"
+                        "Correct only what the error describes and keep everything else unchanged. "
+                        "Return only the JSON object, without markdown fences or any other text.",
+            agent=agent,
+            expected_output="A valid JSON object with the keys name, language, implementation_file, test_file, "
+                            "docs_file, interface_file, run_script and file-mapping",
+            output_file=output_file
+        )
 
-        for lang, pattern in language_patterns.items():
-            if re.search(pattern, spec):
-                return lang
-        return 'python'  # Note: Default to Python if no specific language is detected
+    # Local manifests at or above this confidence are used without asking the LLM
+    LOCAL_CONFIDENCE = 0.8
 
     @staticmethod
-    def get_file_names(language, spec):
-        """Generate appropriate file names based on language and specification."""
-        base_name = ManifestAgent._extract_base_name(spec)
+    def classify(spec):
+        """
+        Classifies the specification locally. Returns (language, framework, confidence):
+        a LANGUAGES key, the first framework mentioned or None, and a confidence between 0 and 1.
+        """
+        text = spec.lower() if isinstance(spec, str) else ""
+        scores, explicit, frameworks = {}, set(), {}
+        for language, entry in LANGUAGES.items():
+            score = 0
+            if entry['explicit'].search(text):
+                explicit.add(language)
+                score += 5
+            score += 2 * min(len(entry['names'].findall(text)), 3)
+            found = [match.group(0) for match in entry['frameworks'].finditer(text)] if entry['frameworks'] else []
+            score += min(len(found), 3)
+            if score:
+                scores[language] = score
+            if found:
+                frameworks[language] = found[0]
 
-        extensions = {
-            'python': {'impl': '.py', 'test': '_test.py', 'docs': '.md', 'interface': '.idl'},
-            'cpp': {'impl': '.cpp', 'test': '_test.cpp', 'docs': '.md', 'interface': '.idl'},
-            'javascript': {'impl': '.js', 'test': '.test.js', 'docs': '.md', 'interface': '.idl'},
-            'java': {'impl': '.java', 'test': 'Test.java', 'docs': '.md', 'interface': '.idl'},
-            'go': {'impl': '.go', 'test': '.test.go', 'docs': '.md', 'interface': '.idl'},
-        }
+        # A page with scripts is a web project rather than plain JavaScript
+        if 'web' in scores and 'javascript' in scores:
+            scores['web'] += scores.pop('javascript')
+            explicit.discard('javascript')
+            frameworks.setdefault('web', frameworks.get('javascript'))
 
-        ext = extensions.get(language, extensions['python'])
-
-        file_structure = {}
-        if language is not None and language == "python":
-            file_structure = {
-                'language': language,
-                'implementation_file': f"src/{base_name}{ext['impl']}",
-                'test_file': f"tests/{base_name}{ext['test']}",
-                'docs_file': f"docs/README{ext['docs']}",
-                'interface_file': f"src/{base_name}{ext['interface']}",
-                'review_file': f"src/review.txt",
-                'init_file': 'src/__init__.py',
-                'tests_init_file': 'tests/__init__.py',
-            }
+        if not scores:
+            return 'python', None, 0.3
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        language, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0
+
+        if language in explicit and len(explicit) == 1:
+            confidence = 0.95
         else:
-            file_structure = {
-                'language': language,
-                'implementation_file': f"src/{base_name}{ext['impl']}",
-                'test_file': f"tests/{base_name}{ext['test']}",
-                'docs_file': f"docs/README{ext['docs']}",
-                'interface_file': f"src/{base_name}{ext['interface']}",
-                'review_file': f"src/review.txt"
-            }
+            # A lone framework mention is weaker evidence than the language's name
+            confidence = (0.6 + 0.3 * (top - second) / top) * min(1.0, (top + 1) / 3)
+        # Layouts of several programs or services are beyond the local templates
+        if _MULTI_PART.search(text):
+            confidence = min(confidence, 0.5)
+        return language, frameworks.get(language), round(confidence, 2)
+
+    @staticmethod
+    def determine_language(spec):
+        """Analyze specification to determine primary programming language."""
+        return ManifestAgent.classify(spec)[0]
+
+    @staticmethod
+    def local_manifest(spec):
+        """
+        Builds the full manifest, file-mapping included, from the specification without the LLM.
+        Returns (manifest, confidence).
+        """
+        language, framework, confidence = ManifestAgent.classify(spec)
+        entry = LANGUAGES[language]
+        base_name = ManifestAgent._extract_base_name(spec)
+        names = ManifestAgent._layout_names(base_name)
+
+        manifest = {'name': ManifestAgent._project_name(spec, base_name, language), 'language': entry['label']}
+        if framework:
+            manifest['framework'] = framework
+        file_mapping = {}
+        for key, (path, description) in list(entry['files'].items()) + list(_COMMON_FILES.items()):
+            path = path.format(**names)
+            manifest[key] = path
+            file_mapping[path] = description.format(language=entry['label'], **names)
+        for path, description in entry['extra_files'].items():
+            file_mapping[path.format(**names)] = description.format(language=entry['label'], **names)
+        manifest['file-mapping'] = file_mapping
+        return manifest, confidence
 
+    @staticmethod
+    def get_file_names(language, spec):
+        """Generate appropriate file names based on language and specification."""
+        entry = LANGUAGES.get(language, LANGUAGES['python'])
+        names = ManifestAgent._layout_names(ManifestAgent._extract_base_name(spec))
 
+        file_structure = {'language': language}
+        for key, (path, _) in list(entry['files'].items()) + list(_COMMON_FILES.items()):
+            file_structure[key] = path.format(**names)
         return file_structure
 
+    @staticmethod
+    def _layout_names(base_name):
+        # {base} for file names, {Base} for class-named files such as Java sources
+        return {'base': base_name, 'Base': ''.join(part.title() for part in base_name.split('_'))}
+
     @staticmethod
     def _extract_base_name(spec):
         """Extract a base name for files from the specification."""
         if not isinstance(spec, str):
             return 'app'
 
-        words = spec.lower().split()
-        key_indicators = ['calculator', 'server', 'api', 'service', 'app']
-
-        for word in words:
-            if word in key_indicators:
-                return word
+        words = _WORD.findall(spec.lower())
+        # What the project is about names it better than what kind of program it is
+        for indicators in (_SUBJECT_WORDS, _KIND_WORDS):
+            for word in words:
+                if word in indicators:
+                    return word
 
         return 'app'  # Default base name if no specific indicator is found
 
+    @staticmethod
+    def _project_name(spec, base_name, language):
+        text = spec.lower()
+        name = 'API' if base_name == 'api' else base_name.replace('_', ' ').title()
+        if _API_WORDS.search(text) and base_name != 'api':
+            return f"{name} API"
+        if _CLI_WORDS.search(text):
+            return f"{name} CLI"
+        if language == 'web':
+            return f"{name} Web App"
+        return name
+
     @staticmethod
     def process_specification(spec):
         """Process the specification and return file structure as JSON string."""
@@ -126,9 +190,7 @@ class ManifestAgent:
             if not spec or not isinstance(spec, str):
                 raise ValueError("Invalid specification provided")
 
-            language = ManifestAgent.determine_language(spec)
-            file_structure = ManifestAgent.get_file_names(language, spec)
-            return json.dumps(file_structure, indent=2)
+            return json.dumps(ManifestAgent.local_manifest(spec)[0], indent=2)
         except Exception as e:
             # Return a default structure on error
             default_structure = {
@@ -138,4 +200,130 @@ class ManifestAgent:
                 'docs_file': 'docs/README.md',
                 'interface_file': 'src/app.idl'
             }
-            return json.dumps(default_structure, indent=2)
\ No newline at end of file
+            return json.dumps(default_structure, indent=2)
+
+
+def _language(label, names, frameworks, files, extra_files, explicit_names=None):
+    """
+    Table entry of a language: precompiled patterns for its names, for an explicit
+    "using <name>" statement and for its frameworks, and its file layout.
+    """
+    return {
+        'label': label,
+        'names': re.compile(rf"(?<![\w+#.]){names}(?![\w+#])"),
+        'explicit': re.compile(rf"\b(?:using|in|with|language)\s+(?:the\s+)?(?:language\s+)?"
+                               rf"{explicit_names or names}(?![\w+#])"),
+        'frameworks': re.compile(rf"\b(?:{frameworks})\b") if frameworks else None,
+        'files': files,
+        'extra_files': extra_files,
+    }
+
+
+# Files every layout has
+_COMMON_FILES = {
+    'docs_file': ('docs/README.md', "contains markdown documentation on installing, running and testing the project"),
+    'run_script': ('build_and_run.sh', "contains a bash script to install dependencies, build and run the project"),
+}
+
+LANGUAGES = {
+    'python': _language(
+        'Python', r"(?:python\s?3?|py3)",
+        r"flask|django|fastapi|pytest|pandas|numpy|tkinter|pygame|argparse|sqlalchemy",
+        {
+            'implementation_file': ('src/{base}.py', "contains the main {language} implementation of the {base} logic"),
+            'test_file': ('tests/test_{base}.py', "contains pytest unit tests for src/{base}.py"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as comments"),
+        },
+        {'pyproject.toml': "contains the project metadata and its dependencies"}
+    ),
+    'web': _language(
+        'HTML, JavaScript', r"(?:html5?|css3?|front[- ]?end|web page|browser|dom)",
+        r"react|vue|angular|svelte|jquery|bootstrap|tailwind|canvas",
+        {
+            'implementation_file': ('src/{base}.js', "contains the JavaScript logic of the page"),
+            'test_file': ('tests/{base}.test.js', "contains jest unit tests for src/{base}.js"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as JavaScript comments"),
+        },
+        {
+            'src/index.html': "contains the HTML page with its styles, loading src/{base}.js",
+            'package.json': "contains the project metadata, the jest dev dependency and a test script",
+        }
+    ),
+    'javascript': _language(
+        'JavaScript', r"(?:javascript|node(?:\.?js)?|js)",
+        r"express(?:\.?js| server| app)|koa|nestjs|jest|mocha|npm",
+        {
+            'implementation_file': ('src/{base}.js', "contains the main {language} implementation of the {base} logic"),
+            'test_file': ('tests/{base}.test.js', "contains jest unit tests for src/{base}.js"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as JavaScript comments"),
+        },
+        {'package.json': "contains the project metadata, dependencies and a test script"}
+    ),
+    'typescript': _language(
+        'TypeScript', r"(?:typescript|ts)",
+        r"deno|tsx|ts-node",
+        {
+            'implementation_file': ('src/{base}.ts', "contains the main {language} implementation of the {base} logic"),
+            'test_file': ('tests/{base}.test.ts', "contains jest unit tests for src/{base}.ts"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as comments"),
+        },
+        {
+            'package.json': "contains the project metadata, dependencies and a test script",
+            'tsconfig.json': "contains the TypeScript compiler options",
+        }
+    ),
+    'go': _language(
+        'Go', r"(?:golang|go(?= (?:language|module|program|routines?)\b))",
+        r"gorilla/mux|net/http|goroutines?",
+        {
+            'implementation_file': ('cmd/{base}/main.go', "contains the main {language} program of the {base}"),
+            'test_file': ('cmd/{base}/main_test.go', "contains go test unit tests for cmd/{base}/main.go"),
+            'interface_file': ('cmd/{base}/{base}.idl', "contains the IDL of the {base} interfaces as Go comments"),
+        },
+        {'go.mod': "contains the Go module definition and its dependencies"},
+        # "go" alone is usually the English verb, unless the spec says it uses Go
+        explicit_names=r"(?:golang|go)"
+    ),
+    'java': _language(
+        'Java', r"java",
+        r"spring(?: boot)?|maven|gradle|junit",
+        {
+            'implementation_file': ('src/main/java/{Base}.java', "contains the main {language} class of the {base}"),
+            'test_file': ('src/test/java/{Base}Test.java', "contains JUnit tests for {Base}"),
+            'interface_file': ('src/main/java/{Base}.idl', "contains the IDL of the {base} interfaces as comments"),
+        },
+        {'pom.xml': "contains the Maven build with the JUnit dependency"}
+    ),
+    'cpp': _language(
+        'C++', r"(?:c\+\+|cpp)",
+        r"cmake|gcc|clang|stl|gtest|googletest",
+        {
+            'implementation_file': ('src/{base}.cpp', "contains the main {language} implementation of the {base}"),
+            'test_file': ('tests/{base}_test.cpp', "contains GoogleTest unit tests for src/{base}.cpp"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as comments"),
+        },
+        {'CMakeLists.txt': "contains the CMake build of the program and its tests"}
+    ),
+    'rust': _language(
+        'Rust', r"rust",
+        r"cargo|tokio|actix|axum|serde",
+        {
+            'implementation_file': ('src/main.rs', "contains the main {language} program of the {base}"),
+            'test_file': ('tests/{base}_test.rs', "contains cargo integration tests for the {base}"),
+            'interface_file': ('src/{base}.idl', "contains the IDL of the {base} interfaces as comments"),
+        },
+        {'Cargo.toml': "contains the crate metadata and its dependencies"}
+    ),
+}
+
+_WORD = re.compile(r"[a-z][a-z0-9_]*")
+_SUBJECT_WORDS = {
+    'calculator', 'converter', 'game', 'asteroids', 'snake', 'tetris', 'chess', 'todo', 'chat', 'blog',
+    'inventory', 'parser', 'scraper', 'tracker', 'timer', 'notes', 'bank', 'library', 'weather', 'shop',
+    'quiz', 'dashboard', 'scheduler', 'shortener', 'wiki', 'planner', 'budget', 'editor', 'compiler',
+}
+_KIND_WORDS = {'server', 'api', 'service', 'app', 'tool', 'bot'}
+_API_WORDS = re.compile(r"\b(?:rest(?:ful)?|api|endpoints?|http server)\b")
+_CLI_WORDS = re.compile(r"\b(?:command[- ]line|cli|terminal)\b")
+_MULTI_PART = re.compile(r"\b(?:microservices?|frontend and (?:a )?backend|backend and (?:a )?frontend|monorepo|"
+                         r"docker-compose|multiple services|mobile app|client and (?:a )?server)\b")
@@ -2,7 +2,7 @@ from crewai import Agent, Task
 
 class ReviewAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role="Senior Code Reviewer",
             goal="Review and provide feedback on generated code",
@@ -11,17 +11,36 @@ class ReviewAgent:
                 "ensuring code quality, maintainability, and adherence to best practices. "
                 "You know how to guide teams toward high quality implementations through detailed reviews."
             ),
+            llm=llm,
             verbose=True
         )
 
     @staticmethod
-    def create_task(agent, code, output_file=None):
+    def create_task(agent, code, output_file=None, unchanged_functions=None, omitted_functions=None):
+        """
+        `unchanged_functions` and `omitted_functions` name the functions whose bodies were left
+        out of `code` to fit the context budget, as unchanged since the previous review or not.
+        """
         if output_file is None:
             output_file = "src/report.txt"
+        collapsed = ""
+        if unchanged_functions:
+            collapsed += (
+                "The bodies of these functions are the same as in your previous review and are shown as "
+                f"'...  # unchanged since the previous review': {', '.join(unchanged_functions)}. "
+                "Their full bodies were part of that review; do not report them as stubs.\n"
+            )
+        if omitted_functions:
+            collapsed += (
+                "The bodies of these functions were left out to fit the prompt and are shown as "
+                f"'...  # body omitted to fit the context budget': {', '.join(omitted_functions)}. "
+                "They are not stubs; review them from their signatures and docstrings.\n"
+            )
         return Task(
             description=(
                 "Review the following generated code for maintainability, design, error handling and style:\n\n"
                 f"{code}\n\n"
+                f"{collapsed}"
                 "If the code is acceptable, output a plain text response that includes 'Approved'. "
                 "If improvements are needed, output a response containing 'Revisions required' along with a list of suggestions. "
                 "Do not include markdown formatting in your response."
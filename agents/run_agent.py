@@ -2,13 +2,14 @@ from crewai import Agent, Task
 
 class RunAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Senior Software Developer',
             goal='Create a script that will compile and run',
             backstory="""You are an experienced software developer specializing in
             making sure the code can be run easily from a shell script, a makefile,
             or a batch script..""",
+            llm=llm,
             verbose=True
         )
 
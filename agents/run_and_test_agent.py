@@ -7,7 +7,7 @@ from datetime import datetime
 
 class RunAndTestAgent:
     @staticmethod
-    def create():
+    def create(pytest_workers=0, llm=None):
         return Agent(
             role='Testing and Execution Specialist',
             goal='Execute Python code and verify it works as expected through testing',
@@ -15,12 +15,13 @@ class RunAndTestAgent:
             execute Python files, run their associated tests, and determine if they're 
             functioning correctly. You're persistent and will retry up to 5 times   
             if the code or tests fail, making necessary improvements each time.""",
-            tools=[RunPythonGetOutput()],
+            tools=[RunPythonGetOutput(pytest_workers=pytest_workers)],
+            llm=llm,
             verbose=True
         )
 
     @staticmethod
-    def create_task(agent, code_file, test_file, output_file=None):
+    def create_task(agent, code_file, test_file, output_file=None, log_file='testing_agent_output.txt'):
         if output_file is None:
             output_file = 'src/execution_result.txt'
 
@@ -34,7 +35,7 @@ class RunAndTestAgent:
             4. If there are errors or test failures, analyze the issues and suggest fixes
             5. Some tests with input_invalid are expected to throw errors or fail, analyze these errors separately
             6. You should retry up to 3 times if tests fail, implementing your suggested fixes
-            7. Track all test failures and append them to testing_agent_output.txt
+            7. Track all test failures and append them to {log_file}
 
             The code should execute without errors and ALL tests should pass.
             """,
@@ -50,20 +51,16 @@ class RunAndTestAgent:
         )
 
     @staticmethod
-    def log_test_failure(code_file, test_file, test_output, attempt_number, suggestions=None):
+    def log_test_failure(code_file, test_file, test_result, attempt_number, suggestions=None,
+                         log_file='testing_agent_output.txt'):
         """
-        Log test failures to the testing_agent_output.txt file
+        Log test failures to the testing_agent_output.txt file (or `log_file`).
+        `test_result` is a PytestResult; only the failing tests' tracebacks are logged.
         """
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Extract failure information
-        failure_lines = []
-        for line in test_output.split('\n'):
-            if 'FAIL' in line or 'ERROR' in line or 'failed' in line.lower() or 'error' in line.lower():
-                failure_lines.append(line)
-
-        failure_summary = '\n'.join(
-            failure_lines) if failure_lines else "Tests failed but no specific failure message found"
+        failure_summary = test_result.failure_report() or "Tests failed but no specific failure message found"
 
         # Create the log entry
         log_entry = f"""
@@ -85,14 +82,14 @@ SUGGESTIONS:
         log_entry += "=================================================\n"
 
         # Append to the log file
-        with open('testing_agent_output.txt', 'a') as f:
+        with open(log_file, 'a') as f:
             f.write(log_entry)
 
     @staticmethod
-    def execute_with_retries(agent, code_file, test_file, max_retries=3):
+    def execute_with_retries(agent, code_file, test_file, max_retries=3, log_file='testing_agent_output.txt'):
         """
         Execute code and tests with retries if tests fail.
-        Logs failures to testing_agent_output.txt
+        Logs failures to testing_agent_output.txt (or `log_file`)
         """
         retries = 0
         success = False
@@ -105,17 +102,17 @@ SUGGESTIONS:
             results.append(f"Run attempt {attempt_number}:\n{code_output}\n")
 
             # Run the tests
-            test_output = agent.tools[0]._run(test_file, is_test=True)
-            results.append(f"Test attempt {attempt_number}:\n{test_output}\n")
+            test_result = agent.tools[0].run_tests(test_file)
+            results.append(f"Test attempt {attempt_number}:\n{test_result.summary()}\n")
 
             # Check for test success
-            if "failed" not in test_output.lower() and "error" not in test_output.lower():
+            if test_result.success:
                 success = True
                 results.append("ALL TESTS PASSED! 🎉")
 
                 # Log successful run after previous failures
                 if retries > 0:
-                    with open('testing_agent_output.txt', 'a') as f:
+                    with open(log_file, 'a') as f:
                         f.write(f"\nTIMESTAMP: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                         f.write(f"SUCCESS after {attempt_number} attempts for {code_file} with {test_file}\n\n")
                 break
@@ -127,7 +124,8 @@ SUGGESTIONS:
             results.append(suggestions)
 
             # Log the failure
-            RunAndTestAgent.log_test_failure(code_file, test_file, test_output, attempt_number, suggestions)
+            RunAndTestAgent.log_test_failure(code_file, test_file, test_result, attempt_number, suggestions,
+                                             log_file=log_file)
 
             retries += 1
 
@@ -136,7 +134,7 @@ SUGGESTIONS:
             results.append(final_message)
 
             # Log final failure
-            with open('testing_agent_output.txt', 'a') as f:
+            with open(log_file, 'a') as f:
                 f.write(f"\nTIMESTAMP: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"FINAL FAILURE: {final_message} for {code_file} with {test_file}\n\n")
 
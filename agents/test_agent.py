@@ -2,7 +2,7 @@ from crewai import Agent, Task
 
 class TestAgent:
     @staticmethod
-    def create():
+    def create(llm=None):
         return Agent(
             role='Testing Specialist',
             goal='Create comprehensive tests for the generated code',
@@ -10,6 +10,7 @@ class TestAgent:
             suites. You ensure code reliability through comprehensive test coverage 
             and edge case handling for any programming language.""",
             tools=[],
+            llm=llm,
             verbose=True
         )
 
@@ -39,4 +40,65 @@ class TestAgent:
             - The file is plain text, it isn't markdown
             - Plain Text, remove Markdown""",
             output_file=output_file
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def create_spec_task(agent, project_spec, idl_spec, code_file, output_file):
+        """Create a task for writing tests from the specification and IDL before the code exists."""
+        return Task(
+            description=f"""Create comprehensive unit tests in the target language for the code that will be saved at
+            {code_file}. The code is being written at the same time from the same specification and IDL,
+            so write the tests against the interfaces they define:
+
+            Project Spec:
+            {project_spec}
+
+            IDL specification:
+            {idl_spec}
+
+            Test suite must cover:
+            0. Import what it tests from the code file at {code_file}, using exactly the names in the IDL
+            1. Be written in the same language as the code
+            2. All public interfaces and methods, called with the parameters the IDL gives them
+            3. Include pathing if needed; for example for libraries in a directory named src that are being tested import like so, Python=import src.<packagename>, c/C++=include "src/<packagename>, etc.
+            4. Error handling scenarios, using the exceptions the IDL defines
+            5. Edge cases and boundary conditions
+            6. Input validation""",
+            agent=agent,
+            expected_output="""Complete test suite in the specified language including:
+            - Unit tests for all public interfaces of the IDL
+            - Error handling verification
+            - Edge case coverage
+            - The file is plain text, it isn't markdown
+            - Plain Text, remove Markdown""",
+            output_file=output_file
+        )
+
+    @staticmethod
+    def create_reconcile_task(agent, code_file, code_signatures, tests, stale_tests):
+        """Create a task for updating only the tests that no longer match the code."""
+        # No output file: the workflow applies the returned edits to the current tests itself
+        return Task(
+            description=f"""The following tests no longer match the code in {code_file}:
+            {stale_tests}
+
+            Code interfaces (function bodies omitted):
+            {code_signatures}
+
+            Current tests:
+            {tests}
+
+            Update only the imports and the tests listed above so that they use the interfaces as the
+            code defines them now, keeping what each test checks. Output one block per change, in this exact format:
+            <<<<<<< SEARCH
+            lines copied exactly from the current tests, including indentation
+            =======
+            the lines that replace them
+            >>>>>>> REPLACE
+            Make every SEARCH text long enough to match exactly one place in the tests.""",
+            agent=agent,
+            expected_output="""Only search/replace blocks for the listed tests and imports:
+            - Each SEARCH text copied exactly from the current tests
+            - No unchanged tests outside the blocks
+            - Plain text output without markdown formatting"""
+        )
@@ -0,0 +1,107 @@
+import argparse
+import json
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.mock_llm_server import MockLLMServer
+from utils.llm_transport import LLMTransport
+
+
+def _request_body(prompt_chars):
+    return {'model': 'mock', 'max_tokens': 256,
+            'messages': [{'role': 'user', 'content': "x" * prompt_chars}]}
+
+
+def run_load(base_url, client_factory, requests, threads, prompt_chars):
+    """
+    Sends `requests` chat completions from `threads` threads, each through a client from
+    client_factory() (None: one new client per request). Returns latencies and status codes.
+    """
+    shared = client_factory()
+
+    def send(_):
+        client = shared or httpx.Client(timeout=60)
+        start = time.monotonic()
+        try:
+            status = client.post(f"{base_url}/chat/completions", json=_request_body(prompt_chars)).status_code
+        except httpx.HTTPError:
+            status = None
+        finally:
+            if shared is None:
+                client.close()
+        return time.monotonic() - start, status
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(send, range(requests)))
+    return time.monotonic() - started, results
+
+
+def run_benchmark(requests=200, threads=16, server_rpm=1200, latency=0.05, prompt_chars=2000, headroom=0.9):
+    """
+    Runs the same load against a rate-limited mock server three times: with a new client per
+    request, with one pooled client without limiter or retries, and through the shared
+    LLMTransport limited just below the server's rate.
+    """
+    report = {'config': {'requests': requests, 'threads': threads, 'server_rpm': server_rpm,
+                         'latency': latency, 'prompt_chars': prompt_chars}}
+    modes = {
+        'per_request_client': lambda: None,
+        'pooled_client': lambda: httpx.Client(timeout=60, limits=httpx.Limits(max_connections=threads)),
+        'shared_transport': lambda: LLMTransport(requests_per_minute=int(server_rpm * headroom),
+                                                 max_connections=threads),
+    }
+    for mode, make_transport in modes.items():
+        server = MockLLMServer(latency=latency, requests_per_minute=server_rpm)
+        base_url = server.start()
+        transport = make_transport()
+        try:
+            elapsed, results = run_load(base_url, lambda: getattr(transport, 'client', transport),
+                                        requests, threads, prompt_chars)
+        finally:
+            if transport:
+                transport.close()
+            server.stop()
+        latencies = [seconds for seconds, _ in results]
+        report[mode] = {
+            'elapsed_seconds': round(elapsed, 3),
+            'succeeded': sum(1 for _, status in results if status == 200),
+            'requests_per_second': round(requests / elapsed, 2) if elapsed else None,
+            'latency_p50': round(statistics.median(latencies), 4),
+            'latency_p95': round(statistics.quantiles(latencies, n=20)[-1], 4),
+            'server': dict(server.stats),
+            'transport': transport.stats() if isinstance(transport, LLMTransport) else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the shared LLM transport against a local mock server')
+    parser.add_argument('--requests', type=int, default=200, help='Number of completions (default: 200)')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent callers (default: 16)')
+    parser.add_argument('--server-rpm', type=int, default=1200,
+                        help='Requests per minute the mock server allows before answering 429 (default: 1200)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock seconds per completion (default: 0.05)')
+    parser.add_argument('--output', metavar='JSON', help='Write the results to this file')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    report = run_benchmark(args.requests, args.threads, args.server_rpm, args.latency)
+    for mode in ('per_request_client', 'pooled_client', 'shared_transport'):
+        values = report[mode]
+        print(f"{mode:<20} {values['succeeded']}/{args.requests} succeeded in {values['elapsed_seconds']}s, "
+              f"p50 {values['latency_p50']}s, p95 {values['latency_p95']}s, "
+              f"{values['server']['rate_limited']} answered 429, {values['server']['connections']} connections")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# The agents build their tools and default LLM at import time and need a key to exist
+os.environ.setdefault('OPENAI_API_KEY', 'offline-benchmark')
+
+from benchmarks.fake_llm import FakeLLM
+from utils.file_handler import FileHandler
+from workflows.project_workflow import ProjectWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_benchmark(spec_files, iterations=1, latency=0.0, tokens_per_second=None,
+                  responses_file=None, pytest_workers=0):
+    """
+    Runs the full workflow against a FakeLLM for every spec file and returns
+    throughput, per-stage latency percentiles and peak memory.
+    """
+    options = {'latency': latency, 'tokens_per_second': tokens_per_second}
+    llm = FakeLLM.from_file(responses_file, **options) if responses_file else FakeLLM(**options)
+    agents = ProjectWorkflow.create_agents(pytest_workers=pytest_workers, llm=llm)
+    file_handler = FileHandler()
+
+    output_dir = tempfile.mkdtemp(prefix="bench_projects_")
+    run_seconds = []
+    stage_seconds = defaultdict(list)
+    failures = 0
+
+    started = time.time()
+    for iteration in range(iterations):
+        for spec_file in spec_files:
+            # Every iteration runs cold: no warm start from the previous iteration's project
+            workflow = ProjectWorkflow(file_handler.read_specification(spec_file), agents=agents, use_cache=False,
+                                       warm_start_threshold=None)
+            workflow.file_handler.base_output_dir = output_dir
+
+            run_start = time.time()
+            try:
+                workflow.execute()
+            except Exception as e:
+                failures += 1
+                logger.error(f"Benchmark run of {spec_file} (iteration {iteration + 1}) failed: {e}")
+                continue
+            run_seconds.append(time.time() - run_start)
+
+            for record in workflow.metrics.records:
+                stage_seconds[record['stage'] or record['kind']].append(record['wall_seconds'])
+    elapsed = time.time() - started
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'config': {'specs': spec_files, 'iterations': iterations, 'latency': latency,
+                   'tokens_per_second': tokens_per_second, 'responses': responses_file,
+                   'pytest_workers': pytest_workers},
+        'runs': len(run_seconds),
+        'failures': failures,
+        'llm_calls': llm.calls,
+        'elapsed_seconds': elapsed,
+        'throughput_per_minute': len(run_seconds) / elapsed * 60 if elapsed else 0.0,
+        'run_seconds': {'p50': percentile(run_seconds, 50), 'p95': percentile(run_seconds, 95)},
+        'stages': {stage: {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+                   for stage, values in sorted(stage_seconds.items())},
+        'peak_rss_mb': peak_rss_mb(),
+        'output_dir': output_dir,
+    }
+
+
+def _delta(current, baseline):
+    if not baseline:
+        return "n/a"
+    return f"{(current - baseline) / baseline * 100:+.1f}%"
+
+
+def print_report(results, baseline=None):
+    print(f"\nCommit: {results['commit']}")
+    print(f"Runs: {results['runs']} ({results['failures']} failed), LLM calls: {results['llm_calls']}")
+    print(f"Throughput: {results['throughput_per_minute']:.2f} projects/min")
+    print(f"Run latency: p50 {results['run_seconds']['p50']:.3f}s, p95 {results['run_seconds']['p95']:.3f}s")
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    print(f"\n{'stage':<20}{'count':>7}{'p50 (s)':>12}{'p95 (s)':>12}" + (f"{'p50 delta':>12}{'p95 delta':>12}" if baseline else ""))
+    for stage, values in results['stages'].items():
+        line = f"{stage:<20}{values['count']:>7}{values['p50']:>12.3f}{values['p95']:>12.3f}"
+        if baseline:
+            previous = baseline.get('stages', {}).get(stage, {})
+            line += f"{_delta(values['p50'], previous.get('p50')):>12}{_delta(values['p95'], previous.get('p95')):>12}"
+        print(line)
+
+    if baseline:
+        print(f"\nCompared with commit {baseline.get('commit')}:")
+        print(f"  throughput {_delta(results['throughput_per_minute'], baseline.get('throughput_per_minute'))}, "
+              f"run p50 {_delta(results['run_seconds']['p50'], baseline.get('run_seconds', {}).get('p50'))}, "
+              f"peak RSS {_delta(results['peak_rss_mb'], baseline.get('peak_rss_mb'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the project workflow using a fake LLM')
+    parser.add_argument('specs', nargs='*', help='Spec files to generate (default: sample_spec*.txt)')
+    parser.add_argument('--iterations', type=int, default=1, help='Number of passes over the specs (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated seconds of overhead per LLM call (default: 0)')
+    parser.add_argument('--tokens-per-second', type=float, default=None,
+                        help='Simulated generation speed (default: instant)')
+    parser.add_argument('--responses', metavar='JSON',
+                        help='Replay responses keyed by agent role or prompt hash from this file')
+    parser.add_argument('--pytest-workers', type=int, default=0, metavar='N',
+                        help='Run generated tests in N warm pytest worker processes (default: 0)')
+    parser.add_argument('--output', metavar='JSON', help='Write the results to this file')
+    parser.add_argument('--compare', metavar='JSON', help='Print deltas against results of a previous benchmark')
+    parser.add_argument('--verbose', action='store_true', help='Keep the workflow logging')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    spec_files = args.specs or sorted(glob.glob("sample_spec*.txt"))
+    if not spec_files:
+        parser.error("no spec files given and no sample_spec*.txt found")
+
+    results = run_benchmark(spec_files, args.iterations, args.latency, args.tokens_per_second,
+                            args.responses, args.pytest_workers)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMServer:
+    """
+    Local OpenAI-compatible chat completions endpoint for exercising the LLM transport
+    without a provider. It keeps connections alive, can enforce a requests-per-minute limit
+    with 429 answers, inject 503 failures and add latency, and counts what it saw.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, requests_per_minute=None, failure_rate=0.0,
+                 answer="Final Answer: ok"):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.failure_rate = failure_rate
+        self.answer = answer
+        self.stats = {'requests': 0, 'rate_limited': 0, 'failed': 0, 'connections': 0}
+        self._lock = threading.Lock()
+        # Server-side limit: a bucket holding one second of requests
+        self._capacity = max(1.0, (requests_per_minute or 0) / 60.0)
+        self._allowance = self._capacity
+        self._updated = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _admit(self):
+        if not self.requests_per_minute:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self._capacity, self._allowance + (now - self._updated) * self.requests_per_minute / 60.0)
+            self._updated = now
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            return True
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server._count('connections')
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+                server._count('requests')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+                    return
+                if not server._admit():
+                    server._count('rate_limited')
+                    self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                                    {'Retry-After': '1'})
+                    return
+                if server.failure_rate and random.random() < server.failure_rate:
+                    server._count('failed')
+                    self._send_json(503, {'error': {'message': 'Overloaded'}})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+
+                prompt = "".join(str(message.get('content') or "") for message in request.get('messages', []))
+                prompt_tokens, completion_tokens = len(prompt) // 4, len(server.answer) // 4
+                self._send_json(200, {
+                    'id': f"chatcmpl-mock-{server.stats['requests']}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'mock'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': server.answer}}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens},
+                })
+
+        return Handler
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        """
+        Serves on a background thread and returns the base URL.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible mock LLM server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per completion (default: 0)')
+    parser.add_argument('--requests-per-minute', type=int, default=None, help='Answer 429 above this rate')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of requests answered with 503')
+    args = parser.parse_args()
+
+    server = MockLLMServer(port=args.port, latency=args.latency, requests_per_minute=args.requests_per_minute,
+                           failure_rate=args.failure_rate)
+    print(f"Mock LLM listening on {server.base_url} (set OPENAI_API_BASE to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
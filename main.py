@@ -1,21 +1,157 @@
 from crewai import Crew
 from utils.file_handler import FileHandler
+from utils.stage_fingerprints import StageFingerprints
+from utils.checkpoint_journal import CheckpointJournal
+from utils.llm_transport import get_shared_transport
+from utils.model_routing import ModelRouting
+from utils.spec_similarity import SpecSimilarity
 from workflows.project_workflow import ProjectWorkflow
 import argparse
+import os
+import re
 import sys
+import time
+from datetime import datetime
 
 def main():
     parser = argparse.ArgumentParser(description='Project Generator using CrewAI')
-    parser.add_argument('spec_file', help='Path to the project specification file')
+    parser.add_argument('spec_file', nargs='?', help='Path to the project specification file')
+    parser.add_argument('--batch', metavar='PATH',
+                        help='Generate every spec in a directory of .txt files or a JSONL file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of concurrent workflows in batch mode (default: 1)')
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads',
+                        help='Batch mode: run generations on a thread pool or as asyncio tasks')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always query the model instead of reusing cached LLM responses')
+    parser.add_argument('--incremental', nargs='?', const='latest', metavar='PROJECT_DIR',
+                        help='Only rerun stages whose inputs changed since a previous generation '
+                             '(default: the latest generation of the same spec file; '
+                             '"passing": the latest run of the same spec whose tests passed)')
+    parser.add_argument('--pytest-workers', type=int, default=0, metavar='N',
+                        help='Run generated tests in N warm pytest worker processes (default: 0, a fresh pytest per run)')
+    parser.add_argument('--otel-file', metavar='PATH',
+                        help='Also append each run as an OpenTelemetry (OTLP/JSON) trace to this file')
+    parser.add_argument('--parallel-stages', type=int, default=4, metavar='N',
+                        help='Number of stages, including per-file code tasks, run at the same time (default: 4)')
+    parser.add_argument('--fix-mode', choices=['patch', 'rewrite'], default='patch',
+                        help='Have fixes returned as edits applied to the current file (default) '
+                             'or as a full rewrite of the file')
+    parser.add_argument('--manifest-mode', choices=['auto', 'local', 'llm'], default='auto',
+                        help='Build the manifest locally from the specification and ask the LLM only when the '
+                             'language is unclear (auto, default), never (local) or always (llm)')
+    parser.add_argument('--model-routing', nargs='?', const='default', metavar='CONFIG',
+                        help='Give each agent its own model, temperature and token budget, from a JSON routing '
+                             'config or, without CONFIG, the built-in routes; fixes escalate to a stronger model '
+                             'after a failed review or test round')
+    parser.add_argument('--requests-per-minute', type=int, metavar='N',
+                        help='Limit LLM requests per minute across all agents and workers (default: no limit)')
+    parser.add_argument('--tokens-per-minute', type=int, metavar='N',
+                        help='Limit LLM prompt and completion tokens per minute across all agents and workers')
+    parser.add_argument('--max-connections', type=int, default=32, metavar='N',
+                        help='Size of the keep-alive connection pool to the LLM provider (default: 32)')
+    parser.add_argument('--tests-after-code', action='store_true',
+                        help='Write Python tests from the generated code instead of from the IDL while the code '
+                             'is being generated')
+    parser.add_argument('--trust-static-gate', action='store_true',
+                        help='Skip the LLM code review when generated Python passes the local static checks')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream model output into the generated files and print stage progress')
+    parser.add_argument('--resume', metavar='PROJECT_DIR',
+                        help='Continue a failed generation from the last stage checkpointed in its project directory')
+    parser.add_argument('--no-warm-start', action='store_true',
+                        help='Do not start from a successful earlier run of a similar specification')
+    parser.add_argument('--warm-start-threshold', type=float, default=SpecSimilarity.DEFAULT_THRESHOLD, metavar='S',
+                        help='Minimum specification similarity (0-1) for a warm start (default: %(default)s)')
+    parser.add_argument('--archive', action='store_true',
+                        help='Move finished projects in generated_projects into the deduplicated archive store')
+    parser.add_argument('--materialize', metavar='RUN',
+                        help='Recreate an archived project, e.g. 2025-01-28_22-18-31')
+    parser.add_argument('--materialize-to', metavar='DIR',
+                        help='Target directory for --materialize (default: generated_projects/RUN)')
+    parser.add_argument('--link-method', choices=['auto', 'reflink', 'hardlink', 'copy'], default='auto',
+                        help='How --materialize creates files; hard-linked files are read-only')
+    parser.add_argument('--history', action='store_true',
+                        help='List indexed generations, newest first; with spec_file, only runs of that specification')
+    parser.add_argument('--language', help='--history: only runs in this language, e.g. go')
+    parser.add_argument('--status', choices=['passed', 'failed'], help='--history: only runs whose tests passed or failed')
+    parser.add_argument('--since', metavar='WHEN',
+                        help='--history: only runs since a date (YYYY-MM-DD) or an age such as 7d or 12h')
+    parser.add_argument('--limit', type=int, default=20, help='--history: maximum number of runs listed')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Rebuild the generation index from the projects in generated_projects')
     args = parser.parse_args()
 
+    if args.history or args.reindex:
+        show_history(args)
+        return
+
+    if not args.spec_file and not args.batch and not args.resume and not args.archive and not args.materialize:
+        parser.error("either spec_file, --batch, --resume, --archive, --materialize or --history is required")
+
+    if args.archive or args.materialize:
+        manage_archive(args)
+        return
+
+    model_routing = None
+    if args.model_routing:
+        try:
+            model_routing = ModelRouting() if args.model_routing == 'default' else ModelRouting.load(args.model_routing)
+        except (OSError, ValueError) as e:
+            parser.error(f"invalid model routing config '{args.model_routing}': {e}")
+
+    # Created before any agent so that all of them share its connection pool and limits
+    get_shared_transport(requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute,
+                         max_connections=args.max_connections)
+
+    if args.batch:
+        run_batch(args, model_routing)
+        return
+
+    if args.resume:
+        resume_generation(args, model_routing)
+        return
+
     try:
         # Initialize file handler and read specification
         file_handler = FileHandler()
         project_spec = file_handler.read_specification(args.spec_file)
 
+        spec_source = os.path.abspath(args.spec_file)
+        previous_project_dir = None
+        if args.incremental in ('latest', 'passing'):
+            index = file_handler.generation_index()
+            if args.incremental == 'passing':
+                previous = index.latest(spec_hash=index.spec_hash(project_spec), passed=True)
+            else:
+                previous = index.latest(spec_source=spec_source)
+            previous_project_dir = previous['project_dir'] if previous else None
+            if previous_project_dir is None and args.incremental == 'latest':
+                # Runs published before the index existed
+                previous_project_dir = StageFingerprints.find_latest(file_handler.base_output_dir, spec_source)
+            if previous_project_dir is None:
+                print(f"No previous generation of '{args.spec_file}' found, running the full workflow.")
+        elif args.incremental:
+            previous_project_dir = args.incremental
+
         # Initialize and run the project workflow
-        workflow = ProjectWorkflow(project_spec)
+        workflow = ProjectWorkflow(
+            project_spec,
+            agents=ProjectWorkflow.create_agents(pytest_workers=args.pytest_workers, routing=model_routing),
+            use_cache=not args.no_cache,
+            spec_source=spec_source,
+            previous_project_dir=previous_project_dir,
+            stream=args.stream,
+            progress_callback=print_progress if args.stream else None,
+            otel_file=args.otel_file,
+            fix_mode=args.fix_mode,
+            max_parallel_stages=args.parallel_stages,
+            trust_static_gate=args.trust_static_gate,
+            warm_start_threshold=None if args.no_warm_start else args.warm_start_threshold,
+            manifest_mode=args.manifest_mode,
+            model_routing=model_routing,
+            speculative_tests=not args.tests_after_code
+        )
         result = workflow.execute()
 
         print("\nProject generation completed successfully!")
@@ -27,5 +163,156 @@ def main():
         print(f"Error occurred: {str(e)}")
         sys.exit(1)
 
+def resume_generation(args, model_routing=None):
+    try:
+        journal = CheckpointJournal(args.resume)
+        if journal.run is None:
+            print(f"Error: No checkpoint journal found in '{args.resume}'.")
+            sys.exit(1)
+        if journal.completed:
+            print(f"Generation in '{args.resume}' has already completed.")
+            return
+
+        # The specification and output-affecting options come from the journal
+        options = dict(journal.run.get('options', {}))
+        if 'model_routing' in options:
+            # The interrupted run's models; different ones would change every stage fingerprint
+            journaled = options.pop('model_routing')
+            journaled_routing = ModelRouting.from_dict(journaled) if journaled else None
+            if args.model_routing and model_routing != journaled_routing:
+                print(f"Error: --model-routing differs from the model routing of the generation in "
+                      f"'{args.resume}'; resume without --model-routing to use the journaled one.")
+                sys.exit(1)
+            model_routing = journaled_routing
+
+        workflow = ProjectWorkflow(
+            journal.run['spec'],
+            agents=ProjectWorkflow.create_agents(pytest_workers=args.pytest_workers, routing=model_routing),
+            use_cache=not args.no_cache,
+            spec_source=journal.run.get('spec_source'),
+            stream=args.stream,
+            progress_callback=print_progress if args.stream else None,
+            otel_file=args.otel_file,
+            max_parallel_stages=args.parallel_stages,
+            resume_dir=args.resume,
+            model_routing=model_routing,
+            **options
+        )
+        workflow.execute()
+
+        print("\nProject generation completed successfully!")
+
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        sys.exit(1)
+
+def manage_archive(args):
+    try:
+        file_handler = FileHandler()
+        if args.archive:
+            archived = file_handler.archive_projects()
+            stats = file_handler.blob_store().stats()
+            print(f"Archived {len(archived)} projects. Store holds {stats['runs']} runs: "
+                  f"{stats['logical_bytes']} bytes in {stats['objects']} unique files, "
+                  f"{stats['stored_bytes']} bytes compressed.")
+        if args.materialize:
+            target_dir = file_handler.materialize_project(args.materialize, args.materialize_to, method=args.link_method)
+            print(f"Materialized '{args.materialize}' into {target_dir}")
+
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        sys.exit(1)
+
+def parse_since(value):
+    """
+    Unix time of a --since value: a date (YYYY-MM-DD) or an age such as 30m, 12h or 7d.
+    """
+    age = re.fullmatch(r'(\d+)([mhd])', value)
+    if age:
+        return time.time() - int(age.group(1)) * {'m': 60, 'h': 3600, 'd': 86400}[age.group(2)]
+    return datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+def show_history(args):
+    try:
+        file_handler = FileHandler()
+        index = file_handler.generation_index()
+        if args.reindex:
+            count = index.reindex(file_handler.base_output_dir)
+            print(f"Indexed {count} projects in {file_handler.base_output_dir}")
+            if not args.history:
+                return
+
+        runs = index.query(
+            language=args.language,
+            spec_hash=index.spec_hash(file_handler.read_specification(args.spec_file)) if args.spec_file else None,
+            passed={'passed': True, 'failed': False}.get(args.status),
+            since=parse_since(args.since) if args.since else None,
+            limit=args.limit
+        )
+        if not runs:
+            print("No matching generations.")
+            return
+
+        outcome = {True: 'passed', False: 'failed', None: '-'}
+        for run in runs:
+            tests = outcome[run['tests_passed']]
+            review = {True: 'approved', False: 'not approved', None: '-'}[run['review_approved']]
+            wall = f"{run['wall_seconds']:.0f}s" if run['wall_seconds'] is not None else '-'
+            location = f"{run['run_name']} (archived)" if run['archived'] else run['project_dir']
+            print(f"{datetime.fromtimestamp(run['created']):%Y-%m-%d %H:%M}  {run['language'] or '-':<10}  "
+                  f"tests {tests:<6}  review {review:<12}  {run['file_count']:>3} files  {wall:>6}  "
+                  f"{run['name'] or '-'}  {location}")
+
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        sys.exit(1)
+
+_reported_progress = {}
+
+def print_progress(stage, event, detail=None):
+    if event == 'progress':
+        # Streamed character counts arrive per chunk; only report every few thousand characters
+        if detail - _reported_progress.get(stage, 0) >= 2000:
+            _reported_progress[stage] = detail
+            print(f"[{stage}] {detail} characters written", flush=True)
+    else:
+        _reported_progress.pop(stage, None)
+        print(f"[{stage}] {event}", flush=True)
+
+def run_batch(args, model_routing=None):
+    from workflows.batch_workflow import AsyncBatchWorkflow, BatchWorkflow
+
+    try:
+        specs = BatchWorkflow.load_specs(args.batch)
+        batch_class = AsyncBatchWorkflow if args.engine == 'asyncio' else BatchWorkflow
+        summary = batch_class(
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            pytest_workers=args.pytest_workers,
+            otel_file=args.otel_file,
+            fix_mode=args.fix_mode,
+            max_parallel_stages=args.parallel_stages,
+            trust_static_gate=args.trust_static_gate,
+            warm_start_threshold=None if args.no_warm_start else args.warm_start_threshold,
+            manifest_mode=args.manifest_mode,
+            model_routing=model_routing,
+            speculative_tests=not args.tests_after_code
+        ).run(specs)
+
+        print(f"\nBatch completed: {summary['succeeded']}/{summary['total']} projects generated "
+              f"in {summary['elapsed_seconds']}s ({summary['specs_per_hour']} specs/hour)")
+        if summary['failed']:
+            sys.exit(1)
+
+    except FileNotFoundError:
+        print(f"Error: Batch input '{args.batch}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,123 @@
+from utils.context_budget import ContextBudget
+
+CODE = '''class Calculator:
+    def add(self, a, b):
+        """Adds two numbers."""
+        total = a + b
+        return total
+
+    def sub(self, a, b):
+        result = a - b
+        return result
+
+
+def one_liner(x): return x
+'''
+
+
+def test_count_tokens_of_empty_text_is_zero():
+    assert ContextBudget.count_tokens("") == 0
+    assert ContextBudget.count_tokens(None) == 0
+    assert ContextBudget.count_tokens("some words here") > 0
+
+
+def test_strip_passing_tests_keeps_failures():
+    output = "\n".join([
+        "tests/test_app.py::test_add PASSED [ 50%]",
+        "tests/test_app.py::test_sub FAILED [100%]",
+        "E   assert 1 == 2",
+    ])
+    stripped = ContextBudget.strip_passing_tests(output)
+    assert "test_add" not in stripped
+    assert "test_sub FAILED" in stripped
+    assert "assert 1 == 2" in stripped
+
+
+def test_dedupe_traceback_collapses_recursion():
+    frame = ['  File "app.py", line 3, in recurse', '    return recurse(n - 1)']
+    text = "\n".join(["Traceback (most recent call last):"] + frame * 50 + ["RecursionError: too deep"])
+    deduped = ContextBudget.dedupe_traceback(text)
+    assert deduped.count("in recurse") == 1
+    assert "repeated 49 more time(s)" in deduped
+    assert deduped.endswith("RecursionError: too deep")
+
+
+def test_dedupe_traceback_shortens_frames_shown_before():
+    frame = ['  File "app.py", line 3, in helper', '    raise ValueError("bad")']
+    text = "\n".join(["FAILED test_a"] + frame + ["ValueError", "FAILED test_b"] + frame + ["ValueError"])
+    deduped = ContextBudget.dedupe_traceback(text)
+    assert deduped.count('raise ValueError("bad")') == 1
+    assert '  File "app.py", line 3, in helper [frame shown above]' in deduped
+
+
+def test_dedupe_traceback_leaves_plain_duplicates_and_blank_lines():
+    text = "a\na\n\n\nb"
+    assert ContextBudget.dedupe_traceback(text) == text
+
+
+def test_truncate_middle_keeps_both_ends():
+    text = "\n".join(f"line {i}" for i in range(200))
+    truncated = ContextBudget.truncate_middle(text, 60)
+    assert truncated.startswith("line 0\n")
+    assert truncated.endswith("line 199")
+    assert "lines omitted to fit the context budget" in truncated
+    assert ContextBudget.count_tokens(truncated) < ContextBudget.count_tokens(text)
+
+
+def test_truncate_middle_returns_short_text_unchanged():
+    assert ContextBudget.truncate_middle("short", 100) == "short"
+
+
+def test_signatures_collapses_bodies_and_keeps_docstrings():
+    collapsed = ContextBudget.signatures(CODE, lambda name, source: True, "...")
+    assert '"""Adds two numbers."""' in collapsed
+    assert "total = a + b" not in collapsed
+    assert "result = a - b" not in collapsed
+    assert "def one_liner(x): return x" in collapsed
+
+
+def test_signatures_only_collapses_selected_functions():
+    collapsed = ContextBudget.signatures(CODE, lambda name, source: name == "Calculator.sub", "...")
+    assert "total = a + b" in collapsed
+    assert "result = a - b" not in collapsed
+
+
+def test_signatures_returns_unparsable_code_unchanged():
+    assert ContextBudget.signatures("def broken(:", lambda name, source: True, "...") == "def broken(:"
+
+
+def test_compact_code_keeps_code_within_the_limit():
+    code = CODE.replace("result = a - b", "result = b - a")
+    assert ContextBudget().compact_code('review', code, previous_code=CODE) == code
+
+
+def test_compact_code_reduces_unchanged_functions_over_the_limit():
+    previous = CODE.replace("total = a + b", "total = a + b\n" + "        total += 0\n" * 400)
+    code = previous.replace("result = a - b", "result = b - a")
+    limit = ContextBudget.count_tokens(code) - 100
+    compacted = ContextBudget({'review': limit}).compact_code('review', code, previous_code=previous)
+    assert ContextBudget.UNCHANGED_MARKER in compacted
+    assert "total = a + b" not in compacted
+    assert "result = b - a" in compacted
+    assert ContextBudget.collapsed_functions(compacted, ContextBudget.UNCHANGED_MARKER) == ["Calculator.add"]
+    assert ContextBudget.collapsed_functions(compacted, ContextBudget.OMITTED_MARKER) == []
+
+
+def test_compact_code_falls_back_to_signatures_over_the_limit():
+    budget = ContextBudget({'review': 10})
+    code = CODE + "\n".join(f"\ndef f{i}(x):\n    y = x * {i}\n    return y\n" for i in range(200))
+    compacted = budget.compact_code('review', code)
+    assert ContextBudget.OMITTED_MARKER in compacted or "lines omitted" in compacted
+    assert ContextBudget.count_tokens(compacted) < ContextBudget.count_tokens(code)
+
+
+def test_compact_feedback_respects_reserved_tokens():
+    budget = ContextBudget({'test_fix': 1000})
+    feedback = "\n".join(f"E   failure detail {i}" for i in range(2000))
+    compacted = budget.compact_feedback('test_fix', feedback, reserved=800)
+    assert ContextBudget.count_tokens(compacted) <= ContextBudget.MIN_SECTION_TOKENS + 20
+
+
+def test_stage_without_limit_is_not_truncated():
+    feedback = "\n".join(f"E   failure detail {i}" for i in range(2000))
+    assert ContextBudget().compact_feedback('unknown', feedback) == feedback
@@ -0,0 +1,91 @@
+import pytest
+
+from utils.json_extractor import JsonExtractor
+
+
+def test_bare_object():
+    assert JsonExtractor.extract('{"language": "python", "files": []}') == {'language': 'python', 'files': []}
+
+
+def test_object_in_markdown_fence():
+    text = 'Here is the manifest:\n```json\n{"language": "go"}\n```\nLet me know.'
+    assert JsonExtractor.extract(text) == {'language': 'go'}
+
+
+def test_object_after_prose_placeholders():
+    text = 'Replace {name} with the project name: {"name": "demo"}'
+    assert JsonExtractor.extract(text) == {'name': 'demo'}
+
+
+def test_nested_objects_and_arrays():
+    text = '{"a": {"b": [1, {"c": 2}]}, "d": []}'
+    assert JsonExtractor.extract(text) == {'a': {'b': [1, {'c': 2}]}, 'd': []}
+
+
+def test_braces_inside_strings():
+    text = '{"template": "}{ \\"quoted\\" {", "n": 1}'
+    assert JsonExtractor.extract(text) == {'template': '}{ "quoted" {', 'n': 1}
+
+
+def test_trailing_commas_are_dropped():
+    text = '{"files": ["a.py", "b.py",], "meta": {"x": 1,},}'
+    assert JsonExtractor.extract(text) == {'files': ['a.py', 'b.py'], 'meta': {'x': 1}}
+
+
+def test_comma_inside_string_is_kept():
+    assert JsonExtractor.extract('{"text": "a,]"}') == {'text': 'a,]'}
+
+
+def test_first_object_wins():
+    assert JsonExtractor.extract('{"first": 1} {"second": 2}') == {'first': 1}
+
+
+def test_object_nested_in_non_json_braces():
+    assert JsonExtractor.extract('{Result: {"ok": true}}') == {'ok': True}
+
+
+def test_object_after_unclosed_brace():
+    assert JsonExtractor.extract('Start with { and then {"ok": true} as the answer') == {'ok': True}
+
+
+def test_array_without_objects_raises():
+    with pytest.raises(ValueError):
+        JsonExtractor.extract('[1, 2, 3]')
+
+
+def test_object_inside_array_is_found():
+    assert JsonExtractor.extract('[{"a": 1}, {"b": 2}]') == {'a': 1}
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"truncated": [1, 2', "{not: json}"])
+def test_no_object_raises(text):
+    with pytest.raises(ValueError):
+        JsonExtractor.extract(text)
+
+
+def test_streamed_chunks():
+    text = 'Sure!\n```json\n{"language": "python", "files": [{"path": "src/app.py"}]}\n```'
+    extractor = JsonExtractor()
+    results = [extractor.feed(char) for char in text]
+    closing = text.index('}]}') + 3
+    assert results[closing - 2] is None
+    assert results[closing - 1] == {'language': 'python', 'files': [{'path': 'src/app.py'}]}
+    assert extractor.done
+
+
+def test_truncated_stream_has_no_result():
+    extractor = JsonExtractor()
+    assert extractor.feed('{"language": "py') is None
+    assert extractor.finish() is None
+    assert not extractor.done
+
+
+def test_feed_after_done_returns_result():
+    extractor = JsonExtractor()
+    extractor.feed('{"a": 1}')
+    assert extractor.feed('{"b": 2}') == {'a': 1}
+
+
+def test_deeply_nested_prose_is_scanned_once():
+    text = "{" * 5000 + "x" + "}" * 5000 + '{"ok": true}'
+    assert JsonExtractor.extract(text) == {'ok': True}
@@ -0,0 +1,160 @@
+import pytest
+
+from utils.patch_applier import PatchApplier, PatchError
+
+CODE = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a - b
+"""
+
+
+def block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+
+def test_search_replace_applies_block():
+    patched = PatchApplier.apply(CODE, block("    return a - b", "    return b - a"))
+    assert "return b - a" in patched
+    assert "return a + b" in patched
+    assert patched.endswith("\n")
+
+
+def test_search_replace_applies_blocks_in_order():
+    patch = block("def add(a, b):", "def add(a, b, c=0):") + "\n" + block("    return a + b", "    return a + b + c")
+    patched = PatchApplier.apply(CODE, patch)
+    assert "def add(a, b, c=0):\n    return a + b + c" in patched
+
+
+def test_search_replace_inside_markdown_fence():
+    patch = "Here is the fix:\n```python\n" + block("    return a - b", "    return b - a") + "\n```\n"
+    assert "return b - a" in PatchApplier.apply(CODE, patch)
+
+
+def test_search_replace_keeps_backtick_lines_inside_blocks():
+    code = 'USAGE = """\n```bash\npython app.py\n```\n"""\n'
+    search = "```bash\npython app.py\n```"
+    replace = "```bash\npython app.py\n```\n\n```bash\npython app.py --help\n```"
+    patched = PatchApplier.apply(code, "```python\n" + block(search, replace) + "\n```", validate_python=True)
+    assert patched == code.replace(search, replace)
+
+
+def test_unified_diff_inside_markdown_fence_keeps_backtick_lines():
+    code = 'TEXT = """\nold\n"""\n'
+    patch = '```diff\n@@ -1,3 +1,5 @@\n TEXT = """\n+```\n-old\n+new\n+```\n """\n```\n'
+    assert PatchApplier.apply(code, patch) == 'TEXT = """\n```\nnew\n```\n"""\n'
+
+
+def test_search_replace_tolerates_trailing_whitespace():
+    patched = PatchApplier.apply(CODE, block("def sub(a, b):   ", "def sub(x, y):"))
+    assert "def sub(x, y):" in patched
+
+
+def test_search_replace_missing_anchor_raises():
+    with pytest.raises(PatchError, match="not found"):
+        PatchApplier.apply(CODE, block("def mul(a, b):", "def mul(a, b, c):"))
+
+
+def test_search_replace_ambiguous_anchor_raises():
+    with pytest.raises(PatchError, match="found 2 times"):
+        PatchApplier.apply(CODE + "\n\ndef add(a, b):\n    return a + b\n", block("    return a + b", "    return 0"))
+
+
+def test_search_replace_failed_block_applies_nothing():
+    original = CODE
+    patch = block("    return a + b", "    return 0") + "\n" + block("missing", "x")
+    with pytest.raises(PatchError):
+        PatchApplier.apply(original, patch)
+    assert original == CODE
+
+
+def test_search_replace_empty_search_raises():
+    with pytest.raises(PatchError, match="empty search"):
+        PatchApplier.apply(CODE, "<<<<<<< SEARCH\n=======\nx = 1\n>>>>>>> REPLACE")
+
+
+def test_search_replace_unterminated_block_raises():
+    with pytest.raises(PatchError, match="Unterminated"):
+        PatchApplier.apply(CODE, "<<<<<<< SEARCH\n    return a + b\n=======\n    return 0\n")
+
+
+def test_search_replace_nested_block_raises():
+    with pytest.raises(PatchError, match="before the previous block"):
+        PatchApplier.apply(CODE, "<<<<<<< SEARCH\nx\n<<<<<<< SEARCH\n")
+
+
+def test_replacement_can_delete_lines():
+    patched = PatchApplier.apply(CODE, "<<<<<<< SEARCH\ndef sub(a, b):\n    return a - b\n=======\n>>>>>>> REPLACE")
+    assert "sub" not in patched
+
+
+def test_validate_python_rejects_broken_result():
+    with pytest.raises(PatchError, match="does not parse"):
+        PatchApplier.apply(CODE, block("    return a - b", "    return a -"), validate_python=True)
+
+
+def test_no_edits_raises():
+    with pytest.raises(PatchError, match="No search/replace blocks"):
+        PatchApplier.apply(CODE, "The code looks fine to me.")
+
+
+def test_unified_diff_applies_at_stated_position():
+    patch = """--- a/app.py
++++ b/app.py
+@@ -4,3 +4,3 @@
+ 
+ def sub(a, b):
+-    return a - b
++    return b - a
+"""
+    assert "return b - a" in PatchApplier.apply(CODE, patch)
+
+
+def test_unified_diff_finds_moved_hunk():
+    shifted = "import math\nimport os\n\n" + CODE
+    patch = """@@ -1,2 +1,2 @@
+ def add(a, b):
+-    return a + b
++    return math.fsum([a, b])
+"""
+    patched = PatchApplier.apply(shifted, patch)
+    assert "return math.fsum([a, b])" in patched
+    assert patched.startswith("import math\n")
+
+
+def test_unified_diff_tracks_offset_across_hunks():
+    patch = """@@ -1,2 +1,4 @@
++import math
++
+ def add(a, b):
+     return a + b
+@@ -5,2 +7,2 @@
+ def sub(a, b):
+-    return a - b
++    return math.fsum([a, -b])
+"""
+    patched = PatchApplier.apply(CODE, patch)
+    assert patched.startswith("import math\n\ndef add(a, b):")
+    assert "return math.fsum([a, -b])" in patched
+
+
+def test_unified_diff_mismatched_context_raises():
+    patch = """@@ -1,2 +1,2 @@
+ def mul(a, b):
+-    return a * b
++    return b * a
+"""
+    with pytest.raises(PatchError, match="Hunk 1 does not match"):
+        PatchApplier.apply(CODE, patch)
+
+
+def test_unified_diff_unexpected_line_raises():
+    with pytest.raises(PatchError, match="Unexpected line"):
+        PatchApplier.apply(CODE, "@@ -1,1 +1,1 @@\n*def add(a, b):\n")
+
+
+def test_missing_trailing_newline_is_kept():
+    patched = PatchApplier.apply("x = 1", block("x = 1", "x = 2"))
+    assert patched == "x = 2"
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from utils import static_gate
+from utils.static_gate import StaticGate
+
+
+def check(code, tmp_path, project_files=(), lint=False, file_name='app.py'):
+    return StaticGate.check(code, str(tmp_path / file_name), project_root=str(tmp_path),
+                            project_files=project_files, lint=lint)
+
+
+def test_clean_code_passes(tmp_path):
+    result = check("import os\nimport json\n\nprint(os.sep, json.dumps({}))\n", tmp_path)
+    assert result.passed
+    assert result.warnings == []
+
+
+def test_syntax_error_is_reported_with_location(tmp_path):
+    result = check("def broken(:\n    pass\n", tmp_path)
+    assert not result.passed
+    assert result.errors[0].startswith("line 1")
+    assert "SyntaxError" in result.errors[0]
+
+
+def test_third_party_import_is_a_warning_not_an_error(tmp_path):
+    result = check("import flask\nfrom flask import Flask\nimport requests.adapters\n", tmp_path)
+    assert result.passed
+    assert len(result.warnings) == 2
+    assert "'flask'" in result.warnings[0]
+    assert "'requests.adapters'" in result.warnings[1]
+
+
+def test_unresolved_import_is_reported_once_per_module(tmp_path):
+    (tmp_path / "mypkg").mkdir()
+    (tmp_path / "mypkg" / "__init__.py").write_text("")
+    result = check("import mypkg.missing\nimport mypkg.missing\nfrom mypkg.missing import x\n", tmp_path)
+    assert result.errors == ["line 1: cannot resolve import 'mypkg.missing' in the project"]
+
+
+def test_imports_resolve_against_the_generated_tree(tmp_path):
+    (tmp_path / "models.py").write_text("class User: pass\n")
+    result = check("from models import User\nfrom services.billing import charge\n", tmp_path,
+                   project_files=["services/billing.py"])
+    assert result.passed
+    assert result.warnings == []
+
+
+def test_missing_relative_import_is_an_error(tmp_path):
+    result = check("from .helpers import tool\n", tmp_path)
+    assert result.errors == ["line 1: unresolved relative import '.helpers'"]
+
+
+def test_guarded_imports_are_allowed_to_fail(tmp_path):
+    code = "try:\n    import ujson as json\nexcept ImportError:\n    import json\n"
+    result = check(code, tmp_path)
+    assert result.passed
+    assert result.warnings == []
+
+
+def test_unguarded_try_does_not_hide_imports(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    code = "try:\n    import pkg.gone\nexcept KeyError:\n    pass\n"
+    assert not check(code, tmp_path).passed
+
+
+def test_report_lists_errors_and_warnings(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    result = check("import flask\nimport pkg.gone\n", tmp_path)
+    report = result.report()
+    assert report.startswith(f"Static checks found 1 error(s) in {tmp_path / 'app.py'}")
+    assert "- line 2: cannot resolve import 'pkg.gone' in the project" in report
+    assert "Warnings:" in report
+
+
+@pytest.mark.skipif(not static_gate.PYFLAKES_AVAILABLE, reason="pyflakes is not installed")
+def test_lint_errors_fail_and_style_findings_warn(tmp_path):
+    result = check("import os\n\ndef f():\n    return undefined_name\n", tmp_path, lint=True)
+    assert any("undefined_name" in error for error in result.errors)
+    assert any("imported but unused" in warning for warning in result.warnings)
+
+
+def test_file_in_a_subdirectory_resolves_siblings(tmp_path):
+    os.makedirs(tmp_path / "app")
+    (tmp_path / "app" / "utils.py").write_text("")
+    result = check("import utils\n", tmp_path, file_name=os.path.join("app", "main.py"))
+    assert result.passed
@@ -0,0 +1,178 @@
+from utils.test_reconciler import TestReconciler
+
+CODE = '''
+import math
+
+
+class Calculator:
+    def __init__(self, base=0):
+        self.base = base
+
+    def add(self, a, b):
+        return self.base + a + b
+
+    @staticmethod
+    def sqrt(x):
+        return math.sqrt(x)
+
+    def _private(self):
+        pass
+
+
+def square(x, *, exact=False):
+    return x * x
+
+
+def total(*values, **options):
+    return sum(values)
+'''
+
+IMPLEMENTATION = 'src/calculator.py'
+
+
+def stale(tests, code=CODE, previous_code=None):
+    return TestReconciler.stale_tests(code, tests, IMPLEMENTATION, previous_code)
+
+
+def test_interfaces_cover_functions_classes_and_methods():
+    interfaces = TestReconciler.interfaces(CODE)
+    assert set(interfaces) == {'Calculator', 'Calculator.add', 'Calculator.sqrt', 'square', 'total'}
+    assert interfaces['Calculator'] == {(0, 1, ('base',), 0)}
+    assert interfaces['Calculator.add'] == {(2, 2, ('a', 'b'), 0)}
+    assert interfaces['Calculator.sqrt'] == {(1, 1, ('x',), 0)}
+    assert interfaces['total'] == {(0, None, None, 0)}
+
+
+def test_matching_tests_are_not_stale():
+    tests = '''
+from calculator import Calculator, square, total
+
+def test_add():
+    assert Calculator(1).add(1, 2) == 4
+
+def test_square():
+    assert square(3, exact=True) == 9
+
+def test_total():
+    assert total(1, 2, 3, strict=True) == 6
+'''
+    assert stale(tests) == {}
+
+
+def test_calls_on_unrelated_objects_are_ignored():
+    tests = '''
+from calculator import Calculator
+
+def test_set_add():
+    seen = set()
+    seen.add(1)
+    assert Calculator().add(1, 2) == 3
+'''
+    assert stale(tests) == {}
+
+
+def test_missing_import_marks_the_tests_using_it():
+    tests = '''
+from calculator import Calculator, cube
+
+def test_cube():
+    assert cube(2) == 8
+
+def test_add():
+    assert Calculator().add(1, 2) == 3
+'''
+    result = stale(tests)
+    assert result['(imports)'] == [f"imports cube, which {IMPLEMENTATION} does not define"]
+    assert result['test_cube'] == ["uses cube, which does not exist"]
+    assert 'test_add' not in result
+
+
+def test_wrong_arity_on_local_instance():
+    tests = '''
+from calculator import Calculator
+
+def test_add():
+    calc = Calculator()
+    assert calc.add(1) == 1
+'''
+    assert stale(tests) == {'test_add': ["line 6: calls Calculator.add with arguments its signature does not accept"]}
+
+
+def test_wrong_arity_through_fixture_and_self_attribute():
+    tests = '''
+import pytest
+from calculator import Calculator
+
+@pytest.fixture
+def calc():
+    return Calculator()
+
+def test_fixture(calc):
+    calc.add(1, 2, 3)
+
+class TestCalculator:
+    def setup_method(self):
+        self.calc = Calculator()
+
+    def test_add(self):
+        self.calc.add(b=2)
+'''
+    result = stale(tests)
+    assert set(result) == {'test_fixture', 'TestCalculator.test_add'}
+
+
+def test_unknown_keyword_and_aliased_import():
+    tests = '''
+from calculator import square as sq
+
+def test_square():
+    assert sq(3, precise=True) == 9
+'''
+    assert stale(tests) == {'test_square': ["line 5: calls square with arguments its signature does not accept"]}
+
+
+def test_module_attribute_calls_are_checked():
+    tests = '''
+import calculator as calc
+
+def test_square():
+    assert calc.square() == 0
+
+def test_class():
+    assert calc.Calculator(1, 2).add(1, 2)
+'''
+    result = stale(tests)
+    assert set(result) == {'test_square', 'test_class'}
+
+
+def test_static_method_called_on_the_class():
+    tests = '''
+from calculator import Calculator
+
+def test_sqrt():
+    assert Calculator.sqrt(4) == 2
+'''
+    assert stale(tests) == {}
+
+
+def test_changed_signature_marks_its_users_only():
+    previous = CODE.replace("def add(self, a, b):", "def add(self, a):")
+    tests = '''
+from calculator import Calculator, square
+
+def test_add():
+    assert Calculator().add(1, 2) == 3
+
+def test_square():
+    assert square(2) == 4
+'''
+    assert stale(tests, previous_code=previous) == {'test_add': ["uses Calculator.add, whose signature changed"]}
+
+
+def test_unparsable_input_gives_no_result():
+    assert stale("def test_broken(:\n") == {}
+    assert stale("from calculator import square\n", code="def broken(:\n") == {}
+
+
+def test_describe_lists_reasons():
+    assert TestReconciler.describe({'test_a': ["one", "two"]}) == "- test_a: one; two"
@@ -0,0 +1,128 @@
+import os
+import xml.etree.ElementTree as ET
+
+
+class PytestCase:
+    """
+    Outcome of a single test: passed, failed, error or skipped.
+    """
+
+    def __init__(self, name, outcome, duration=0.0, traceback=None):
+        self.name = name
+        self.outcome = outcome
+        self.duration = duration
+        self.traceback = traceback
+
+    def to_dict(self):
+        return {'name': self.name, 'outcome': self.outcome, 'duration': self.duration, 'traceback': self.traceback}
+
+
+class PytestResult:
+    """
+    Typed result of a pytest run, built from a junit-xml report or the worker pool's collector.
+    """
+
+    def __init__(self, cases=None, exit_code=0, output="", error=""):
+        self.cases = cases or []
+        self.exit_code = exit_code
+        self.output = output
+        self.error = error
+
+    def _count(self, outcome):
+        return sum(1 for case in self.cases if case.outcome == outcome)
+
+    @property
+    def passed(self):
+        return self._count('passed')
+
+    @property
+    def failed(self):
+        return self._count('failed')
+
+    @property
+    def errors(self):
+        return self._count('error')
+
+    @property
+    def skipped(self):
+        return self._count('skipped')
+
+    @property
+    def success(self):
+        """
+        True when pytest exited cleanly, at least one test ran and nothing failed.
+        """
+        return self.exit_code == 0 and self.passed > 0 and self.failed == 0 and self.errors == 0
+
+    def failing_cases(self):
+        return [case for case in self.cases if case.outcome in ('failed', 'error')]
+
+    def counts(self):
+        return {'passed': self.passed, 'failed': self.failed, 'errors': self.errors, 'skipped': self.skipped}
+
+    def summary(self):
+        """
+        One-line summary of the run.
+        """
+        if self.success:
+            return f"ALL TESTS PASSED ({self.passed} passed)"
+        return (f"TEST SUMMARY: {self.passed} passed, {self.failed} failed, {self.errors} errors, "
+                f"{self.skipped} skipped (exit code {self.exit_code})")
+
+    def failure_report(self):
+        """
+        Tracebacks of the failing tests only. Falls back to the raw output when pytest
+        failed before any test ran (e.g. an import error during collection).
+        """
+        failing = self.failing_cases()
+        if not failing:
+            return f"{self.summary()}\n{self.error}\n{self.output}".strip()
+
+        sections = [self.summary()]
+        for case in failing:
+            sections.append(f"{case.outcome.upper()}: {case.name}\n{case.traceback or ''}".rstrip())
+        return "\n\n".join(sections)
+
+    def to_dict(self):
+        return {
+            'exit_code': self.exit_code,
+            'counts': self.counts(),
+            'cases': [case.to_dict() for case in self.cases],
+        }
+
+    @classmethod
+    def from_worker_result(cls, result):
+        """
+        Builds a result from the dict returned by PytestWorkerPool.run.
+        """
+        cases = []
+        for report in result.get('results', []):
+            outcome = report['outcome']
+            # Failures outside the test body (setup/teardown) are errors, as in junit-xml
+            if outcome == 'failed' and report.get('when') != 'call':
+                outcome = 'error'
+            cases.append(PytestCase(report['nodeid'], outcome, report.get('duration', 0.0), report.get('longrepr')))
+        return cls(cases, result['exit_code'], result.get('output', ''), result.get('error', ''))
+
+
+def parse_junit_xml(path):
+    """
+    Parses a pytest junit-xml report into a list of PytestCase.
+    """
+    if not os.path.exists(path):
+        return []
+
+    cases = []
+    for testcase in ET.parse(path).getroot().iter('testcase'):
+        name = "::".join(part for part in (testcase.get('classname'), testcase.get('name')) if part)
+        outcome, traceback = 'passed', None
+        for child in testcase:
+            if child.tag in ('failure', 'error'):
+                outcome = 'failed' if child.tag == 'failure' else 'error'
+                traceback = child.text or child.get('message')
+                break
+            if child.tag == 'skipped':
+                outcome = 'skipped'
+                traceback = child.get('message')
+        cases.append(PytestCase(name, outcome, float(testcase.get('time') or 0.0), traceback))
+    return cases
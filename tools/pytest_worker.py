@@ -0,0 +1,99 @@
+"""
+Long-lived pytest worker process used by PytestWorkerPool.
+
+Reads one JSON job per line from stdin ({"file": ..., "pythonpath": [...]}) and writes one
+JSON result per line. pytest stays imported between jobs; modules imported from the
+project under test are dropped after each job so every run starts from a clean namespace.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+
+# Keep the protocol channel private: anything the tests print to fd 1 goes to stderr instead
+_protocol = os.fdopen(os.dup(1), 'w')
+os.dup2(2, 1)
+
+import pytest
+
+
+class _ResultCollector:
+    """
+    pytest plugin that records the outcome and duration of every test.
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == 'call' or report.outcome != 'passed':
+            self.results.append({
+                'nodeid': report.nodeid,
+                'when': report.when,
+                'outcome': report.outcome,
+                'duration': report.duration,
+                'longrepr': str(report.longrepr) if report.longrepr else None,
+            })
+
+
+def _is_project_module(module, roots):
+    path = getattr(module, '__file__', None)
+    if not path:
+        return False
+    path = os.path.abspath(path)
+    return any(path.startswith(root + os.sep) for root in roots)
+
+
+def run_job(job):
+    file_path = job['file']
+    roots = [os.path.abspath(p) for p in job.get('pythonpath', [])]
+    roots.append(os.path.dirname(os.path.abspath(file_path)))
+
+    saved_path = list(sys.path)
+    saved_env = os.environ.get('PYTHONPATH')
+    sys.path[:0] = [p for p in job.get('pythonpath', [])]
+    os.environ['PYTHONPATH'] = os.pathsep.join(job.get('pythonpath', []) + ([saved_env] if saved_env else []))
+
+    collector = _ResultCollector()
+    output = io.StringIO()
+    error = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(error):
+            exit_code = int(pytest.main([file_path, '-v', '-p', 'no:cacheprovider'] + job.get('args', []),
+                                        plugins=[collector]))
+    except BaseException as e:  # pytest may raise SystemExit or errors from conftest imports
+        exit_code = 3
+        error.write(f"{type(e).__name__}: {e}\n")
+    finally:
+        sys.path[:] = saved_path
+        if saved_env is None:
+            os.environ.pop('PYTHONPATH', None)
+        else:
+            os.environ['PYTHONPATH'] = saved_env
+        for name, module in list(sys.modules.items()):
+            if name == 'conftest' or _is_project_module(module, roots):
+                del sys.modules[name]
+
+    return {
+        'exit_code': exit_code,
+        'output': output.getvalue(),
+        'error': error.getvalue(),
+        'results': collector.results,
+    }
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = run_job(json.loads(line))
+        except Exception as e:
+            result = {'exit_code': 3, 'output': '', 'error': f"Worker error: {e}", 'results': []}
+        _protocol.write(json.dumps(result) + "\n")
+        _protocol.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+from queue import Queue, Empty
+import atexit
+import json
+import logging
+import os
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pytest_worker.py')
+
+
+class _Worker:
+    """
+    One warm pytest worker process and the thread that reads its results.
+    """
+
+    def __init__(self, python):
+        self.process = subprocess.Popen(
+            [python, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        self.responses = Queue()
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)
+
+    def request(self, job, timeout):
+        """
+        Sends a job and waits for its result. Raises TimeoutError or RuntimeError
+        if the worker does not answer.
+        """
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        try:
+            line = self.responses.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError(f"pytest worker did not finish within {timeout}s")
+        if line is None:
+            raise RuntimeError(f"pytest worker exited with code {self.process.poll()}")
+        return json.loads(line)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class PytestWorkerPool:
+    """
+    Pool of warm pytest worker processes.
+
+    Each worker keeps the interpreter and pytest loaded and runs one test file per job,
+    which avoids the interpreter and pytest start-up cost of a fresh subprocess per run.
+    A worker that times out or dies is replaced.
+    """
+
+    def __init__(self, size=2, python="python"):
+        self.size = size
+        self.python = python
+        self._idle = Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(_Worker(python))
+
+    def run(self, file_path, pythonpath=None, timeout=60):
+        """
+        Runs pytest on a file in a warm worker.
+        Returns a dict with exit_code, output, error and per-test results.
+        """
+        if self._closed:
+            raise RuntimeError("PytestWorkerPool is closed")
+
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker = _Worker(self.python)
+            return worker.request({'file': file_path, 'pythonpath': list(pythonpath or [])}, timeout)
+        except (TimeoutError, RuntimeError, OSError, ValueError):
+            logger.warning(f"Replacing pytest worker after a failed run of {file_path}")
+            worker.stop()
+            worker = _Worker(self.python)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """
+        Stops every worker process.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except Empty:
+                break
+
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+
+def get_shared_pool(size=2):
+    """
+    Returns the process-wide worker pool of the given size, creating it on first use.
+    Workflows asking for the same number of workers share one pool.
+    """
+    with _shared_pools_lock:
+        pool = _shared_pools.get(size)
+        if pool is None:
+            pool = _shared_pools[size] = PytestWorkerPool(size=size)
+            atexit.register(pool.close)
+        return pool
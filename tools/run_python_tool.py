@@ -1,13 +1,52 @@
+import asyncio
+import contextlib
+import contextvars
 import subprocess
 import os
 import sys
+import tempfile
+import time
 from crewai.tools import BaseTool
-from typing import Optional, Annotated
+from typing import Optional, Annotated, ClassVar
+from tools.pytest_results import PytestResult, parse_junit_xml
+from tools.pytest_worker_pool import get_shared_pool
+from utils.run_metrics import current_metrics
+from utils.workspace import current_workspace
+
+_event_loop_runner = contextvars.ContextVar('event_loop_runner', default=None)
+
+
+def current_event_loop_runner():
+    """
+    Returns the function that runs coroutines on the event loop of the asyncio workflow
+    running in the current context, or None.
+    """
+    return _event_loop_runner.get()
+
+
+@contextlib.contextmanager
+def event_loop_runner(run_on_loop):
+    """
+    Within the block, RunPythonGetOutput runs its subprocesses as asyncio subprocesses
+    through `run_on_loop(coroutine_function, *args)`, which waits for their result.
+    """
+    token = _event_loop_runner.set(run_on_loop)
+    try:
+        yield
+    finally:
+        _event_loop_runner.reset(token)
 
 
 class RunPythonGetOutput(BaseTool):
     name: str = "RunPythonGetOutput"
     description: str = "Runs a Python file and returns its output"
+    # Number of warm pytest workers to run tests in; 0 starts a fresh pytest subprocess per run
+    pytest_workers: int = 0
+    # Seconds a test run may take before it is stopped and counted as failed
+    test_timeout: float = 60
+
+    # pytest's exit code for an interrupted run, used for runs that timed out or lost their worker
+    FAILED_RUN_EXIT_CODE: ClassVar[int] = 2
 
     def _run(self, file_path: str, is_test: bool = False) -> str:
         """
@@ -20,63 +59,225 @@ class RunPythonGetOutput(BaseTool):
         Returns:
             The output of the Python script
         """
+        run_on_loop = current_event_loop_runner()
+        if run_on_loop is not None:
+            # Under the asyncio workflow; its cancellation propagates out of the tool
+            return run_on_loop(self._run_async, file_path, is_test)
+
         try:
             if not os.path.exists(file_path):
                 return f"Error: File '{file_path}' does not exist."
 
-            # Get the absolute path to the directory containing the file
-            file_dir = os.path.dirname(os.path.abspath(file_path))
-
-            # Find the src directory that should be used as the project root
-            if file_path.startswith('./src/'):
-                project_root = './src'
-            else:
-                project_root = os.path.abspath(os.path.dirname(file_path))
-                while os.path.basename(project_root) != 'src' and project_root != '/':
-                    parent = os.path.dirname(project_root)
-                    if parent == project_root:  # Reached the filesystem root
-                        break
-                    project_root = parent
-
-            # Set PYTHONPATH environment to include the project root
-            env = os.environ.copy()
-            if 'PYTHONPATH' in env:
-                env['PYTHONPATH'] = f"{os.path.abspath(project_root)}:{env['PYTHONPATH']}"
-            else:
-                env['PYTHONPATH'] = os.path.abspath(project_root)
-
             if is_test:
-                # If running tests, use pytest with the project root in sys.path
-                result = subprocess.run(
-                    ["python", "-m", "pytest", file_path, "-v"],
-                    capture_output=True,
-                    text=True,
-                    timeout=60,
-                    env=env
+                result = self.run_tests(file_path)
+                output = self._format_output(file_path, result.exit_code, result.output, result.error)
+                return f"{output}\n{result.summary()}"
+
+            # Normal Python execution with the project root in sys.path
+            start = time.time()
+            result = subprocess.run(
+                ["python", file_path],
+                capture_output=True,
+                text=True,
+                timeout=30,
+                env=self._environment(self._project_root(file_path))
+            )
+            self._record_subprocess('python', file_path, start, result.returncode)
+
+            return self._format_output(file_path, result.returncode, result.stdout, result.stderr)
+
+        except (subprocess.TimeoutExpired, TimeoutError):
+            return f"Error: Execution of '{file_path}' timed out."
+        except Exception as e:
+            return f"Error running {file_path}: {str(e)}"
+
+    def run_tests(self, file_path: str) -> PytestResult:
+        """
+        Run a test file with pytest and return a structured result with per-test
+        outcomes, durations and failure tracebacks.
+        """
+        if not os.path.exists(file_path):
+            return PytestResult(exit_code=4, error=f"Error: File '{file_path}' does not exist.")
+
+        project_root = self._project_root(file_path)
+        start = time.time()
+
+        if self.pytest_workers > 0:
+            # Run the tests in a warm worker with the project root in sys.path
+            try:
+                result = get_shared_pool(self.pytest_workers).run(
+                    file_path,
+                    pythonpath=[os.path.abspath(project_root)],
+                    timeout=self.test_timeout
                 )
-            else:
-                # Normal Python execution with the project root in sys.path
+            except (TimeoutError, RuntimeError) as e:
+                # A hanging test or a dead worker is a failed run, not a failed generation
+                self._record_subprocess('pytest_worker', file_path, start, self.FAILED_RUN_EXIT_CODE)
+                return self._failed_run(file_path, str(e))
+            self._record_subprocess('pytest_worker', file_path, start, result['exit_code'])
+            return PytestResult.from_worker_result(result)
+
+        # Use pytest with the project root in sys.path and a machine-readable report
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_file = os.path.join(report_dir, "report.xml")
+            try:
                 result = subprocess.run(
-                    ["python", file_path],
+                    self._pytest_command(file_path, report_file),
                     capture_output=True,
                     text=True,
-                    timeout=30,
-                    env=env
+                    timeout=self.test_timeout,
+                    env=self._environment(project_root)
                 )
+            except subprocess.TimeoutExpired as e:
+                self._record_subprocess('pytest', file_path, start, self.FAILED_RUN_EXIT_CODE)
+                return self._failed_run(file_path, f"pytest did not finish within {self.test_timeout}s",
+                                        e.stdout, parse_junit_xml(report_file))
+            cases = parse_junit_xml(report_file)
+        self._record_subprocess('pytest', file_path, start, result.returncode)
 
-            output = result.stdout
-            error = result.stderr
-            exit_code = result.returncode
+        return PytestResult(cases, result.returncode, result.stdout, result.stderr)
 
-            if exit_code != 0:
-                return f"Error (exit code {exit_code}) running {file_path}:\n{error}\n{output}"
+    async def _run_async(self, file_path: str, is_test: bool = False) -> str:
+        """
+        _run for the asyncio workflow: the file or its tests run as asyncio subprocesses.
+        """
+        try:
+            if not os.path.exists(file_path):
+                return f"Error: File '{file_path}' does not exist."
 
-            if error:
-                return f"Warning while running {file_path}:\n{error}\n\nOutput:\n{output}"
+            if is_test:
+                result = await self.run_tests_async(file_path)
+                output = self._format_output(file_path, result.exit_code, result.output, result.error)
+                return f"{output}\n{result.summary()}"
+
+            start = time.time()
+            returncode, stdout, stderr = await self._communicate(
+                ["python", file_path], self._environment(self._project_root(file_path)), timeout=30
+            )
+            self._record_subprocess('python', file_path, start, returncode)
 
-            return f"Output from {file_path} (success):\n{output}"
+            return self._format_output(file_path, returncode, stdout, stderr)
 
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             return f"Error: Execution of '{file_path}' timed out."
         except Exception as e:
-            return f"Error running {file_path}: {str(e)}"
\ No newline at end of file
+            return f"Error running {file_path}: {str(e)}"
+
+    @staticmethod
+    async def _communicate(command, env, timeout):
+        """
+        Runs a command as an asyncio subprocess and returns (exit code, stdout, stderr). The
+        process is killed when the calling task is cancelled or the timeout expires, which
+        raises asyncio.TimeoutError.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except BaseException:
+            # Timed out or cancelled: do not leave the process running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+    async def run_tests_async(self, file_path: str, timeout: Optional[float] = None) -> PytestResult:
+        """
+        run_tests for asyncio callers: pytest runs as an asyncio subprocess, which is killed
+        when the calling task is cancelled or the timeout expires.
+        """
+        timeout = self.test_timeout if timeout is None else timeout
+        if self.pytest_workers > 0 or not os.path.exists(file_path):
+            return await asyncio.to_thread(self.run_tests, file_path)
+
+        project_root = self._project_root(file_path)
+        start = time.time()
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_file = os.path.join(report_dir, "report.xml")
+            try:
+                returncode, stdout, stderr = await self._communicate(
+                    self._pytest_command(file_path, report_file), self._environment(project_root), timeout
+                )
+            except asyncio.TimeoutError:
+                self._record_subprocess('pytest', file_path, start, self.FAILED_RUN_EXIT_CODE)
+                return self._failed_run(file_path, f"pytest did not finish within {timeout}s",
+                                        cases=parse_junit_xml(report_file))
+            cases = parse_junit_xml(report_file)
+        self._record_subprocess('pytest', file_path, start, returncode)
+
+        return PytestResult(cases, returncode, stdout, stderr)
+
+    @staticmethod
+    def _failed_run(file_path, reason, output=None, cases=None):
+        """
+        Result of a test run that did not complete, e.g. a hanging test or a dead worker:
+        it fails with the reason as its error, so the fix loop sees it like a failing test.
+        """
+        if isinstance(output, bytes):
+            output = output.decode(errors='replace')
+        return PytestResult(cases, RunPythonGetOutput.FAILED_RUN_EXIT_CODE, output or "",
+                            f"Error: Tests in '{file_path}' did not complete: {reason}")
+
+    @staticmethod
+    def _pytest_command(file_path, report_file):
+        return ["python", "-m", "pytest", file_path, "-v", f"--junitxml={report_file}"]
+
+    @staticmethod
+    def _record_subprocess(kind, file_path, start, exit_code):
+        """
+        Reports the subprocess time to the metrics of the running workflow, if any.
+        """
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.record_subprocess(kind, file_path, start, exit_code)
+
+    @staticmethod
+    def _project_root(file_path):
+        """
+        Find the src directory that should be used as the project root.
+        Files in the workspace of the running workflow use the workspace's src directory.
+        """
+        workspace = current_workspace()
+        if workspace is not None and workspace.contains(file_path):
+            return workspace.src_dir
+
+        if file_path.startswith('./src/'):
+            return './src'
+
+        project_root = os.path.abspath(os.path.dirname(file_path))
+        while os.path.basename(project_root) != 'src' and project_root != '/':
+            parent = os.path.dirname(project_root)
+            if parent == project_root:  # Reached the filesystem root
+                break
+            project_root = parent
+        return project_root
+
+    @staticmethod
+    def _environment(project_root):
+        """
+        Set PYTHONPATH environment to include the project root.
+        """
+        env = os.environ.copy()
+        if 'PYTHONPATH' in env:
+            env['PYTHONPATH'] = f"{os.path.abspath(project_root)}:{env['PYTHONPATH']}"
+        else:
+            env['PYTHONPATH'] = os.path.abspath(project_root)
+        return env
+
+    @staticmethod
+    def _format_output(file_path, exit_code, output, error):
+        """
+        Formats the outcome of a run for the agent.
+        """
+        if exit_code != 0:
+            return f"Error (exit code {exit_code}) running {file_path}:\n{error}\n{output}"
+
+        if error:
+            return f"Warning while running {file_path}:\n{error}\n\nOutput:\n{output}"
+
+        return f"Output from {file_path} (success):\n{output}"
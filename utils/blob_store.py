@@ -0,0 +1,221 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request that clones a file's extents (copy-on-write) on btrfs, XFS and similar
+_FICLONE = 0x40049409
+
+
+class BlobStore:
+    """
+    Content-addressed archive of generated projects.
+
+    Every file is stored once, zlib-compressed, under the SHA-256 of its content, and each
+    archived run keeps a manifest mapping its paths to hashes. Runs are materialized back
+    into a directory tree by copying, or by reflinking or hard-linking from a cache of
+    decompressed blobs that is only built for those methods and dropped by gc().
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.raw_dir = os.path.join(root, "raw")
+        self.manifests_dir = os.path.join(root, "manifests")
+        for directory in (self.objects_dir, self.manifests_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _sharded(base, digest, suffix=""):
+        return os.path.join(base, digest[:2], digest[2:] + suffix)
+
+    def _write_atomic(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put(self, data):
+        """
+        Stores bytes and returns their hash. Content that is already stored is not written again.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = BlobStore._sharded(self.objects_dir, digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, zlib.compress(data, 6))
+        return digest
+
+    def get(self, digest):
+        with open(BlobStore._sharded(self.objects_dir, digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def archive(self, project_dir, run_name=None, remove=False):
+        """
+        Stores every file of a project directory and writes the run's manifest.
+        With remove, the directory is deleted once the manifest is written.
+        Returns the run name.
+        """
+        run_name = run_name or os.path.basename(os.path.normpath(project_dir))
+        files = {}
+        for root, _, names in os.walk(project_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                files[os.path.relpath(path, project_dir)] = {
+                    'hash': self.put(data),
+                    'size': len(data),
+                    'mode': stat.S_IMODE(os.stat(path).st_mode),
+                }
+
+        manifest = {'version': BlobStore.MANIFEST_VERSION, 'run': run_name, 'archived': time.time(), 'files': files}
+        self._write_atomic(self.manifest_path(run_name), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+        logger.info(f"Archived {len(files)} files of {project_dir} as '{run_name}'")
+
+        if remove:
+            shutil.rmtree(project_dir)
+        return run_name
+
+    def manifest_path(self, run_name):
+        return os.path.join(self.manifests_dir, f"{run_name}.json")
+
+    def load_manifest(self, run_name):
+        path = self.manifest_path(run_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No archived run named '{run_name}'")
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def runs(self):
+        return sorted(name[:-len(".json")] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+
+    def _raw_blob(self, digest, mode):
+        """
+        Decompressed, read-only copy of a blob for linking, created on first use.
+        """
+        read_only = mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        path = BlobStore._sharded(self.raw_dir, digest, f"-{read_only:o}")
+        if not os.path.exists(path):
+            self._write_atomic(path, self.get(digest))
+            os.chmod(path, read_only)
+        return path
+
+    @staticmethod
+    def _reflink(source, target):
+        if fcntl is None:
+            return False
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                return True
+            except OSError:
+                pass
+        os.remove(target)
+        return False
+
+    def materialize(self, run_name, target_dir, method='auto'):
+        """
+        Recreates an archived run under target_dir and returns the number of files.
+
+        method is 'reflink' (copy-on-write clone), 'hardlink' (files are read-only, since
+        they share storage with the store), 'copy', or 'auto': reflinks where the filesystem
+        supports them, copies otherwise.
+        """
+        if method not in ('auto', 'reflink', 'hardlink', 'copy'):
+            raise ValueError(f"Unknown materialize method: {method}")
+
+        files = self.load_manifest(run_name)['files']
+        for directory in {os.path.dirname(os.path.join(target_dir, path)) for path in files}:
+            os.makedirs(directory, exist_ok=True)
+
+        use_reflink = method in ('auto', 'reflink')
+        for relative_path, entry in files.items():
+            target = os.path.join(target_dir, relative_path)
+            if os.path.lexists(target):
+                os.remove(target)
+
+            if method == 'hardlink':
+                os.link(self._raw_blob(entry['hash'], entry['mode']), target)
+                continue
+
+            if use_reflink and BlobStore._reflink(self._raw_blob(entry['hash'], entry['mode']), target):
+                os.chmod(target, entry['mode'])
+                continue
+            if method == 'reflink':
+                raise OSError(errno.EOPNOTSUPP, "The filesystem does not support reflinks", target)
+            # No need to try reflinks for the remaining files
+            use_reflink = False
+
+            with open(target, 'wb') as f:
+                f.write(self.get(entry['hash']))
+            os.chmod(target, entry['mode'])
+
+        logger.info(f"Materialized {len(files)} files of '{run_name}' into {target_dir}")
+        return len(files)
+
+    def stats(self):
+        """
+        Sizes of the store: logical bytes of all archived runs versus unique and compressed bytes.
+        """
+        logical, unique = 0, {}
+        for run_name in self.runs():
+            for entry in self.load_manifest(run_name)['files'].values():
+                logical += entry['size']
+                unique[entry['hash']] = entry['size']
+
+        stored = 0
+        for root, _, names in os.walk(self.objects_dir):
+            stored += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+
+        return {
+            'runs': len(self.runs()),
+            'objects': len(unique),
+            'logical_bytes': logical,
+            'unique_bytes': sum(unique.values()),
+            'stored_bytes': stored,
+        }
+
+    def gc(self):
+        """
+        Deletes blobs that no manifest references any more and the cache of decompressed
+        blobs; hard-linked files that were materialized from it keep their content.
+        Returns the number of blobs removed.
+        """
+        referenced = set()
+        for run_name in self.runs():
+            referenced.update(entry['hash'] for entry in self.load_manifest(run_name)['files'].values())
+
+        removed = 0
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if os.path.basename(root) + name in referenced:
+                    continue
+                os.remove(os.path.join(root, name))
+                removed += 1
+
+        shutil.rmtree(self.raw_dir, ignore_errors=True)
+        return removed
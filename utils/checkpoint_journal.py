@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of a generation in progress, kept in its project directory.
+
+    The first entry records the specification and workflow options, followed by the output
+    of every completed stage and the state of the review and test loops. A failed run can be
+    resumed from the journal: completed stages are reused and loops continue where they stopped.
+    """
+
+    FILE_NAME = "checkpoint.jsonl"
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.path = os.path.join(project_dir, CheckpointJournal.FILE_NAME)
+        self.run = None
+        self.stages = {}
+        self.loops = {}
+        self.completed = False
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            self._replay()
+
+    def _replay(self):
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; everything before it is intact
+                    logger.warning(f"Ignoring incomplete checkpoint entry at {self.path}:{number}")
+                    continue
+                valid_size = f.tell()
+                kind = entry.get('type')
+                if kind == 'run':
+                    self.run = entry
+                elif kind == 'stage':
+                    self.stages[entry['stage']] = {'fingerprint': entry['fingerprint'], 'output': entry['output']}
+                elif kind == 'loop':
+                    self.loops[entry['loop']] = {'input': entry['input'], 'state': entry['state']}
+                elif kind == 'complete':
+                    self.completed = True
+
+        # Drop a partial last line so that new entries start on a line of their own
+        if os.path.getsize(self.path) > valid_size:
+            os.truncate(self.path, valid_size)
+        logger.info(f"Loaded {len(self.stages)} completed stages from {self.path}")
+
+    def _append(self, entry):
+        entry['time'] = time.time()
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha256((text or "").encode('utf-8')).hexdigest()
+
+    def start(self, spec, spec_source=None, options=None):
+        """
+        Records the specification and options of the run, unless the journal already has them.
+        """
+        if self.run is not None:
+            return
+        self.run = {'type': 'run', 'spec': spec, 'spec_source': spec_source, 'options': options or {}}
+        self._append(dict(self.run))
+
+    def record_stage(self, stage, fingerprint, output):
+        self.stages[stage] = {'fingerprint': fingerprint, 'output': output}
+        self._append({'type': 'stage', 'stage': stage, 'fingerprint': fingerprint, 'output': output})
+
+    def record_loop(self, loop, input_text, state):
+        """
+        Records the state of a loop that started from input_text.
+        """
+        self.loops[loop] = {'input': CheckpointJournal._hash(input_text), 'state': state}
+        self._append({'type': 'loop', 'loop': loop, 'input': CheckpointJournal._hash(input_text), 'state': state})
+
+    def loop_state(self, loop, input_text):
+        """
+        Returns the last recorded state of a loop if it started from the same input, otherwise None.
+        """
+        saved = self.loops.get(loop)
+        if saved and saved['input'] == CheckpointJournal._hash(input_text):
+            return saved['state']
+        return None
+
+    def complete(self):
+        self.completed = True
+        self._append({'type': 'complete'})
@@ -0,0 +1,298 @@
+import ast
+import logging
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Verbose pytest lines of passing tests, e.g. "tests/test_app.py::test_add PASSED [ 50%]"
+_PASSED_LINE = re.compile(r"^(\S+::\S+.*\sPASSED\b|PASSED\s+\S+::\S+)")
+# Header of a frame in a Python traceback
+_FRAME_HEADER = re.compile(r'^(\s*)File "[^"]+", line \d+, in .+$')
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding is downloaded on first use; count characters when that is not possible
+            logger.warning(f"tiktoken encoding unavailable, estimating tokens from characters: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+class ContextBudget:
+    """
+    Keeps the variable parts of fix, review and docs prompts within a per-stage token limit.
+
+    Feedback is stripped of passing-test noise and repeated traceback frames, and code that
+    the agent has already seen, or that does not fit, is reduced to signatures and docstrings.
+    """
+
+    DEFAULT_LIMITS = {
+        'review': 6000,
+        'review_fix': 8000,
+        'test_fix': 8000,
+        'docs': 6000,
+    }
+    # Smallest share of a limit left to a section, however large the rest of the prompt is
+    MIN_SECTION_TOKENS = 500
+    UNCHANGED_MARKER = "...  # unchanged since the previous review"
+    OMITTED_MARKER = "...  # body omitted to fit the context budget"
+
+    def __init__(self, limits=None):
+        self.limits = dict(ContextBudget.DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+
+    def limit(self, stage):
+        return self.limits.get(stage)
+
+    @staticmethod
+    def count_tokens(text):
+        """
+        Number of tokens in text, estimated as four characters per token without tiktoken.
+        """
+        if not text:
+            return 0
+        encoding = _get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def _section_limit(self, stage, reserved):
+        limit = self.limit(stage)
+        if limit is None:
+            return None
+        return max(limit - reserved, ContextBudget.MIN_SECTION_TOKENS)
+
+    def compact_feedback(self, stage, feedback, reserved=0):
+        """
+        Compacts review or test feedback for a stage. `reserved` is the number of tokens
+        the rest of the prompt (e.g. the code) already takes from the stage limit.
+        """
+        if not feedback:
+            return feedback
+
+        before = ContextBudget.count_tokens(feedback)
+        compacted = ContextBudget.dedupe_traceback(ContextBudget.strip_passing_tests(feedback))
+
+        max_tokens = self._section_limit(stage, reserved)
+        if max_tokens is not None and ContextBudget.count_tokens(compacted) > max_tokens:
+            compacted = ContextBudget.truncate_middle(compacted, max_tokens)
+
+        self._log(stage, 'feedback', before, compacted)
+        return compacted
+
+    def compact_code(self, stage, code, previous_code=None, reserved=0):
+        """
+        Compacts code for a stage. Code within the limit is kept as is; otherwise functions
+        identical to `previous_code` are reduced to their signatures and, if the code still
+        exceeds the limit, every function is. collapsed_functions() lists what was reduced.
+        """
+        if not code:
+            return code
+
+        before = ContextBudget.count_tokens(code)
+        compacted = code
+
+        max_tokens = self._section_limit(stage, reserved)
+        if max_tokens is not None and previous_code and before > max_tokens:
+            previous = ContextBudget._function_sources(previous_code)
+            compacted = ContextBudget.signatures(
+                compacted,
+                lambda name, source: previous.get(name) == source,
+                ContextBudget.UNCHANGED_MARKER
+            )
+
+        if max_tokens is not None and ContextBudget.count_tokens(compacted) > max_tokens:
+            compacted = ContextBudget.signatures(compacted, lambda name, source: True, ContextBudget.OMITTED_MARKER)
+            if ContextBudget.count_tokens(compacted) > max_tokens:
+                compacted = ContextBudget.truncate_middle(compacted, max_tokens)
+
+        self._log(stage, 'code', before, compacted)
+        return compacted
+
+    @staticmethod
+    def collapsed_functions(code, marker):
+        """
+        Qualified names of the functions of compacted code whose bodies were replaced by `marker`.
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return []
+        lines = code.splitlines()
+        return [name for name, node in ContextBudget._functions(tree)
+                if any(lines[line - 1].strip() == marker for line in range(node.lineno, node.end_lineno + 1))]
+
+    @staticmethod
+    def _log(stage, section, before, compacted):
+        after = ContextBudget.count_tokens(compacted)
+        if after < before:
+            logger.info(f"Compacted {section} for '{stage}' from {before} to {after} tokens")
+
+    @staticmethod
+    def strip_passing_tests(text):
+        """
+        Removes the lines reporting passing tests from pytest output.
+        """
+        lines = [line for line in text.splitlines() if not _PASSED_LINE.match(line.strip())]
+        return "\n".join(lines)
+
+    @staticmethod
+    def dedupe_traceback(text, max_period=20):
+        """
+        Collapses consecutively repeated blocks of lines (e.g. recursion) and shortens
+        traceback frames that were already shown earlier in the text.
+        """
+        lines = text.splitlines()
+
+        # Consecutive repeats, smallest repeating block first
+        collapsed = []
+        i = 0
+        while i < len(lines):
+            repetition = ContextBudget._repetition_at(lines, i, max_period)
+            if repetition is None:
+                collapsed.append(lines[i])
+                i += 1
+                continue
+            period, repeats = repetition
+            collapsed.extend(lines[i:i + period])
+            collapsed.append(f"    [previous {period} line(s) repeated {repeats - 1} more time(s)]")
+            i += period * repeats
+
+        # Frames already shown: keep the header, drop the repeated source lines
+        result = []
+        seen = set()
+        i = 0
+        while i < len(collapsed):
+            match = _FRAME_HEADER.match(collapsed[i])
+            if not match:
+                result.append(collapsed[i])
+                i += 1
+                continue
+            indent = len(match.group(1))
+            end = i + 1
+            while (end < len(collapsed) and collapsed[end].strip()
+                   and len(collapsed[end]) - len(collapsed[end].lstrip()) > indent
+                   and not _FRAME_HEADER.match(collapsed[end])):
+                end += 1
+            frame = tuple(collapsed[i:end])
+            if frame in seen and end > i + 1:
+                result.append(f"{collapsed[i]} [frame shown above]")
+            else:
+                seen.add(frame)
+                result.extend(frame)
+            i = end
+
+        return "\n".join(result)
+
+    @staticmethod
+    def _repetition_at(lines, start, max_period):
+        """
+        Returns (period, repeats) for the shortest block of lines starting at `start` that is
+        immediately repeated, or None. Repeated blank lines and plain duplicate lines are left alone.
+        """
+        for period in range(1, max_period + 1):
+            block = lines[start:start + period]
+            if len(block) < period:
+                return None
+            repeats = 1
+            while lines[start + repeats * period:start + (repeats + 1) * period] == block:
+                repeats += 1
+            if repeats > 1 and period * repeats > 2 and any(line.strip() for line in block):
+                return period, repeats
+        return None
+
+    @staticmethod
+    def truncate_middle(text, max_tokens):
+        """
+        Keeps the beginning and the end of a text within max_tokens, dropping whole lines in between.
+        The end gets the larger share since tracebacks and summaries end there.
+        """
+        lines = text.splitlines()
+        head_budget = max_tokens // 3
+        tail_budget = max_tokens - head_budget
+
+        head, used = [], 0
+        for line in lines:
+            cost = ContextBudget.count_tokens(line) + 1
+            if used + cost > head_budget:
+                break
+            head.append(line)
+            used += cost
+
+        tail, used = [], 0
+        for line in reversed(lines[len(head):]):
+            cost = ContextBudget.count_tokens(line) + 1
+            if used + cost > tail_budget:
+                break
+            tail.append(line)
+            used += cost
+        tail.reverse()
+
+        omitted = len(lines) - len(head) - len(tail)
+        if omitted <= 0:
+            return text
+        return "\n".join(head + [f"[... {omitted} lines omitted to fit the context budget ...]"] + tail)
+
+    @staticmethod
+    def _functions(tree):
+        """
+        Yields (qualified name, node) for the functions of a module, without entering function bodies.
+        """
+        def walk(nodes, prefix):
+            for node in nodes:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    yield f"{prefix}{node.name}", node
+                elif isinstance(node, ast.ClassDef):
+                    yield from walk(node.body, f"{prefix}{node.name}.")
+
+        yield from walk(tree.body, "")
+
+    @staticmethod
+    def _function_sources(code):
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return {}
+        return {name: ast.get_source_segment(code, node) for name, node in ContextBudget._functions(tree)}
+
+    @staticmethod
+    def signatures(code, should_collapse, marker):
+        """
+        Replaces the bodies of the functions for which should_collapse(name, source) is true
+        with `marker`, keeping their signatures and docstrings. Code that does not parse is returned as is.
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return code
+
+        lines = code.splitlines()
+        replacements = []
+        for name, node in ContextBudget._functions(tree):
+            body = node.body
+            # Keep the docstring
+            if (isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+                    and isinstance(body[0].value.value, str)):
+                body = body[1:]
+            if not body or body[0].lineno <= node.lineno:
+                # Nothing after the docstring, or a one-line function
+                continue
+            if not should_collapse(name, ast.get_source_segment(code, node)):
+                continue
+            indent = " " * body[0].col_offset
+            replacements.append((body[0].lineno - 1, node.end_lineno, f"{indent}{marker}"))
+
+        for start, end, replacement in sorted(replacements, reverse=True):
+            lines[start:end] = [replacement]
+        return "\n".join(lines)
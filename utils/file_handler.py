@@ -1,38 +1,55 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import logging
 import shutil
-import os
+import sqlite3
+import tempfile
+
+from utils.blob_store import BlobStore
+from utils.checkpoint_journal import CheckpointJournal
+from utils.generation_index import GenerationIndex
+
+logger = logging.getLogger(__name__)
+
 
 class FileHandler:
+    # Projects with at least this many files are written by a thread pool
+    PARALLEL_WRITE_THRESHOLD = 64
+    WRITE_WORKERS = 8
+
     def __init__(self):
         self.base_output_dir = "generated_projects"
 
-    def move_files(self, src_dir, dest_dir):
-        # Ensure the destination directory exists
-        os.makedirs(dest_dir, exist_ok=True)
-
-        # Walk through the source directory
-        for root, dirs, files in os.walk(src_dir):
-            # Calculate the relative path from the source directory
-            rel_path = os.path.relpath(root, src_dir)
-            # Create the corresponding directory structure in the destination
-            dest_path = os.path.join(dest_dir, rel_path)
-            os.makedirs(dest_path, exist_ok=True)
-
-            # Move each file
-            for file in files:
-                src_file = os.path.join(root, file)
-                dest_file = os.path.join(dest_path, file)
-                shutil.move(src_file, dest_file)
-                print(f"Moved: {src_file} to {dest_file}")
-
     def cleanup_directories(self, src_dir):
             remaining_directories = [f for f in os.listdir(src_dir)]
             for d in remaining_directories:
                 cleanup_dir = "/".join([src_dir, d])
-                print(f"Move Cleanup: {src_dir}, removing {cleanup_dir}")
+                logger.info(f"Move Cleanup: {src_dir}, removing {cleanup_dir}")
                 shutil.rmtree(cleanup_dir,ignore_errors=True)
 
+    def create_project_dir(self, timestamp):
+        """
+        Creates a new project directory for the timestamp. A numeric suffix is added
+        when several projects are generated within the same second.
+        """
+        project_dir = os.path.join(self.base_output_dir, timestamp)
+        suffix = 0
+        while True:
+            try:
+                os.makedirs(project_dir)
+                return project_dir
+            except FileExistsError:
+                suffix += 1
+                project_dir = os.path.join(self.base_output_dir, f"{timestamp}_{suffix}")
+
+    def reserve_project_dir(self):
+        """
+        Creates the timestamped project directory before generation starts, so that
+        a checkpoint journal can be kept in it.
+        """
+        return self.create_project_dir(datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+
     def read_specification(self, file_path):
         """
         Reads and validates the project specification file.
@@ -45,7 +62,8 @@ class FileHandler:
 
         return content
 
-    def save_project_files(self, project_files):
+    def save_project_files(self, project_files, project_dir=None, src_directory='./src', before_publish=None,
+                           run_info=None):
         """
         Saves generated project files to disk in an organized structure.
 
@@ -56,41 +74,232 @@ class FileHandler:
         │   ├── tests/            # Test files
         │   ├── docs/             # Documentation
         │   └── README.md         # Project documentation
+
+        `project_dir` is a directory reserved earlier; a new one is created when it is omitted.
+        `src_directory` is the scratch directory the crews wrote into (a run's workspace), laid
+        out in the project as ./src would be.
+
+        The project is assembled in a hidden sibling staging directory, synced to disk and
+        published with a single rename, so the project directory never holds a partial project.
+        `before_publish(staging_dir)` can add files (e.g. reports) to the staged project.
+
+        The published project is added to the generation index along with `run_info`
+        (see GenerationIndex.record).
         """
         # Create timestamp-based project directory
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        project_dir = os.path.join(self.base_output_dir, timestamp)
+        if project_dir is None:
+            project_dir = self.create_project_dir(timestamp)
+
+        project_files = {self._project_path(file_path, src_directory): content
+                         for file_path, content in project_files.items()}
+
+        parent_dir = os.path.dirname(os.path.normpath(project_dir)) or '.'
+        staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(os.path.normpath(project_dir))}.staging-",
+                                       dir=parent_dir)
+        try:
+            # mkdtemp creates a private directory; publish with the reserved directory's permissions
+            shutil.copymode(project_dir, staging_dir)
+            self._write_files(staging_dir, project_files)
+
+            # Create a summary file
+            summary_path = os.path.join(staging_dir, "generation_summary.txt")
+            with open(summary_path, 'w') as f:
+                f.write(f"Project generated at: {timestamp}\n")
+                f.write("Generated files:\n")
+                for file_path in project_files.keys():
+                    f.write(f"- {file_path}\n")
+
+            # move source to the project directory
+            if os.path.isdir(src_directory):
+                self._merge_tree(src_directory, staging_dir)
+                self.cleanup_directories(src_directory)
 
-        if not os.path.exists(project_dir):
-            os.makedirs(project_dir)
+            if before_publish is not None:
+                before_publish(staging_dir)
 
-        for file_path, content in project_files.items():
-            # Construct full path within project directory
-            full_path = os.path.join(project_dir, file_path)
+            self._sync(staging_dir)
+            self._publish(staging_dir, project_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
 
-            # Create directory if it doesn't exist
-            directory = os.path.dirname(full_path)
-            if directory and not os.path.exists(directory):
-                os.makedirs(directory)
+        logger.info(f"Published {len(project_files)} generated files to {project_dir}")
 
-            # Save the file - convert content to string if needed
-            with open(full_path, 'w') as file:
+        try:
+            self.generation_index().record(project_dir, list(project_files), run_info)
+        except sqlite3.Error as e:
+            # The project is already published; a missing index row is not worth failing the run
+            logger.warning(f"Could not index {project_dir}: {e}")
+        return project_dir
+
+    def _write_files(self, root, project_files):
+        """
+        Writes the files under root, creating each directory once. Large projects are
+        written by a thread pool. Returns the written paths.
+        """
+        paths = {file_path: os.path.join(root, file_path) for file_path in project_files}
+        for directory in {os.path.dirname(path) for path in paths.values()}:
+            os.makedirs(directory, exist_ok=True)
+
+        def write(file_path):
+            content = project_files[file_path]
+            with open(paths[file_path], 'w') as file:
+                # Save the file - convert content to string if needed
                 if hasattr(content, 'raw_output'):  # Handle CrewOutput objects
                     file.write(str(content.raw_output))
                 else:
                     file.write(str(content))  # Convert any other type to string
 
-        # Create a summary file
-        summary_path = os.path.join(project_dir, "generation_summary.txt")
-        with open(summary_path, 'w') as f:
-            f.write(f"Project generated at: {timestamp}\n")
-            f.write("Generated files:\n")
-            for file_path in project_files.keys():
-                f.write(f"- {file_path}\n")
+        if len(paths) >= FileHandler.PARALLEL_WRITE_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=FileHandler.WRITE_WORKERS) as executor:
+                list(executor.map(write, paths))
+        else:
+            for file_path in paths:
+                write(file_path)
+        return list(paths.values())
+
+    @staticmethod
+    def _merge_tree(src_dir, dest_dir):
+        """
+        Moves the contents of src_dir into dest_dir, renaming whole directories whenever
+        they do not exist in dest_dir yet.
+        """
+        for name in os.listdir(src_dir):
+            source = os.path.join(src_dir, name)
+            target = os.path.join(dest_dir, name)
+            if os.path.isdir(source) and os.path.isdir(target):
+                FileHandler._merge_tree(source, target)
+                continue
+            if os.path.lexists(target) and os.path.isdir(source) != os.path.isdir(target):
+                # A file became a directory or the other way around; neither can replace the other
+                if os.path.isdir(target) and not os.path.islink(target):
+                    shutil.rmtree(target)
+                else:
+                    os.remove(target)
+            try:
+                os.replace(source, target)
+            except OSError:
+                # Different filesystem
+                shutil.move(source, target)
+
+    @staticmethod
+    def _fsync_path(path, directory=False):
+        if directory and not hasattr(os, 'O_DIRECTORY'):
+            # Directories cannot be opened for syncing (e.g. on Windows)
+            return
+        fd = os.open(path, os.O_RDONLY | (os.O_DIRECTORY if directory else 0))
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _sync(staging_dir):
+        """
+        Flushes the staged project to disk before it is published: every file, then every
+        directory from the deepest up to the staging directory, so their entries are durable too.
+        """
+        files, directories = [], []
+        for root, _, names in os.walk(staging_dir, topdown=False):
+            files.extend(os.path.join(root, name) for name in names
+                         if not os.path.islink(os.path.join(root, name)))
+            directories.append(root)
+
+        if len(files) >= FileHandler.PARALLEL_WRITE_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=FileHandler.WRITE_WORKERS) as executor:
+                list(executor.map(FileHandler._fsync_path, files))
+        else:
+            for path in files:
+                FileHandler._fsync_path(path)
+        for directory in directories:
+            FileHandler._fsync_path(directory, directory=True)
 
-        # move source to the project directory
-        src_directory = './src'
-        self.move_files(src_directory, project_dir)
-        self.cleanup_directories(src_directory)
+    @staticmethod
+    def _publish(staging_dir, project_dir):
+        """
+        Renames the staging directory onto the reserved project directory. Files already in
+        the reserved directory (the checkpoint journal) are carried over first, since a
+        directory can only be renamed onto an empty one; files the staged project already
+        holds an updated copy of (the logs of earlier attempts) are dropped instead.
+        """
+        carried, superseded = [], []
+        if os.path.isdir(project_dir):
+            for name in os.listdir(project_dir):
+                if os.path.exists(os.path.join(staging_dir, name)):
+                    os.remove(os.path.join(project_dir, name))
+                    superseded.append(name)
+                else:
+                    os.replace(os.path.join(project_dir, name), os.path.join(staging_dir, name))
+                    carried.append(name)
+
+        try:
+            os.rename(staging_dir, project_dir)
+        except OSError:
+            if os.name != 'nt':
+                for name in carried:
+                    os.replace(os.path.join(staging_dir, name), os.path.join(project_dir, name))
+                for name in superseded:
+                    shutil.copy2(os.path.join(staging_dir, name), os.path.join(project_dir, name))
+                raise
+            # Windows cannot rename onto an existing directory
+            os.rmdir(project_dir)
+            os.rename(staging_dir, project_dir)
 
-        return project_dir
\ No newline at end of file
+        # Persist the rename itself
+        FileHandler._fsync_path(os.path.dirname(os.path.abspath(project_dir)), directory=True)
+
+    def generation_index(self):
+        """
+        The index of generated projects, kept in generated_projects/.index.sqlite3.
+        """
+        return GenerationIndex(os.path.join(self.base_output_dir, ".index.sqlite3"))
+
+    def blob_store(self):
+        """
+        The archive of generated projects, kept in generated_projects/.store.
+        """
+        return BlobStore(os.path.join(self.base_output_dir, ".store"))
+
+    def archive_projects(self, project_dirs=None, remove=True):
+        """
+        Moves finished projects into the blob store, by default every project in the output
+        directory. Unfinished generations that can still be resumed are left alone.
+        Returns the archived run names.
+        """
+        if project_dirs is None:
+            project_dirs = [os.path.join(self.base_output_dir, name) for name in sorted(os.listdir(self.base_output_dir))
+                            if not name.startswith('.') and os.path.isdir(os.path.join(self.base_output_dir, name))]
+
+        store = self.blob_store()
+        index = self.generation_index()
+        archived = []
+        for project_dir in project_dirs:
+            journal_path = os.path.join(project_dir, CheckpointJournal.FILE_NAME)
+            if os.path.exists(journal_path) and not CheckpointJournal(project_dir).completed:
+                logger.info(f"Skipping unfinished generation {project_dir}")
+                continue
+            archived.append(store.archive(project_dir, remove=remove))
+            if remove:
+                index.mark_archived(project_dir)
+        return archived
+
+    def materialize_project(self, run_name, target_dir=None, method='auto'):
+        """
+        Recreates an archived project, by default at its original place in the output directory.
+        """
+        target_dir = target_dir or os.path.join(self.base_output_dir, run_name)
+        self.blob_store().materialize(run_name, target_dir, method=method)
+        return target_dir
+
+    @staticmethod
+    def _project_path(file_path, src_directory):
+        """
+        Maps a path in the scratch directory to the ./src form used inside the project directory.
+        """
+        if os.path.normpath(src_directory) == os.path.normpath('./src'):
+            return file_path
+        relative = os.path.relpath(file_path, src_directory)
+        if relative.startswith('..'):
+            return file_path
+        return './src/' + relative
\ No newline at end of file
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils.spec_similarity import SpecSimilarity
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationIndex:
+    """
+    SQLite index of generated projects.
+
+    Every published project gets a row with its specification hash, language, manifest,
+    file list, test outcome, review verdict, iteration counts and timings, so past runs
+    can be found without walking generated_projects.
+    """
+
+    COLUMNS = ('project_dir', 'run_name', 'created', 'spec_hash', 'spec_source', 'name', 'language',
+               'manifest', 'files', 'file_count', 'tests_passed', 'tests', 'review_approved',
+               'review_iterations', 'test_fix_attempts', 'wall_seconds', 'prompt_tokens',
+               'completion_tokens', 'stage_seconds', 'archived', 'spec', 'spec_signature')
+
+    # Columns added after the first version of the table
+    ADDED_COLUMNS = {'spec': 'TEXT', 'spec_signature': 'TEXT'}
+
+    def __init__(self, db_path=os.path.join("generated_projects", ".index.sqlite3")):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS runs (
+                project_dir TEXT PRIMARY KEY,
+                run_name TEXT NOT NULL,
+                created REAL NOT NULL,
+                spec_hash TEXT,
+                spec_source TEXT,
+                name TEXT,
+                language TEXT,
+                manifest TEXT,
+                files TEXT,
+                file_count INTEGER,
+                tests_passed INTEGER,
+                tests TEXT,
+                review_approved INTEGER,
+                review_iterations INTEGER,
+                test_fix_attempts INTEGER,
+                wall_seconds REAL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                stage_seconds TEXT,
+                archived INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        existing = {row['name'] for row in self._connection.execute("PRAGMA table_info(runs)")}
+        for column, column_type in GenerationIndex.ADDED_COLUMNS.items():
+            if column not in existing:
+                self._connection.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS runs_spec ON runs (spec_hash, created)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS runs_source ON runs (spec_source, created)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS runs_language ON runs (language, created)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs (created)")
+        self._connection.commit()
+
+    @staticmethod
+    def spec_hash(spec):
+        return hashlib.sha256(spec.strip().encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _flag(value):
+        return None if value is None else int(bool(value))
+
+    def record(self, project_dir, files, run_info=None):
+        """
+        Adds or replaces the row of a published project. `files` are the project-relative
+        paths of the generated files; `run_info` holds what the workflow knows about the run:
+        spec, spec_source, manifest, tests_passed, tests, review_approved, review_iterations,
+        test_fix_attempts and metrics (a RunMetrics summary).
+        """
+        run_info = run_info or {}
+        manifest = run_info.get('manifest') or {}
+        metrics = run_info.get('metrics') or {}
+        stage_seconds = {stage: round(values['wall_seconds'], 3)
+                         for stage, values in metrics.get('stages', {}).items()}
+        spec = run_info.get('spec')
+        language = manifest.get('language')
+
+        row = {
+            'project_dir': os.path.normpath(project_dir),
+            'run_name': os.path.basename(os.path.normpath(project_dir)),
+            'created': run_info.get('created', time.time()),
+            'spec_hash': GenerationIndex.spec_hash(spec) if spec else None,
+            'spec_source': run_info.get('spec_source'),
+            'name': manifest.get('name'),
+            'language': language.lower() if isinstance(language, str) else None,
+            'manifest': json.dumps(manifest, sort_keys=True),
+            'files': json.dumps(sorted(files)),
+            'file_count': len(files),
+            'tests_passed': GenerationIndex._flag(run_info.get('tests_passed')),
+            'tests': json.dumps(run_info['tests']) if run_info.get('tests') else None,
+            'review_approved': GenerationIndex._flag(run_info.get('review_approved')),
+            'review_iterations': run_info.get('review_iterations'),
+            'test_fix_attempts': run_info.get('test_fix_attempts'),
+            'wall_seconds': metrics.get('wall_seconds'),
+            'prompt_tokens': metrics.get('prompt_tokens'),
+            'completion_tokens': metrics.get('completion_tokens'),
+            'stage_seconds': json.dumps(stage_seconds) if stage_seconds else None,
+            'archived': 0,
+            'spec': spec,
+            'spec_signature': json.dumps(SpecSimilarity.signature(spec)) if spec else None,
+        }
+        placeholders = ", ".join("?" for _ in GenerationIndex.COLUMNS)
+        with self._lock:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(GenerationIndex.COLUMNS)}) VALUES ({placeholders})",
+                [row[column] for column in GenerationIndex.COLUMNS]
+            )
+            self._connection.commit()
+        logger.info(f"Indexed generation {row['project_dir']}")
+
+    def mark_archived(self, project_dir):
+        with self._lock:
+            self._connection.execute("UPDATE runs SET archived = 1 WHERE project_dir = ?",
+                                     (os.path.normpath(project_dir),))
+            self._connection.commit()
+
+    def query(self, language=None, spec_hash=None, spec_source=None, passed=None, since=None,
+              include_archived=True, limit=20):
+        """
+        Returns the matching runs, newest first, as dicts. `passed` filters on the test outcome
+        (runs without a test result match neither True nor False); `since` is a Unix time.
+        """
+        conditions, parameters = [], []
+        if language:
+            conditions.append("language = ?")
+            parameters.append(language.lower())
+        if spec_hash:
+            conditions.append("spec_hash = ?")
+            parameters.append(spec_hash)
+        if spec_source:
+            conditions.append("spec_source = ?")
+            parameters.append(spec_source)
+        if passed is not None:
+            conditions.append("tests_passed = ?")
+            parameters.append(int(passed))
+        if since is not None:
+            conditions.append("created >= ?")
+            parameters.append(since)
+        if not include_archived:
+            conditions.append("archived = 0")
+
+        sql = "SELECT * FROM runs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created DESC"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [GenerationIndex._decode(row) for row in rows]
+
+    def latest(self, **filters):
+        """
+        The newest run matching the query filters that is still on disk, or None.
+        """
+        for run in self.query(include_archived=False, limit=None, **filters):
+            if os.path.isdir(run['project_dir']):
+                return run
+        return None
+
+    def most_similar(self, spec, threshold=SpecSimilarity.DEFAULT_THRESHOLD):
+        """
+        The successful run, still on disk, whose specification is most similar to spec, as
+        (run, similarity), or None when no run reaches the threshold. A run is successful when
+        its tests passed, or when it ran no tests and its review approved the code.
+        """
+        signature = SpecSimilarity.signature(spec)
+        with self._lock:
+            rows = self._connection.execute(
+                """SELECT project_dir, spec_signature FROM runs
+                   WHERE spec_signature IS NOT NULL AND archived = 0
+                   AND (tests_passed = 1 OR (tests_passed IS NULL AND review_approved = 1))
+                   ORDER BY created DESC"""
+            ).fetchall()
+
+        # Rows are newest first, so the newest run wins a tie
+        best, best_score = None, 0.0
+        for row in rows:
+            score = SpecSimilarity.similarity(signature, json.loads(row['spec_signature']))
+            if score >= threshold and score > best_score and os.path.isdir(row['project_dir']):
+                best, best_score = row['project_dir'], score
+        if best is None:
+            return None
+        return self.query_dir(best), best_score
+
+    def query_dir(self, project_dir):
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM runs WHERE project_dir = ?",
+                                           (os.path.normpath(project_dir),)).fetchone()
+        return GenerationIndex._decode(row) if row else None
+
+    @staticmethod
+    def _decode(row):
+        run = dict(row)
+        for column in ('manifest', 'files', 'tests', 'stage_seconds', 'spec_signature'):
+            if run[column] is not None:
+                run[column] = json.loads(run[column])
+        for column in ('tests_passed', 'review_approved', 'archived'):
+            if run[column] is not None:
+                run[column] = bool(run[column])
+        return run
+
+    def reindex(self, base_dir):
+        """
+        Indexes the projects already in base_dir from the files they contain, for runs
+        published before the index existed. Returns the number of projects indexed.
+        """
+        count = 0
+        for name in sorted(os.listdir(base_dir)):
+            project_dir = os.path.join(base_dir, name)
+            if name.startswith('.') or not os.path.isdir(project_dir):
+                continue
+            self.record(project_dir, GenerationIndex._listed_files(project_dir),
+                        GenerationIndex._run_info_from_files(project_dir))
+            count += 1
+        return count
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _listed_files(project_dir):
+        summary_path = os.path.join(project_dir, "generation_summary.txt")
+        files = []
+        if os.path.exists(summary_path):
+            with open(summary_path, 'r') as f:
+                files = [line[2:].strip() for line in f if line.startswith("- ")]
+        if not files:
+            for root, _, names in os.walk(project_dir):
+                files.extend(os.path.relpath(os.path.join(root, name), project_dir) for name in names)
+        return files
+
+    @staticmethod
+    def _run_info_from_files(project_dir):
+        run_info = {'manifest': GenerationIndex._read_json(os.path.join(project_dir, "manifest.json"))}
+
+        metrics = GenerationIndex._read_json(os.path.join(project_dir, "run_metrics.json"))
+        if metrics:
+            run_info['metrics'] = metrics.get('summary')
+
+        fingerprints = GenerationIndex._read_json(os.path.join(project_dir, "stage_fingerprints.json"))
+        if fingerprints:
+            run_info['spec_source'] = fingerprints.get('spec_source')
+
+        journal_path = os.path.join(project_dir, "checkpoint.jsonl")
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r') as f:
+                first = f.readline()
+            try:
+                run_info['spec'] = json.loads(first).get('spec')
+            except ValueError:
+                pass
+
+        try:
+            # Timestamped directory names, possibly with a numeric suffix
+            run_info['created'] = datetime.strptime(os.path.basename(project_dir)[:19], "%Y-%m-%d_%H-%M-%S").timestamp()
+        except ValueError:
+            run_info['created'] = os.path.getmtime(project_dir)
+        return run_info
@@ -0,0 +1,136 @@
+import bisect
+import json
+
+
+class JsonExtractor:
+    """
+    Finds the first balanced JSON object in LLM text: a bare object, one inside a markdown
+    fence, or one surrounded by prose. Text can be fed in streamed chunks; every character
+    is scanned once, and an object is parsed as soon as its closing brace arrives.
+
+    Trailing commas before a closing brace or bracket are dropped, as models often leave them.
+    Brace-delimited prose that is not JSON, e.g. "{name}", is skipped: when an outer candidate
+    does not parse, the objects already closed inside it are tried instead of rescanning it.
+    """
+
+    def __init__(self):
+        self.result = None
+        self._buffer = ""
+        self._position = 0
+        self._reset_candidate()
+
+    def _reset_candidate(self):
+        # (bracket, offset) of the open braces and brackets of the candidate
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._last_comma = None
+        # Offsets of trailing commas in the candidate, removed before parsing; ascending
+        self._trailing_commas = []
+        # (start, end) of the objects closed inside the candidate
+        self._closed = []
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def feed(self, chunk):
+        """
+        Adds a chunk of text. Returns the parsed object once it is complete, otherwise None.
+        """
+        if self.done:
+            return self.result
+        self._buffer += chunk
+        self._scan()
+        return self.result
+
+    def finish(self):
+        """
+        Ends the text. An outer candidate that never closed, e.g. after a stray brace in the
+        prose, gives way to the first complete object inside it. Returns the result or None.
+        """
+        if not self.done and self._stack:
+            self._parse_inner()
+        return self.result
+
+    def _scan(self):
+        buffer = self._buffer
+        while self._position < len(buffer):
+            index = self._position
+            char = buffer[index]
+            self._position += 1
+
+            if not self._stack:
+                if char == '{':
+                    self._stack.append((char, index))
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._last_comma = None
+            elif char == ',':
+                self._last_comma = index
+            elif char in '{[':
+                self._stack.append((char, index))
+                self._last_comma = None
+            elif char in '}]':
+                if self._last_comma is not None:
+                    self._trailing_commas.append(self._last_comma)
+                    self._last_comma = None
+                bracket, start = self._stack.pop()
+                if self._stack:
+                    if bracket == '{':
+                        self._closed.append((start, index + 1))
+                elif self._parse(start, index + 1) or self._parse_inner():
+                    return
+                else:
+                    # Scanning goes on after the candidate; nothing in it is scanned again
+                    self._reset_candidate()
+            elif not char.isspace():
+                self._last_comma = None
+
+    def _parse(self, start, end):
+        """
+        Parses the text between start and end without its trailing commas. Sets the result
+        and returns True when it is a JSON object.
+        """
+        text = self._buffer[start:end]
+        commas = self._trailing_commas
+        for comma in reversed(commas[bisect.bisect_left(commas, start):bisect.bisect_left(commas, end)]):
+            offset = comma - start
+            text = text[:offset] + text[offset + 1:]
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return False
+        if isinstance(value, dict):
+            self.result = value
+            return True
+        return False
+
+    def _parse_inner(self):
+        """
+        Tries the objects closed inside the candidate, the first one in the text first.
+        """
+        return any(self._parse(start, end) for start, end in sorted(self._closed))
+
+    @staticmethod
+    def extract(text):
+        """
+        Returns the first JSON object in a complete text. Raises ValueError when there is none.
+        """
+        extractor = JsonExtractor()
+        extractor.feed(text or "")
+        result = extractor.finish()
+        if result is None:
+            raise ValueError("No JSON object found in the output")
+        return result
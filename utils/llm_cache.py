@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache of LLM crew outputs.
+
+    Entries are keyed on a hash of the agent role, task description, expected output
+    and model parameters, stored in SQLite and evicted least-recently-used first once
+    the total stored size exceeds `max_bytes`.
+    """
+
+    # Model attributes that change the response and therefore belong in the key
+    MODEL_ATTRIBUTES = ('model', 'temperature', 'top_p', 'max_tokens', 'max_completion_tokens', 'seed', 'base_url')
+
+    def __init__(self, db_path=".llm_cache/responses.sqlite3", max_bytes=512 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                role TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def model_params(agent):
+        """
+        Returns the model parameters of an agent's LLM as a dict.
+        """
+        llm = getattr(agent, 'llm', None)
+        if llm is None or isinstance(llm, str):
+            return {'model': llm}
+        return {name: getattr(llm, name) for name in LLMCache.MODEL_ATTRIBUTES
+                if getattr(llm, name, None) is not None}
+
+    @staticmethod
+    def make_key(role, description, expected_output, model_params):
+        """
+        Builds the cache key for a task executed by an agent with the given model parameters.
+        """
+        payload = json.dumps(
+            {
+                'role': role,
+                'description': description,
+                'expected_output': expected_output,
+                'model': model_params,
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def key_for(self, agent, task):
+        """
+        Builds the cache key for running `task` with `agent`.
+        """
+        return LLMCache.make_key(
+            agent.role,
+            task.description,
+            task.expected_output,
+            LLMCache.model_params(agent)
+        )
+
+    def get(self, key):
+        """
+        Returns the cached output for the key, or None on a miss.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return row[0]
+
+    def put(self, key, value, role=None):
+        """
+        Stores an output and evicts least-recently-used entries beyond the size limit.
+        """
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, role, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, role, value, size, time.time())
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes.
+        """
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._connection.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"LLM cache evicted {evicted} entries")
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            self._connection.commit()
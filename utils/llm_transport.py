@@ -0,0 +1,237 @@
+import atexit
+import json
+import logging
+import random
+import threading
+import time
+
+import httpx
+
+from utils.context_budget import ContextBudget
+from utils.run_metrics import record_llm_retry
+
+try:
+    import litellm
+    LITELLM_AVAILABLE = True
+except ImportError:  # crewai releases that do not call models through litellm
+    LITELLM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Rate limiter refilled at `per_minute` units per minute, holding at most `capacity`.
+    Providers enforce their per-minute limits over shorter windows, so by default the bucket
+    only holds a second's worth. Callers reserve units in arrival order and sleep until the
+    bucket has covered them, so a burst is spread out instead of being answered with 429s.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 60.0)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+
+    def acquire(self, amount=1):
+        """
+        Takes `amount` units, waiting for them if necessary. Returns the seconds waited.
+        """
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """
+        Makes every caller wait at least `seconds`, e.g. after the provider answered 429.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    httpx transport for LLM API calls: requests pass the request and token limiters, and
+    rate-limited, overloaded or failed requests are retried with jittered exponential backoff.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, transport, requests_per_minute=None, tokens_per_minute=None, max_retries=4,
+                 backoff_seconds=0.5, max_backoff_seconds=30.0):
+        self.transport = transport
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'rate_limited': 0, 'server_errors': 0,
+                       'transport_errors': 0, 'failed': 0, 'estimated_tokens': 0,
+                       'limiter_wait_seconds': 0.0, 'backoff_seconds': 0.0, 'request_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def estimate_tokens(request):
+        """
+        Tokens a chat completion request counts against a tokens-per-minute limit:
+        its prompt plus the completion budget it asks for.
+        """
+        try:
+            body = json.loads(request.content or b"{}")
+        except (ValueError, httpx.RequestNotRead):
+            return 0
+        if not isinstance(body, dict):
+            return 0
+        prompt = "".join(str(message.get('content') or "") for message in body.get('messages', [])
+                         if isinstance(message, dict))
+        completion = body.get('max_completion_tokens') or body.get('max_tokens') or 0
+        return ContextBudget.count_tokens(prompt) + completion
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        for name in ('limiter_wait_seconds', 'backoff_seconds', 'request_seconds'):
+            stats[name] = round(stats[name], 3)
+        return stats
+
+    def _backoff(self, attempt, response=None):
+        """
+        Full-jitter exponential backoff, but never shorter than the server's Retry-After.
+        """
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_backoff_seconds))
+            except ValueError:  # An HTTP date; the jittered delay is used
+                pass
+        return delay
+
+    def handle_request(self, request):
+        tokens = RateLimitedTransport.estimate_tokens(request) if self.token_bucket else 0
+        self._count(requests=1, estimated_tokens=tokens)
+
+        attempt = 0
+        while True:
+            waited = 0.0
+            if self.request_bucket:
+                waited += self.request_bucket.acquire()
+            if self.token_bucket and tokens:
+                waited += self.token_bucket.acquire(tokens)
+
+            start = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            self._count(attempts=1, limiter_wait_seconds=waited, request_seconds=time.monotonic() - start)
+
+            if error is None and response.status_code not in RateLimitedTransport.RETRY_STATUSES:
+                return response
+
+            if error is not None:
+                self._count(transport_errors=1)
+            elif response.status_code == 429:
+                self._count(rate_limited=1)
+            else:
+                self._count(server_errors=1)
+
+            if attempt >= self.max_retries:
+                self._count(failed=1)
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.read()
+                response.close()
+                if response.status_code == 429:
+                    # Every caller of the limiter backs off, not only this request
+                    for bucket in (self.request_bucket, self.token_bucket):
+                        if bucket:
+                            bucket.pause(delay)
+            logger.warning(f"LLM request to {request.url.host} "
+                           f"{'failed: ' + str(error) if error else 'returned ' + str(response.status_code)}; "
+                           f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            self._count(retries=1, backoff_seconds=delay)
+            record_llm_retry()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class LLMTransport:
+    """
+    Process-wide HTTP client for LLM calls: one keep-alive connection pool behind the rate
+    limiters and the retry policy of RateLimitedTransport, shared by every agent and workflow.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_connections=32,
+                 max_retries=4, timeout=600.0):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                              keepalive_expiry=60.0)
+        self.transport = RateLimitedTransport(
+            httpx.HTTPTransport(limits=limits),
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries
+        )
+        self.client = httpx.Client(transport=self.transport, timeout=httpx.Timeout(timeout, connect=10.0))
+
+    def install(self):
+        """
+        Routes the OpenAI-compatible calls crewai makes through litellm over this client.
+        Returns False when litellm is not available.
+        """
+        if not LITELLM_AVAILABLE:
+            return False
+        litellm.client_session = self.client
+        return True
+
+    def stats(self):
+        return self.transport.stats()
+
+    def close(self):
+        self.client.close()
+
+
+def get_shared_transport(**options):
+    """
+    Returns the process-wide LLM transport, creating and installing it on first use.
+    `options` (LLMTransport arguments) only apply to the call that creates it.
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = LLMTransport(**options)
+            atexit.register(_shared_transport.close)
+            if not _shared_transport.install():
+                logger.warning("litellm is not available; LLM calls do not use the shared transport")
+        elif options:
+            logger.debug("The shared LLM transport already exists; ignoring new options")
+        return _shared_transport
@@ -0,0 +1,89 @@
+import json
+import logging
+
+from crewai import LLM
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRouting:
+    """
+    Routes every agent of the workflow to its own model, temperature and max-tokens budget.
+
+    Routes are keyed by the agent names of ProjectWorkflow.create_agents rather than by role,
+    as the code and run agents share a role. A route with 'escalate_to' names a stronger model
+    that the agent switches to once `escalate_after` review or test rounds of a run have failed.
+    Agents without a route keep crewai's default model.
+    """
+
+    AGENTS = ('manifest_agent', 'idl_agent', 'code_agent', 'run_agent', 'test_agent', 'docs_agent',
+              'fix_code_agent', 'run_and_test_agent', 'review_agent')
+    ROUTE_KEYS = ('model', 'temperature', 'max_tokens', 'escalate_to')
+
+    # Small, near-deterministic models for the structured and short stages and the stronger
+    # model for the first implementation; fixes start small and escalate after a failed round
+    DEFAULT_ROUTES = {
+        'manifest_agent': {'model': 'gpt-4o-mini', 'temperature': 0.0, 'max_tokens': 1500},
+        'idl_agent': {'model': 'gpt-4o-mini', 'temperature': 0.2, 'max_tokens': 4000},
+        'code_agent': {'model': 'gpt-4o', 'temperature': 0.2, 'max_tokens': 8000},
+        'run_agent': {'model': 'gpt-4o-mini', 'temperature': 0.0, 'max_tokens': 1500},
+        'test_agent': {'model': 'gpt-4o-mini', 'temperature': 0.2, 'max_tokens': 4000},
+        'docs_agent': {'model': 'gpt-4o-mini', 'temperature': 0.3, 'max_tokens': 3000},
+        'fix_code_agent': {'model': 'gpt-4o-mini', 'temperature': 0.0, 'max_tokens': 8000, 'escalate_to': 'gpt-4o'},
+        'run_and_test_agent': {'model': 'gpt-4o-mini', 'temperature': 0.0, 'max_tokens': 2000},
+        'review_agent': {'model': 'gpt-4o-mini', 'temperature': 0.0, 'max_tokens': 2000},
+    }
+
+    def __init__(self, routes=None, escalate_after=1):
+        routes = ModelRouting.DEFAULT_ROUTES if routes is None else routes
+        for name, route in routes.items():
+            if name not in ModelRouting.AGENTS:
+                raise ValueError(f"Unknown agent in model routing: {name}")
+            unknown = set(route) - set(ModelRouting.ROUTE_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown keys in the model route of {name}: {sorted(unknown)}")
+            if not route.get('model'):
+                raise ValueError(f"The model route of {name} has no model")
+        if not isinstance(escalate_after, int) or escalate_after < 1:
+            raise ValueError("escalate_after must be a positive integer")
+        self.routes = {name: dict(route) for name, route in routes.items()}
+        self.escalate_after = escalate_after
+
+    @staticmethod
+    def load(path):
+        """
+        Loads a routing config: a JSON object with 'routes', mapping agent names to
+        {model, temperature, max_tokens, escalate_to}, and optionally 'escalate_after'.
+        """
+        with open(path, 'r') as f:
+            config = json.load(f)
+        return ModelRouting.from_dict(config)
+
+    @staticmethod
+    def from_dict(config):
+        return ModelRouting(config.get('routes', {}), config.get('escalate_after', 1))
+
+    def to_dict(self):
+        """
+        The routes and escalation policy in the format of a routing config, e.g. for the checkpoint journal.
+        """
+        return {'routes': {name: dict(route) for name, route in self.routes.items()},
+                'escalate_after': self.escalate_after}
+
+    def __eq__(self, other):
+        return isinstance(other, ModelRouting) and self.to_dict() == other.to_dict()
+
+    def llm(self, name, escalated=False):
+        """
+        The LLM of an agent, or None when it has no route. `escalated` returns its escalation
+        model, with the same temperature and budget; None when it has no escalation model.
+        """
+        route = self.routes.get(name)
+        if route is None or (escalated and not route.get('escalate_to')):
+            return None
+        options = {key: route[key] for key in ('temperature', 'max_tokens') if route.get(key) is not None}
+        return LLM(model=route['escalate_to'] if escalated else route['model'], **options)
+
+    def describe(self):
+        return {name: route['model'] + (f" -> {route['escalate_to']}" if route.get('escalate_to') else "")
+                for name, route in self.routes.items()}
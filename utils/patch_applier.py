@@ -0,0 +1,173 @@
+import ast
+import re
+
+_SEARCH = re.compile(r"^<{5,} ?SEARCH\s*$")
+_DIVIDER = re.compile(r"^={5,}\s*$")
+_REPLACE = re.compile(r"^>{5,} ?REPLACE\s*$")
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """
+    Raised when a patch is malformed or does not apply to the current code.
+    """
+
+
+class PatchApplier:
+    """
+    Applies the edits returned by FixCodeAgent in patch mode: search/replace blocks
+    or unified diffs. Every hunk must match the current code, otherwise nothing is applied.
+    """
+
+    @staticmethod
+    def apply(original, patch, validate_python=False):
+        """
+        Applies a patch to the original text and returns the patched text.
+        With validate_python, the result must also parse as Python.
+        """
+        patch = PatchApplier._strip_fences(patch or "")
+
+        if any(_SEARCH.match(line) for line in patch.splitlines()):
+            patched = PatchApplier.apply_search_replace(original, PatchApplier.parse_search_replace(patch))
+        elif any(_HUNK_HEADER.match(line) for line in patch.splitlines()):
+            patched = PatchApplier.apply_unified_diff(original, patch)
+        else:
+            raise PatchError("No search/replace blocks or diff hunks found")
+
+        if validate_python:
+            try:
+                ast.parse(patched)
+            except SyntaxError as e:
+                raise PatchError(f"Patched code does not parse: {e}") from e
+        return patched
+
+    @staticmethod
+    def _strip_fences(patch):
+        """
+        Drops the markdown fence lines around the blocks or hunks of a patch. Lines inside
+        search/replace blocks are kept as they are, and so are diff lines, which start with
+        their ' ', '+' or '-' prefix.
+        """
+        lines = []
+        in_block = False
+        for line in patch.splitlines():
+            if _SEARCH.match(line):
+                in_block = True
+            elif _REPLACE.match(line):
+                in_block = False
+            elif not in_block and line.startswith("```"):
+                continue
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def parse_search_replace(patch):
+        """
+        Parses search/replace blocks into a list of (search, replace) text pairs.
+        """
+        hunks = []
+        state, search, replace = None, [], []
+        for line in patch.splitlines():
+            if _SEARCH.match(line):
+                if state is not None:
+                    raise PatchError("Search block started before the previous block was closed")
+                state, search, replace = 'search', [], []
+            elif _DIVIDER.match(line) and state == 'search':
+                state = 'replace'
+            elif _REPLACE.match(line) and state == 'replace':
+                hunks.append(("\n".join(search), "\n".join(replace)))
+                state = None
+            elif state == 'search':
+                search.append(line)
+            elif state == 'replace':
+                replace.append(line)
+
+        if state is not None:
+            raise PatchError("Unterminated search/replace block")
+        return hunks
+
+    @staticmethod
+    def apply_search_replace(original, hunks):
+        """
+        Replaces each search text, which must occur exactly once, with its replacement.
+        Trailing whitespace differences are tolerated.
+        """
+        lines = original.splitlines()
+        for number, (search, replace) in enumerate(hunks, 1):
+            search_lines = search.splitlines()
+            if not search_lines:
+                raise PatchError(f"Block {number} has an empty search text")
+            matches = PatchApplier._find(lines, search_lines)
+            if len(matches) != 1:
+                problem = "not found" if not matches else f"found {len(matches)} times"
+                raise PatchError(f"Search text of block {number} {problem}")
+            start = matches[0]
+            lines[start:start + len(search_lines)] = replace.splitlines()
+        return PatchApplier._join(lines, original)
+
+    @staticmethod
+    def apply_unified_diff(original, patch):
+        """
+        Applies the hunks of a unified diff. A hunk whose context moved is located by
+        searching for it, as long as it matches exactly one place.
+        """
+        lines = original.splitlines()
+        offset = 0
+        for number, (old_start, old_lines, new_lines) in enumerate(PatchApplier._parse_hunks(patch), 1):
+            expected = max(old_start - 1, 0) + offset
+            if lines[expected:expected + len(old_lines)] == old_lines:
+                start = expected
+            else:
+                matches = PatchApplier._find(lines, old_lines)
+                if len(matches) != 1:
+                    raise PatchError(f"Hunk {number} does not match the current code")
+                start = matches[0]
+            lines[start:start + len(old_lines)] = new_lines
+            offset = start - (old_start - 1) + len(new_lines) - len(old_lines)
+        return PatchApplier._join(lines, original)
+
+    @staticmethod
+    def _parse_hunks(patch):
+        hunks = []
+        current = None
+        for line in patch.splitlines():
+            header = _HUNK_HEADER.match(line)
+            if header:
+                current = (int(header.group(1)), [], [])
+                hunks.append(current)
+            elif current is None or line.startswith(('---', '+++')):
+                continue
+            elif line.startswith('-'):
+                current[1].append(line[1:])
+            elif line.startswith('+'):
+                current[2].append(line[1:])
+            elif line.startswith(' ') or line == "":
+                current[1].append(line[1:])
+                current[2].append(line[1:])
+            elif line.startswith('\\'):
+                # "\ No newline at end of file"
+                continue
+            else:
+                raise PatchError(f"Unexpected line in diff hunk: {line!r}")
+
+        if not hunks:
+            raise PatchError("No diff hunks found")
+        return hunks
+
+    @staticmethod
+    def _find(lines, needle):
+        """
+        Start indexes where needle occurs in lines, ignoring trailing whitespace.
+        """
+        if not needle:
+            return []
+        stripped = [line.rstrip() for line in lines]
+        target = [line.rstrip() for line in needle]
+        return [i for i in range(len(stripped) - len(target) + 1) if stripped[i:i + len(target)] == target]
+
+    @staticmethod
+    def _join(lines, original):
+        text = "\n".join(lines)
+        if original.endswith("\n"):
+            text += "\n"
+        return text
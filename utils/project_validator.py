@@ -52,4 +52,43 @@ class ProjectValidator:
             if element not in idl:
                 raise ValueError(f"IDL specification must contain {element} definitions")
 
-        return True
\ No newline at end of file
+        return True
+
+    # Manifest keys the workflow reads file paths from
+    MANIFEST_FILE_KEYS = ('implementation_file', 'test_file', 'docs_file', 'interface_file', 'run_script')
+
+    @staticmethod
+    def validate_manifest(manifest):
+        """
+        Validates a parsed manifest against the manifest schema.
+        All problems are reported in one ValueError, so a repair round can fix them together.
+        """
+        if not isinstance(manifest, dict):
+            raise ValueError("Manifest must be a JSON object")
+
+        problems = []
+        for key in ('language',) + ProjectValidator.MANIFEST_FILE_KEYS:
+            value = manifest.get(key)
+            if not isinstance(value, str) or not value.strip():
+                problems.append(f"'{key}' must be a non-empty string")
+        if 'name' in manifest and not isinstance(manifest['name'], str):
+            problems.append("'name' must be a string")
+
+        file_mapping = manifest.get('file-mapping')
+        if file_mapping is not None and not isinstance(file_mapping, dict):
+            problems.append("'file-mapping' must be an object mapping file paths to descriptions")
+            file_mapping = None
+
+        paths = [manifest[key] for key in ProjectValidator.MANIFEST_FILE_KEYS if isinstance(manifest.get(key), str)]
+        for path, description in (file_mapping or {}).items():
+            if not isinstance(description, str):
+                problems.append(f"'file-mapping' entry '{path}' must have a string description")
+            paths.append(path)
+        for path in paths:
+            parts = path.replace('\\', '/').split('/')
+            if path.startswith(('/', '\\')) or '..' in parts or ':' in parts[0]:
+                problems.append(f"'{path}' must be a path relative to the project directory")
+
+        if problems:
+            raise ValueError("Invalid manifest: " + "; ".join(problems))
+        return True
@@ -0,0 +1,244 @@
+import contextlib
+import contextvars
+import csv
+import json
+import os
+import secrets
+import threading
+import time
+
+_active_metrics = contextvars.ContextVar('active_metrics', default=None)
+# (RunMetrics, record) of the crew kickoff running in the current context
+_active_kickoff = contextvars.ContextVar('active_kickoff', default=None)
+
+
+def current_metrics():
+    """
+    Returns the RunMetrics of the workflow running in the current context, or None.
+    """
+    return _active_metrics.get()
+
+
+def record_llm_retry():
+    """
+    Counts a retried LLM request against the crew kickoff running in the current context, if any.
+    """
+    kickoff = _active_kickoff.get()
+    if kickoff is not None:
+        metrics, record = kickoff
+        with metrics._lock:
+            record['retries'] += 1
+
+
+class RunMetrics:
+    """
+    Records wall time, queue time, token usage, retries and cache hits for every crew
+    kickoff of a workflow run, plus the time spent in test and run subprocesses.
+
+    `attempt` numbers the kickoffs of a stage, e.g. review and test loop iterations;
+    `retries` counts the LLM requests of a kickoff that the transport had to retry.
+    """
+
+    CSV_FIELDS = ['kind', 'stage', 'role', 'model', 'attempt', 'start', 'wall_seconds', 'queue_seconds',
+                  'prompt_tokens', 'completion_tokens', 'total_tokens', 'requests', 'retries',
+                  'cache_hit', 'reused', 'file', 'exit_code']
+
+    def __init__(self):
+        self.run_started = time.time()
+        self.run_finished = None
+        self.records = []
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Makes this instance the target of current_metrics() within the block.
+        """
+        token = _active_metrics.set(self)
+        try:
+            yield self
+        finally:
+            _active_metrics.reset(token)
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    @contextlib.contextmanager
+    def crew_kickoff(self, stage, role, model=None):
+        """
+        Times a crew kickoff. The yielded dict can be updated with token usage,
+        cache hits and reuse before the block ends.
+        """
+        with self._lock:
+            attempt = self._attempts.get(stage, 0) + 1
+            self._attempts[stage] = attempt
+
+        record = {
+            'kind': 'crew',
+            'stage': stage,
+            'role': role,
+            'model': model,
+            'attempt': attempt,
+            'start': time.time(),
+            'queue_seconds': 0.0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_tokens': 0,
+            'requests': 0,
+            'retries': 0,
+            'cache_hit': False,
+            'reused': False,
+        }
+        token = _active_kickoff.set((self, record))
+        try:
+            yield record
+        finally:
+            _active_kickoff.reset(token)
+            record['wall_seconds'] = time.time() - record['start']
+            self._add(record)
+
+    def record_token_usage(self, record, crew_output):
+        """
+        Copies the token usage reported by a CrewOutput into a kickoff record.
+        """
+        usage = getattr(crew_output, 'token_usage', None)
+        if usage is None:
+            return
+        for field, attribute in (('prompt_tokens', 'prompt_tokens'), ('completion_tokens', 'completion_tokens'),
+                                 ('total_tokens', 'total_tokens'), ('requests', 'successful_requests')):
+            value = usage.get(attribute) if isinstance(usage, dict) else getattr(usage, attribute, None)
+            record[field] = value or 0
+
+    def record_reuse(self, stage):
+        """
+        Records a stage whose output was reused from a previous run.
+        """
+        self._add({'kind': 'crew', 'stage': stage, 'role': None, 'attempt': 1, 'start': time.time(),
+                   'wall_seconds': 0.0, 'queue_seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                   'total_tokens': 0, 'requests': 0, 'retries': 0, 'cache_hit': False, 'reused': True})
+
+    def record_queue_times(self, queue_seconds):
+        """
+        Stores how long each scheduler stage waited for a free worker.
+        """
+        with self._lock:
+            for record in self.records:
+                if record['kind'] == 'crew' and record['attempt'] == 1 and record['stage'] in queue_seconds:
+                    record['queue_seconds'] = queue_seconds[record['stage']]
+
+    def record_subprocess(self, kind, file_path, start, exit_code):
+        """
+        Records a test or run subprocess that started at `start`.
+        """
+        self._add({'kind': kind, 'stage': None, 'file': file_path, 'start': start,
+                   'wall_seconds': time.time() - start, 'exit_code': exit_code})
+
+    def finish(self):
+        self.run_finished = time.time()
+
+    def summary(self):
+        """
+        Aggregates the records per stage.
+        """
+        stages = {}
+        for record in self.records:
+            key = record['stage'] or record['kind']
+            stage = stages.setdefault(key, {'calls': 0, 'wall_seconds': 0.0, 'queue_seconds': 0.0,
+                                            'prompt_tokens': 0, 'completion_tokens': 0, 'retries': 0,
+                                            'cache_hits': 0, 'reused': 0})
+            stage['calls'] += 1
+            stage['wall_seconds'] += record['wall_seconds']
+            stage['queue_seconds'] += record.get('queue_seconds', 0.0)
+            stage['prompt_tokens'] += record.get('prompt_tokens', 0)
+            stage['completion_tokens'] += record.get('completion_tokens', 0)
+            stage['retries'] += record.get('retries', 0)
+            stage['cache_hits'] += int(record.get('cache_hit', False))
+            stage['reused'] += int(record.get('reused', False))
+
+        finished = self.run_finished or time.time()
+        return {
+            'wall_seconds': finished - self.run_started,
+            'prompt_tokens': sum(s['prompt_tokens'] for s in stages.values()),
+            'completion_tokens': sum(s['completion_tokens'] for s in stages.values()),
+            'stages': stages,
+        }
+
+    def write_reports(self, project_dir):
+        """
+        Writes run_metrics.json (summary and records) and run_metrics.csv into the project directory.
+        """
+        json_path = os.path.join(project_dir, "run_metrics.json")
+        with open(json_path, 'w') as f:
+            json.dump({'summary': self.summary(), 'records': self.records}, f, indent=2)
+
+        csv_path = os.path.join(project_dir, "run_metrics.csv")
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RunMetrics.CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for record in self.records:
+                writer.writerow(record)
+
+        return json_path, csv_path
+
+    def write_otel(self, path, service_name="project-generator"):
+        """
+        Appends the run as one OTLP/JSON trace line to a local file, with a root span
+        for the run and a child span per crew kickoff and subprocess.
+        """
+        trace_id = secrets.token_hex(16)
+        root_id = secrets.token_hex(8)
+        finished = self.run_finished or time.time()
+
+        def nanos(seconds):
+            return str(int(seconds * 1e9))
+
+        def attributes(values):
+            result = []
+            for key, value in values.items():
+                if value is None:
+                    continue
+                if isinstance(value, bool):
+                    result.append({'key': key, 'value': {'boolValue': value}})
+                elif isinstance(value, int):
+                    result.append({'key': key, 'value': {'intValue': str(value)}})
+                elif isinstance(value, float):
+                    result.append({'key': key, 'value': {'doubleValue': value}})
+                else:
+                    result.append({'key': key, 'value': {'stringValue': str(value)}})
+            return result
+
+        spans = [{
+            'traceId': trace_id,
+            'spanId': root_id,
+            'name': 'generate_project',
+            'kind': 1,
+            'startTimeUnixNano': nanos(self.run_started),
+            'endTimeUnixNano': nanos(finished),
+            'attributes': attributes({'wall_seconds': finished - self.run_started}),
+        }]
+        for record in self.records:
+            values = {k: v for k, v in record.items() if k not in ('start', 'wall_seconds')}
+            spans.append({
+                'traceId': trace_id,
+                'spanId': secrets.token_hex(8),
+                'parentSpanId': root_id,
+                'name': record['stage'] or record['kind'],
+                'kind': 1,
+                'startTimeUnixNano': nanos(record['start']),
+                'endTimeUnixNano': nanos(record['start'] + record['wall_seconds']),
+                'attributes': attributes(values),
+            })
+
+        trace = {'resourceSpans': [{
+            'resource': {'attributes': attributes({'service.name': service_name})},
+            'scopeSpans': [{'scope': {'name': 'workflows.project_workflow'}, 'spans': spans}],
+        }]}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, 'a') as f:
+            f.write(json.dumps(trace) + "\n")
+        return path
@@ -0,0 +1,78 @@
+import difflib
+import hashlib
+import re
+
+# Mersenne prime for the universal hash family of the MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+
+class SpecSimilarity:
+    """
+    MinHash signatures of project specifications.
+
+    A specification is reduced to shingles of consecutive words; the fraction of signature
+    slots two specifications share estimates the Jaccard similarity of their shingle sets.
+    Signatures are small and fixed-size, so they can be stored in the generation index and
+    compared without the specification texts.
+    """
+
+    NUM_PERMUTATIONS = 64
+    SHINGLE_SIZE = 3
+    DEFAULT_THRESHOLD = 0.7
+
+    _PERMUTATIONS = None
+
+    @staticmethod
+    def _permutations():
+        # Deterministic coefficients, so signatures stay comparable across processes
+        if SpecSimilarity._PERMUTATIONS is None:
+            permutations = []
+            for i in range(SpecSimilarity.NUM_PERMUTATIONS):
+                seed = hashlib.sha256(f"minhash-{i}".encode('utf-8')).digest()
+                permutations.append((int.from_bytes(seed[:8], 'big') % (_PRIME - 1) + 1,
+                                     int.from_bytes(seed[8:16], 'big') % _PRIME))
+            SpecSimilarity._PERMUTATIONS = permutations
+        return SpecSimilarity._PERMUTATIONS
+
+    @staticmethod
+    def shingles(text, size=None):
+        """
+        The set of `size` consecutive lower-cased words of the text. Requirement numbering
+        and punctuation are ignored, so renumbered requirements still match.
+        """
+        size = size or SpecSimilarity.SHINGLE_SIZE
+        words = re.findall(r"[a-z0-9_+#]+", re.sub(r"^\s*\d+[.)]", " ", text.lower(), flags=re.MULTILINE))
+        if len(words) < size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def signature(text):
+        """
+        The MinHash signature of a specification, a list of NUM_PERMUTATIONS integers.
+        """
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for shingle in SpecSimilarity.shingles(text)]
+        if not hashes:
+            return [_MAX_HASH] * SpecSimilarity.NUM_PERMUTATIONS
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in SpecSimilarity._permutations()]
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """
+        Estimated Jaccard similarity of the specifications behind two signatures.
+        """
+        if not signature_a or len(signature_a) != len(signature_b):
+            return 0.0
+        return sum(a == b for a, b in zip(signature_a, signature_b)) / len(signature_a)
+
+    @staticmethod
+    def describe_changes(previous, current, label="specification"):
+        """
+        A unified diff from the previous to the current text, or "" when they only differ in whitespace.
+        """
+        previous_lines = [line.rstrip() for line in previous.strip().splitlines()]
+        current_lines = [line.rstrip() for line in current.strip().splitlines()]
+        return "\n".join(difflib.unified_diff(previous_lines, current_lines, f"previous {label}",
+                                              f"new {label}", lineterm=""))
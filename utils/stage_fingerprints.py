@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from utils.llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
+
+
+class StageFingerprints:
+    """
+    Records a fingerprint of every workflow stage's inputs next to the generated project.
+
+    When a project is regenerated from a previous run, a stage whose fingerprint is
+    unchanged reuses the previous output instead of running again. Because stage
+    inputs include upstream outputs, only stages downstream of an actual change rerun.
+    """
+
+    FILE_NAME = "stage_fingerprints.json"
+
+    # Numbered requirement lines that only concern documentation do not affect the implementation
+    DOCS_ONLY_PATTERN = re.compile(r'\b(documentation|document|docs|readme|user guide|manual)\b', re.IGNORECASE)
+
+    def __init__(self, previous_stages=None):
+        self.previous_stages = previous_stages or {}
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(*parts):
+        """
+        Returns a stable hash of the given stage inputs.
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def agent_config(agent):
+        """
+        Returns the parts of an agent's configuration that influence its output.
+        """
+        return {
+            'role': getattr(agent, 'role', None),
+            'goal': getattr(agent, 'goal', None),
+            'backstory': getattr(agent, 'backstory', None),
+            'llm': LLMCache.model_params(agent),
+        }
+
+    @staticmethod
+    def implementation_spec(spec):
+        """
+        Returns the specification without documentation-only requirement lines, so that
+        documentation tweaks do not invalidate the implementation stages.
+        """
+        lines = [line for line in spec.splitlines()
+                 if not (re.match(r'\s*(\d+[.)]|[-*])\s', line) and StageFingerprints.DOCS_ONLY_PATTERN.search(line))]
+        return "\n".join(lines)
+
+    def lookup(self, stage, fingerprint):
+        """
+        Returns the previous output of a stage if its fingerprint is unchanged, otherwise None.
+        """
+        previous = self.previous_stages.get(stage)
+        if previous and previous.get('fingerprint') == fingerprint:
+            return previous.get('output')
+        return None
+
+    def record(self, stage, fingerprint, output):
+        """
+        Records the fingerprint and output of a completed stage.
+        """
+        with self._lock:
+            self.stages[stage] = {'fingerprint': fingerprint, 'output': output}
+
+    def save(self, project_dir, spec_source=None):
+        """
+        Writes the recorded fingerprints into the project directory.
+        """
+        path = os.path.join(project_dir, StageFingerprints.FILE_NAME)
+        with open(path, 'w') as f:
+            json.dump({'spec_source': spec_source, 'stages': self.stages}, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, project_dir):
+        """
+        Loads the fingerprints recorded for a previously generated project.
+        """
+        path = os.path.join(project_dir, StageFingerprints.FILE_NAME)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No stage fingerprints found in '{project_dir}'")
+        with open(path, 'r') as f:
+            data = json.load(f)
+        logger.info(f"Loaded stage fingerprints from {path}")
+        return cls(previous_stages=data.get('stages', {}))
+
+    @staticmethod
+    def find_latest(base_dir, spec_source):
+        """
+        Returns the most recent project directory generated from the same specification file, or None.
+        """
+        if not os.path.isdir(base_dir):
+            return None
+
+        for name in sorted(os.listdir(base_dir), reverse=True):
+            path = os.path.join(base_dir, name, StageFingerprints.FILE_NAME)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    if json.load(f).get('spec_source') == spec_source:
+                        return os.path.join(base_dir, name)
+            except (OSError, ValueError):
+                continue
+        return None
@@ -0,0 +1,182 @@
+import ast
+import os
+import sys
+
+try:
+    from pyflakes import checker as pyflakes_checker
+    PYFLAKES_AVAILABLE = True
+except ImportError:
+    PYFLAKES_AVAILABLE = False
+
+# pyflakes findings that fail at runtime rather than being style issues
+_PYFLAKES_ERRORS = (
+    'UndefinedName', 'UndefinedLocal', 'UndefinedExport', 'ReturnOutsideFunction',
+    'YieldOutsideFunction', 'ContinueOutsideLoop', 'BreakOutsideLoop', 'DuplicateArgument',
+)
+
+
+class StaticGateResult:
+    """
+    Findings of the static gate. Errors make the code fail before any test runs;
+    warnings, such as lint findings and third-party imports, do not.
+    """
+
+    def __init__(self, file_path, errors=None, warnings=None):
+        self.file_path = file_path
+        self.errors = errors or []
+        self.warnings = warnings or []
+
+    @property
+    def passed(self):
+        return not self.errors
+
+    def report(self):
+        """
+        Diagnostics for the fix stage, one line per finding.
+        """
+        if self.passed:
+            return f"Static checks passed for {self.file_path}"
+        lines = [f"Static checks found {len(self.errors)} error(s) in {self.file_path}:"]
+        lines.extend(f"- {error}" for error in self.errors)
+        if self.warnings:
+            lines.append("Warnings:")
+            lines.extend(f"- {warning}" for warning in self.warnings)
+        return "\n".join(lines)
+
+
+class StaticGate:
+    """
+    Fast local checks run on generated Python code before the LLM review: compilation,
+    resolution of imports against the generated tree and the standard library, and a
+    pyflakes lint when pyflakes is installed.
+    """
+
+    @staticmethod
+    def check(code, file_path, project_root='./src', project_files=(), lint=True):
+        """
+        Checks code that will be saved as file_path. `project_files` are paths relative to
+        project_root that belong to the project but may not be written yet.
+        """
+        result = StaticGateResult(file_path)
+
+        try:
+            tree = ast.parse(code, filename=file_path)
+            compile(tree, file_path, 'exec')
+        except SyntaxError as e:
+            result.errors.append(StaticGate._describe_syntax_error(e))
+            return result
+
+        errors, warnings = StaticGate._unresolved_imports(tree, file_path, project_root, project_files)
+        result.errors.extend(errors)
+        result.warnings.extend(warnings)
+
+        if lint and PYFLAKES_AVAILABLE:
+            errors, warnings = StaticGate._lint(tree, file_path)
+            result.errors.extend(errors)
+            result.warnings.extend(warnings)
+
+        return result
+
+    @staticmethod
+    def _describe_syntax_error(error):
+        location = f"line {error.lineno}" + (f", column {error.offset}" if error.offset else "")
+        source = f": {error.text.strip()}" if error.text else ""
+        return f"{location}: {type(error).__name__}: {error.msg}{source}"
+
+    @staticmethod
+    def _guarded_imports(tree):
+        """
+        Import nodes inside try blocks that handle ImportError, which are allowed to fail.
+        """
+        guarded = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Try):
+                continue
+            handled = set()
+            for handler in node.handlers:
+                if handler.type is None:
+                    handled.add('ImportError')
+                for name in ast.walk(handler.type) if handler.type is not None else ():
+                    if isinstance(name, ast.Name):
+                        handled.add(name.id)
+            if handled & {'ImportError', 'ModuleNotFoundError', 'Exception', 'BaseException'}:
+                for statement in node.body:
+                    guarded.update(id(child) for child in ast.walk(statement)
+                                   if isinstance(child, (ast.Import, ast.ImportFrom)))
+        return guarded
+
+    @staticmethod
+    def _unresolved_imports(tree, file_path, project_root, project_files):
+        """
+        Returns (errors, warnings) for the imports of the tree, one finding per module.
+        Imports are resolved against the generated tree and the standard library only: a
+        missing project module is an error, while any other module is taken to be a
+        third-party dependency, which the environment running the gate need not have installed.
+        """
+        guarded = StaticGate._guarded_imports(tree)
+        search_paths = [os.path.abspath(project_root), os.path.abspath(os.path.dirname(file_path))]
+        known_files = {os.path.normpath(os.path.join(os.path.abspath(project_root), path)) for path in project_files}
+
+        errors, warnings, reported = [], [], set()
+        for node in sorted(ast.walk(tree), key=lambda child: getattr(child, 'lineno', 0)):
+            if id(node) in guarded:
+                continue
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = os.path.abspath(os.path.dirname(file_path))
+                    for _ in range(node.level - 1):
+                        base = os.path.dirname(base)
+                    module = node.module or ""
+                    name = f"{'.' * node.level}{module}"
+                    if module and name not in reported and not StaticGate._exists_in([base], module, known_files):
+                        reported.add(name)
+                        errors.append(f"line {node.lineno}: unresolved relative import '{name}'")
+                    continue
+                modules = [node.module]
+            else:
+                continue
+
+            for module in modules:
+                if module in reported or StaticGate._is_stdlib(module) or \
+                        StaticGate._exists_in(search_paths, module, known_files):
+                    continue
+                reported.add(module)
+                if StaticGate._exists_in(search_paths, module.split('.')[0], known_files):
+                    errors.append(f"line {node.lineno}: cannot resolve import '{module}' in the project")
+                else:
+                    warnings.append(f"line {node.lineno}: '{module}' is not part of the project or the "
+                                    f"standard library; it must be declared as a dependency")
+        return errors, warnings
+
+    @staticmethod
+    def _is_stdlib(module):
+        top_level = module.split('.')[0]
+        return top_level in sys.builtin_module_names or top_level in getattr(sys, 'stdlib_module_names', ())
+
+    @staticmethod
+    def _exists_in(search_paths, module, known_files):
+        """
+        True when module is a file or package under one of the search paths, on disk or among the known files.
+        """
+        relative = module.replace('.', os.sep)
+        for base in search_paths:
+            for candidate in (os.path.join(base, relative + '.py'), os.path.join(base, relative)):
+                candidate = os.path.normpath(candidate)
+                if os.path.exists(candidate) or candidate in known_files:
+                    return True
+                if any(path.startswith(candidate + os.sep) for path in known_files):
+                    return True
+        return False
+
+    @staticmethod
+    def _lint(tree, file_path):
+        errors, warnings = [], []
+        for message in pyflakes_checker.Checker(tree, filename=file_path).messages:
+            text = f"line {message.lineno}: {message.message % message.message_args}"
+            if type(message).__name__ in _PYFLAKES_ERRORS:
+                errors.append(text)
+            else:
+                warnings.append(text)
+        return errors, warnings
@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import copy
+import logging
+import os
+import threading
+
+try:
+    from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+    STREAMING_AVAILABLE = True
+except ImportError:  # Older crewai releases have no event bus
+    STREAMING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Agents answer in the ReAct format; only the text after this marker belongs in the output file
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+_active_stream = contextvars.ContextVar('active_stream', default=None)
+_install_lock = threading.Lock()
+_handlers_installed = False
+
+
+class StageStream:
+    """
+    Writes the final answer of a streaming LLM response to a stage's output file
+    as tokens arrive, and reports progress through an optional callback.
+    """
+
+    def __init__(self, stage, output_file=None, progress_callback=None):
+        self.stage = stage
+        self.output_file = output_file
+        self.progress_callback = progress_callback
+        self.chars_written = 0
+        self._buffer = ""
+        self._file = None
+        self._answer_started = False
+
+    def reset(self):
+        """
+        Starts a new LLM call. Anything streamed by a previous call of the same stage is discarded.
+        """
+        self._buffer = ""
+        self._answer_started = False
+        self.chars_written = 0
+        if self._file:
+            self._file.seek(0)
+            self._file.truncate()
+
+    def feed(self, chunk):
+        """
+        Handles one streamed chunk of the LLM response.
+        """
+        if not self._answer_started:
+            self._buffer += chunk
+            index = self._buffer.find(FINAL_ANSWER_MARKER)
+            if index == -1:
+                return
+            chunk = self._buffer[index + len(FINAL_ANSWER_MARKER):].lstrip()
+            self._buffer = ""
+            self._answer_started = True
+
+        if self.output_file:
+            if self._file is None:
+                directory = os.path.dirname(self.output_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.output_file, 'w')
+            self._file.write(chunk)
+            self._file.flush()
+
+        self.chars_written += len(chunk)
+        if self.progress_callback:
+            self.progress_callback(self.stage, 'progress', self.chars_written)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def _on_call_started(source, event):
+    stream = _active_stream.get()
+    if stream is not None:
+        stream.reset()
+
+
+def _on_stream_chunk(source, event):
+    stream = _active_stream.get()
+    if stream is not None and event.chunk:
+        stream.feed(event.chunk)
+
+
+def install_handlers():
+    """
+    Registers the stream handlers on the crewai event bus once per process.
+    Returns False when this crewai version cannot stream.
+    """
+    global _handlers_installed
+    if not STREAMING_AVAILABLE:
+        return False
+    with _install_lock:
+        if not _handlers_installed:
+            crewai_event_bus.register_handler(LLMCallStartedEvent, _on_call_started)
+            crewai_event_bus.register_handler(LLMStreamChunkEvent, _on_stream_chunk)
+            _handlers_installed = True
+    return True
+
+
+def enable_streaming(agent):
+    """
+    Returns a copy of an agent whose LLM streams its responses. The agent and its LLM,
+    which other workflows may share, are left unchanged.
+    """
+    llm = getattr(agent, 'llm', None)
+    if llm is None or not hasattr(llm, 'stream'):
+        return agent
+    streaming_llm = copy.copy(llm)
+    streaming_llm.stream = True
+    streaming_agent = agent.copy()
+    streaming_agent.llm = streaming_llm
+    return streaming_agent
+
+
+@contextlib.contextmanager
+def stream_stage(stage, output_file=None, progress_callback=None):
+    """
+    Routes streamed chunks emitted in the current context to the stage's output file.
+
+    The crewai event bus calls handlers in the emitting thread, so concurrent stages
+    running in separate threads each see their own active stream.
+    """
+    stream = StageStream(stage, output_file, progress_callback)
+    token = _active_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _active_stream.reset(token)
+        stream.close()
@@ -0,0 +1,246 @@
+import ast
+import os
+
+
+class TestReconciler:
+    """
+    Finds the tests of a Python suite that no longer match the implementation, so that only
+    those are updated instead of regenerating the suite.
+
+    A test is stale when it imports a name the implementation does not define, calls one of
+    the implementation's functions, classes or methods with arguments its signature does not
+    accept, or uses an interface whose signature changed since a previous version of the code.
+    """
+
+    # Keeps pytest from collecting this class when it is imported into a test module
+    __test__ = False
+
+    # Replaces function bodies in the code shown to the TestAgent
+    BODY_MARKER = "...  # body omitted"
+
+    @staticmethod
+    def _parse(code):
+        try:
+            return ast.parse(code or "")
+        except SyntaxError:
+            return None
+
+    @staticmethod
+    def _signature(function, bound):
+        """
+        (required positional, maximum positional or None, keyword names or None, required keyword-only)
+        of a function; None entries accept anything. `bound` drops the self/cls parameter.
+        """
+        arguments = function.args
+        positional = arguments.posonlyargs + arguments.args
+        bound_argument = positional[0] if bound and positional else None
+        if bound_argument is not None:
+            positional = positional[1:]
+        required = len(positional) - len(arguments.defaults)
+        maximum = None if arguments.vararg else len(positional)
+        keywords = None if arguments.kwarg else tuple(sorted(
+            [arg.arg for arg in arguments.args if arg is not bound_argument] +
+            [arg.arg for arg in arguments.kwonlyargs]
+        ))
+        keyword_required = sum(1 for default in arguments.kw_defaults if default is None)
+        return max(required, 0), maximum, keywords, keyword_required
+
+    @staticmethod
+    def interfaces(code):
+        """
+        The public interfaces of the code as {name: set of signatures}. Functions and classes
+        are keyed by name, methods by 'Class.method'. A class has its __init__ signature, or
+        None when it is unknown.
+        """
+        tree = TestReconciler._parse(code)
+        interfaces = {}
+        if tree is None:
+            return interfaces
+
+        def add(name, signature):
+            interfaces.setdefault(name, set()).add(signature)
+
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith('_'):
+                add(node.name, TestReconciler._signature(node, bound=False))
+            elif isinstance(node, ast.ClassDef) and not node.name.startswith('_'):
+                init = None
+                for item in node.body:
+                    if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        continue
+                    static = any(isinstance(d, ast.Name) and d.id == 'staticmethod' for d in item.decorator_list)
+                    signature = TestReconciler._signature(item, bound=not static)
+                    if item.name == '__init__':
+                        init = signature
+                    elif not item.name.startswith('_'):
+                        add(f"{node.name}.{item.name}", signature)
+                # Inherited constructors and class decorators (e.g. dataclasses) are not followed
+                if init is None and (node.bases or node.decorator_list):
+                    add(node.name, None)
+                else:
+                    add(node.name, init or (0, 0, (), 0))
+        return interfaces
+
+    @staticmethod
+    def defined_names(code):
+        """
+        Every top-level name of the code, public or not, that a test module can import.
+        """
+        tree = TestReconciler._parse(code)
+        names = set()
+        for node in tree.body if tree else []:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(node.name)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names.update(n.id for target in targets for n in ast.walk(target) if isinstance(n, ast.Name))
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                names.update((alias.asname or alias.name).split('.')[0] for alias in node.names)
+        return names
+
+    @staticmethod
+    def _accepts(signature, call):
+        if signature is None:
+            return True
+        required, maximum, keywords, keyword_required = signature
+        if any(isinstance(arg, ast.Starred) for arg in call.args) or any(k.arg is None for k in call.keywords):
+            return True
+        given = [k.arg for k in call.keywords]
+        if keywords is not None and any(name not in keywords for name in given):
+            return False
+        positional = len(call.args)
+        if maximum is not None and positional > maximum:
+            return False
+        return positional + len(given) >= required + keyword_required
+
+    @staticmethod
+    def _tests(tree):
+        """
+        Yields (name, node) for the test functions of a module, including those of Test classes.
+        """
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('test'):
+                yield node.name, node
+            elif isinstance(node, ast.ClassDef) and node.name.startswith('Test'):
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith('test'):
+                        yield f"{node.name}.{item.name}", item
+
+    @staticmethod
+    def _module_bindings(tree, module):
+        """
+        How the test module refers to the implementation module: {local name: implementation
+        name} for the names imported from it, and the local names of the module itself.
+        """
+        names, modules = {}, set()
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[-1] == module:
+                names.update({alias.asname or alias.name: alias.name for alias in node.names if alias.name != '*'})
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name.split('.')[-1] == module:
+                        # `import pkg.module` is used as pkg.module, which the receiver check resolves
+                        modules.add(alias.asname or alias.name)
+        return names, modules
+
+    @staticmethod
+    def stale_tests(code, test_code, implementation_file, previous_code=None):
+        """
+        Returns {test name: [reasons]} for the tests that do not match the code, plus an
+        '(imports)' entry for names imported from the implementation that it does not define.
+        Only uses of the implementation are checked: names imported from it, attributes of
+        the module, and methods called on its classes or on instances constructed from them
+        (in the test, in a Test class attribute or in a fixture). Tests that do not parse
+        cannot be analyzed and give an empty result.
+        """
+        tree = TestReconciler._parse(test_code)
+        code_tree = TestReconciler._parse(code)
+        if tree is None or code_tree is None:
+            return {}
+
+        current = TestReconciler.interfaces(code)
+        changed = set()
+        if previous_code is not None:
+            previous = TestReconciler.interfaces(previous_code)
+            changed = {name for name in set(previous) | set(current) if previous.get(name) != current.get(name)}
+
+        module = os.path.splitext(os.path.basename(implementation_file))[0]
+        imported, modules = TestReconciler._module_bindings(tree, module)
+        missing = set(imported.values()) - TestReconciler.defined_names(code)
+        classes = {node.name for node in code_tree.body if isinstance(node, ast.ClassDef)}
+
+        def module_reference(node):
+            return ast.unparse(node) in modules if isinstance(node, (ast.Name, ast.Attribute)) else False
+
+        def class_reference(node):
+            """
+            The implementation class node refers to, e.g. `Calculator` or `calc.Calculator`.
+            """
+            if isinstance(node, ast.Name) and imported.get(node.id) in classes:
+                return imported[node.id]
+            if isinstance(node, ast.Attribute) and node.attr in classes and module_reference(node.value):
+                return node.attr
+            return None
+
+        # Names, `self.` attributes and fixtures bound to instances of implementation classes
+        instances = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+                cls = class_reference(node.value.func)
+                for target in node.targets if cls else ():
+                    if isinstance(target, (ast.Name, ast.Attribute)):
+                        instances[ast.unparse(target)] = cls
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for child in ast.walk(node):
+                    if isinstance(child, (ast.Return, ast.Yield)) and isinstance(child.value, ast.Call):
+                        cls = class_reference(child.value.func)
+                        if cls:
+                            instances.setdefault(node.name, cls)
+
+        def receiver_class(node):
+            if isinstance(node, ast.Call):
+                return class_reference(node.func)
+            if isinstance(node, (ast.Name, ast.Attribute)):
+                return class_reference(node) or instances.get(ast.unparse(node))
+            return None
+
+        def interface_name(node):
+            """
+            The implementation interface a Name or Attribute node refers to, or None.
+            """
+            if isinstance(node, ast.Name):
+                return imported.get(node.id)
+            if isinstance(node, ast.Attribute):
+                if module_reference(node.value):
+                    return node.attr
+                cls = receiver_class(node.value)
+                if cls:
+                    return f"{cls}.{node.attr}"
+            return None
+
+        stale = {}
+        if missing:
+            stale['(imports)'] = [f"imports {name}, which {implementation_file} does not define" for name in sorted(missing)]
+
+        for test, node in TestReconciler._tests(tree):
+            reasons = []
+            for child in ast.walk(node):
+                name = interface_name(child)
+                if name in missing and f"uses {name}, which does not exist" not in reasons:
+                    reasons.append(f"uses {name}, which does not exist")
+                elif name in changed and f"uses {name}, whose signature changed" not in reasons:
+                    reasons.append(f"uses {name}, whose signature changed")
+                # Methods called on the class itself may take the instance explicitly
+                if isinstance(child, ast.Call) and not (isinstance(child.func, ast.Attribute) and
+                                                        class_reference(child.func.value)):
+                    callee = interface_name(child.func)
+                    signatures = current.get(callee)
+                    if signatures and not any(TestReconciler._accepts(s, child) for s in signatures):
+                        reasons.append(f"line {child.lineno}: calls {callee} with arguments its signature does not accept")
+            if reasons:
+                stale[test] = reasons
+        return stale
+
+    @staticmethod
+    def describe(stale):
+        return "\n".join(f"- {test}: {'; '.join(reasons)}" for test, reasons in stale.items())
@@ -0,0 +1,129 @@
+import contextlib
+import contextvars
+import logging
+import os
+import shutil
+import tempfile
+
+_active_workspace = contextvars.ContextVar('active_workspace', default=None)
+
+
+def current_workspace():
+    """
+    Returns the Workspace of the workflow running in the current context, or None.
+    """
+    return _active_workspace.get()
+
+
+class _WorkspaceFilter(logging.Filter):
+    """
+    Passes only the records logged while the given workspace is active.
+    """
+
+    def __init__(self, workspace):
+        super().__init__()
+        self.workspace = workspace
+
+    def filter(self, record):
+        return _active_workspace.get() is self.workspace
+
+
+class Workspace:
+    """
+    Private scratch directory of one generation run.
+
+    Crew output files, the run's log and the test failure log are written under the
+    workspace instead of the shared ./src, so several runs can share a checkout.
+    Paths stay relative to the working directory because crewai rejects absolute output files.
+    """
+
+    BASE_DIR = ".workspaces"
+    LOG_FILE = "generation.log"
+    TEST_LOG_FILE = "testing_agent_output.txt"
+
+    def __init__(self, root):
+        self.root = root
+        # Plays the role of ./src: manifest paths are relative to it
+        self.src_dir = os.path.join(root, "src")
+        os.makedirs(self.src_dir, exist_ok=True)
+
+    @classmethod
+    def create(cls, base_dir=None):
+        base_dir = base_dir or Workspace.BASE_DIR
+        os.makedirs(base_dir, exist_ok=True)
+        root = tempfile.mkdtemp(prefix="run_", dir=base_dir)
+        if not os.path.isabs(root):
+            root = "./" + os.path.normpath(root)
+        return cls(root)
+
+    @property
+    def log_file(self):
+        return os.path.join(self.root, Workspace.LOG_FILE)
+
+    @property
+    def test_log_file(self):
+        return os.path.join(self.root, Workspace.TEST_LOG_FILE)
+
+    def path(self, relative_path):
+        """
+        Location of a project-relative path (e.g. 'src/app.py') in the workspace.
+        """
+        return os.path.join(self.src_dir, os.path.normpath(relative_path))
+
+    def relative(self, path):
+        """
+        Project-relative form of a path in the workspace.
+        """
+        return os.path.relpath(path, self.src_dir)
+
+    def contains(self, path):
+        src_dir = os.path.abspath(self.src_dir)
+        return os.path.abspath(path) == src_dir or os.path.abspath(path).startswith(src_dir + os.sep)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Makes this the current workspace within the block and sends the log records
+        of this run to the workspace log file.
+        """
+        token = _active_workspace.set(self)
+        handler = logging.FileHandler(self.log_file)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handler.addFilter(_WorkspaceFilter(self))
+        logging.getLogger().addHandler(handler)
+        try:
+            yield self
+        finally:
+            logging.getLogger().removeHandler(handler)
+            handler.close()
+            _active_workspace.reset(token)
+
+    def _append_logs(self, target_dir, previous_dir=None):
+        for log_file in (self.log_file, self.test_log_file):
+            name = os.path.basename(log_file)
+            sources = [path for path in (os.path.join(previous_dir, name) if previous_dir else None, log_file)
+                       if path and os.path.exists(path)]
+            if not sources:
+                continue
+            with open(os.path.join(target_dir, name), 'a') as target:
+                for path in sources:
+                    with open(path, 'r') as source:
+                        shutil.copyfileobj(source, target)
+
+    def stage_logs(self, staging_dir, project_dir=None):
+        """
+        Writes the run's logs into a project staged for publishing, after the logs of earlier
+        attempts kept in project_dir, so the project is complete when it is published.
+        Records logged after this point are not published.
+        """
+        previous_dir = project_dir if project_dir and os.path.isdir(project_dir) else None
+        self._append_logs(staging_dir, previous_dir)
+
+    def finish(self, project_dir=None, published=False):
+        """
+        Appends the run's logs to the project directory, if any and unless they were
+        published with the project, and removes the workspace.
+        """
+        if project_dir and os.path.isdir(project_dir) and not published:
+            self._append_logs(project_dir)
+        shutil.rmtree(self.root, ignore_errors=True)
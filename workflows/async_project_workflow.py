@@ -0,0 +1,124 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+
+from tools.run_python_tool import event_loop_runner
+from workflows.project_workflow import ProjectWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised in a generation's thread once the task awaiting it has been cancelled.
+    """
+
+
+class _EventLoopTestRunner:
+    """
+    Takes the place of the RunPythonGetOutput tool in the generation thread: test runs
+    are handed to the workflow's event loop and run there as asyncio subprocesses.
+    """
+
+    def __init__(self, workflow, tool):
+        self.workflow = workflow
+        self.tool = tool
+
+    def run_tests(self, file_path):
+        return self.workflow._run_on_loop(self.tool.run_tests_async, file_path)
+
+
+class AsyncProjectWorkflow(ProjectWorkflow):
+    """
+    ProjectWorkflow for asyncio callers.
+
+    `await execute_async()` runs the same stages as execute(): the stage graph and the
+    crew kickoffs run on a worker thread, while the subprocesses of the workflow's test runs
+    and of the agents' RunPythonGetOutput calls are asyncio subprocesses on the caller's
+    event loop. Many generations can be in flight in one process, but concurrency is still
+    bounded by threads: each generation holds its own thread, plus up to
+    `max_parallel_stages` stage threads while its crews run.
+
+    Cancelling the awaiting task kills the running subprocesses and stops the generation at
+    its next crew kickoff or tool call. A crew's LLM request in flight is not interrupted.
+    The workspace is removed as usual and the checkpoint journal is kept, so the generation
+    can be resumed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._cancelled = threading.Event()
+        # Tasks started on the event loop for the generation thread; only touched on the loop
+        self._loop_tasks = set()
+
+    async def execute_async(self, executor=None):
+        """
+        Generates the project and returns the generated files, like execute().
+        `executor` runs the generation thread. When omitted, the generation gets a thread of
+        its own, so the number of generations in flight is not capped by an executor's size.
+        """
+        self._loop = asyncio.get_running_loop()
+        own_executor = None
+        if executor is None:
+            executor = own_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                             thread_name_prefix="generation")
+        generation = self._loop.run_in_executor(executor, contextvars.copy_context().run, self._execute_in_thread)
+        try:
+            return await asyncio.shield(generation)
+        except asyncio.CancelledError:
+            logger.info(f"Generation cancelled; stopping {self.output_dir or 'the workflow'}")
+            self._cancelled.set()
+            tasks = list(self._loop_tasks)
+            for task in tasks:
+                task.cancel()
+            # Wait for test subprocesses to be killed and for the generation thread to
+            # unwind, so that its workspace is cleaned up
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(generation, return_exceptions=True)
+            raise
+        finally:
+            if own_executor is not None:
+                own_executor.shutdown(wait=False)
+
+    def _execute_in_thread(self):
+        # Tools called by the crews of this generation run their subprocesses on the event loop
+        with event_loop_runner(self._run_on_loop):
+            return self.execute()
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise GenerationCancelled("Generation was cancelled")
+
+    def _run_on_loop(self, coroutine_function, *args):
+        """
+        Runs a coroutine on the event loop from the generation thread and waits for its result.
+        The coroutine sees the thread's context variables, e.g. the active workspace and metrics.
+        """
+        self._check_cancelled()
+        context = contextvars.copy_context()
+
+        async def run():
+            task = context.run(asyncio.get_running_loop().create_task, coroutine_function(*args))
+            self._loop_tasks.add(task)
+            task.add_done_callback(self._loop_tasks.discard)
+            if self._cancelled.is_set():
+                # Cancelled while the run was being scheduled
+                task.cancel()
+            return await task
+
+        try:
+            return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+        except concurrent.futures.CancelledError:
+            raise GenerationCancelled("Generation was cancelled") from None
+
+    def _run_crew(self, agent, task, cacheable=True, stage=None):
+        self._check_cancelled()
+        return super()._run_crew(agent, task, cacheable=cacheable, stage=stage)
+
+    def _test_runner(self):
+        if self._loop is None:
+            return super()._test_runner()
+        return _EventLoopTestRunner(self, super()._test_runner())
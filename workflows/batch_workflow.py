@@ -0,0 +1,234 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from queue import Queue
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from utils.file_handler import FileHandler
+from utils.llm_cache import LLMCache
+from utils.llm_transport import get_shared_transport
+from utils.spec_similarity import SpecSimilarity
+from workflows.async_project_workflow import AsyncProjectWorkflow
+from workflows.project_workflow import ProjectWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWorkflow:
+    """
+    Generates many projects in one process.
+
+    A fixed pool of agent sets is created once and shared by all workflows; each
+    worker borrows a set for the duration of one specification, so at most
+    `workers` generations are in flight at any time.
+    """
+
+    def __init__(self, workers=1, output_dir="generated_projects", use_cache=True, pytest_workers=0,
+                 otel_file=None, fix_mode='patch', max_parallel_stages=4,
+                 trust_static_gate=False, warm_start_threshold=SpecSimilarity.DEFAULT_THRESHOLD,
+                 manifest_mode='auto', model_routing=None, speculative_tests=True):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.output_dir = output_dir
+        self.use_cache = use_cache
+        self.pytest_workers = pytest_workers
+        self.otel_file = otel_file
+        self.fix_mode = fix_mode
+        self.max_parallel_stages = max_parallel_stages
+        self.trust_static_gate = trust_static_gate
+        self.warm_start_threshold = warm_start_threshold
+        self.manifest_mode = manifest_mode
+        self.model_routing = model_routing
+        self.speculative_tests = speculative_tests
+        # One cache instance is shared by every workflow so its counters cover the whole batch
+        self.llm_cache = LLMCache() if use_cache else None
+        self._agent_pool = Queue()
+        self._results_lock = threading.Lock()
+
+    @staticmethod
+    def load_specs(path):
+        """
+        Loads specifications from a directory of .txt files or from a JSONL file.
+
+        JSONL lines may carry the specification under 'spec', 'specification' or
+        'body', and an identifier under 'id', 'request_id' or 'name'.
+        Returns a list of (spec_id, spec_text) tuples.
+        """
+        specs = []
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, name)
+                if name.endswith('.txt') and os.path.isfile(file_path):
+                    specs.append((name, FileHandler().read_specification(file_path)))
+        else:
+            with open(path, 'r') as file:
+                for line_number, line in enumerate(file, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    spec_id = entry.get('id') or entry.get('request_id') or entry.get('name') or f"line-{line_number}"
+                    spec = entry.get('spec') or entry.get('specification') or entry.get('body')
+                    if not spec:
+                        raise ValueError(f"{path}:{line_number} has no 'spec', 'specification' or 'body' field")
+                    if entry.get('title'):
+                        spec = f"{entry['title']}\n{spec}"
+                    specs.append((str(spec_id), spec))
+
+        if not specs:
+            raise ValueError(f"No specifications found in '{path}'")
+        return specs
+
+    def _create_workflow(self, spec_id, spec, agents, workflow_class=ProjectWorkflow):
+        return workflow_class(
+            spec,
+            agents=agents,
+            use_cache=self.use_cache,
+            llm_cache=self.llm_cache,
+            spec_source=spec_id,
+            otel_file=self.otel_file,
+            fix_mode=self.fix_mode,
+            max_parallel_stages=self.max_parallel_stages,
+            trust_static_gate=self.trust_static_gate,
+            warm_start_threshold=self.warm_start_threshold,
+            manifest_mode=self.manifest_mode,
+            model_routing=self.model_routing,
+            speculative_tests=self.speculative_tests
+        )
+
+    def _run_one(self, spec_id, spec, results_file):
+        """
+        Runs a single workflow with a borrowed agent set and records its result.
+        """
+        agents = self._agent_pool.get()
+        start = time.time()
+        result = {'id': spec_id, 'status': 'success', 'output_dir': None, 'error': None}
+        try:
+            workflow = self._create_workflow(spec_id, spec, agents)
+            generated_files = workflow.execute()
+            result['output_dir'] = workflow.output_dir
+            result['file_count'] = len(generated_files)
+            result['metrics'] = workflow.metrics.summary()
+        except Exception as e:
+            logger.error(f"Batch item '{spec_id}' failed: {str(e)}", exc_info=True)
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        finally:
+            self._agent_pool.put(agents)
+
+        return self._record_result(result, start, results_file)
+
+    def _record_result(self, result, start, results_file):
+        result['seconds'] = round(time.time() - start, 3)
+        with self._results_lock:
+            with open(results_file, 'a') as f:
+                f.write(json.dumps(result) + "\n")
+        return result
+
+    def _start_batch(self, specs):
+        """
+        Creates the batch directory and one agent set per worker slot.
+        Returns the start timestamp, the batch directory and the results file.
+        """
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        batch_dir = os.path.join(self.output_dir, f"batch_{timestamp}")
+        os.makedirs(batch_dir, exist_ok=True)
+
+        # Agents are created once per worker slot and reused for every specification
+        for _ in range(min(self.workers, len(specs))):
+            self._agent_pool.put(ProjectWorkflow.create_agents(pytest_workers=self.pytest_workers,
+                                                              routing=self.model_routing))
+
+        logger.info(f"Starting batch of {len(specs)} specifications with {self.workers} workers")
+        return timestamp, batch_dir, os.path.join(batch_dir, "results.jsonl")
+
+    def run(self, specs):
+        """
+        Runs all specifications with bounded concurrency and writes per-spec results
+        (results.jsonl) and a throughput/failure summary (summary.json) to a batch directory.
+        Returns the summary dict.
+        """
+        timestamp, batch_dir, results_file = self._start_batch(specs)
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(self._run_one, spec_id, spec, results_file) for spec_id, spec in specs]
+            results = [future.result() for future in futures]
+        return self._summarize(timestamp, batch_dir, results, time.time() - start)
+
+    def _summarize(self, timestamp, batch_dir, results, elapsed):
+        """
+        Writes summary.json to the batch directory and returns the summary.
+        """
+        failures = [r for r in results if r['status'] != 'success']
+        summary = {
+            'started_at': timestamp,
+            'total': len(results),
+            'succeeded': len(results) - len(failures),
+            'failed': len(failures),
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 3),
+            'specs_per_hour': round(len(results) / elapsed * 3600, 2) if elapsed > 0 else None,
+            'mean_seconds_per_spec': round(sum(r['seconds'] for r in results) / len(results), 3),
+            'failures': [{'id': r['id'], 'error': r['error']} for r in failures],
+            'llm_cache': self.llm_cache.stats() if self.llm_cache else None,
+            'llm_transport': get_shared_transport().stats(),
+        }
+        with open(os.path.join(batch_dir, "summary.json"), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        logger.info(f"Batch completed: {summary['succeeded']}/{summary['total']} succeeded in {elapsed:.1f}s")
+        return summary
+
+
+class AsyncBatchWorkflow(BatchWorkflow):
+    """
+    BatchWorkflow on asyncio: every specification is an AsyncProjectWorkflow task, and a
+    semaphore keeps at most `workers` generations in flight. Each generation still runs its
+    stages on threads of its own (see AsyncProjectWorkflow), so a batch uses up to
+    `workers` * (1 + `max_parallel_stages`) threads. Cancelling run_async() cancels the
+    generations still running; finished ones keep their lines in results.jsonl.
+    """
+
+    async def _run_one_async(self, spec_id, spec, results_file, semaphore):
+        """
+        Runs a single workflow once a slot is free and records its result.
+        """
+        async with semaphore:
+            agents = self._agent_pool.get_nowait()
+            start = time.time()
+            result = {'id': spec_id, 'status': 'success', 'output_dir': None, 'error': None}
+            try:
+                workflow = self._create_workflow(spec_id, spec, agents, workflow_class=AsyncProjectWorkflow)
+                generated_files = await workflow.execute_async()
+                result['output_dir'] = workflow.output_dir
+                result['file_count'] = len(generated_files)
+                result['metrics'] = workflow.metrics.summary()
+            except Exception as e:
+                logger.error(f"Batch item '{spec_id}' failed: {str(e)}", exc_info=True)
+                result['status'] = 'failed'
+                result['error'] = str(e)
+            finally:
+                self._agent_pool.put(agents)
+
+        return self._record_result(result, start, results_file)
+
+    async def run_async(self, specs):
+        """
+        Runs all specifications as concurrent tasks and returns the summary, like run().
+        """
+        timestamp, batch_dir, results_file = self._start_batch(specs)
+        semaphore = asyncio.Semaphore(self.workers)
+        start = time.time()
+        # Only the semaphore bounds the generations in flight; each starts its own thread
+        results = await asyncio.gather(*(
+            self._run_one_async(spec_id, spec, results_file, semaphore) for spec_id, spec in specs
+        ))
+        return self._summarize(timestamp, batch_dir, list(results), time.time() - start)
+
+    def run(self, specs):
+        return asyncio.run(self.run_async(specs))
@@ -10,12 +10,30 @@ from agents.review_agent import ReviewAgent
 from agents.manifest_agent import ManifestAgent
 from utils.project_validator import ProjectValidator
 from utils.file_handler import FileHandler
+from utils.llm_cache import LLMCache
+from utils.llm_transport import get_shared_transport
+from utils.context_budget import ContextBudget
+from utils.patch_applier import PatchApplier, PatchError
+from utils.json_extractor import JsonExtractor
+from utils.static_gate import StaticGate
+from utils.spec_similarity import SpecSimilarity
+from utils.stage_fingerprints import StageFingerprints
+from utils.test_reconciler import TestReconciler
+from utils.checkpoint_journal import CheckpointJournal
+from utils.stream_writer import install_handlers, enable_streaming, stream_stage
+from utils.model_routing import ModelRouting
+from utils.run_metrics import RunMetrics
+from utils.workspace import Workspace
 from agents.run_and_test_agent import RunAndTestAgent
 from tools.run_python_tool import RunPythonGetOutput
+from workflows.stage_scheduler import StageScheduler
+import contextlib
 import json
 import logging
+import sqlite3
 import sys
 import os
+import time
 
 ## We're working locally, so we turn off telemetry to 'telemetry.crewai.com`
 os.environ["OTEL_SDK_DISABLED"] = "true"
@@ -34,312 +52,341 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class ProjectWorkflow:
-    def __init__(self, project_spec):
+    def __init__(self, project_spec, max_parallel_stages=4, agents=None, use_cache=True, llm_cache=None,
+                 spec_source=None, previous_project_dir=None, stream=False, progress_callback=None,
+                 otel_file=None, context_budget=None, fix_mode='patch',
+                 trust_static_gate=False, resume_dir=None,
+                 warm_start_threshold=SpecSimilarity.DEFAULT_THRESHOLD, manifest_mode='auto',
+                 model_routing=None, speculative_tests=True, warm_start_dir=None):
         self.project_spec = project_spec
+        self.max_parallel_stages = max_parallel_stages
         self.validator = ProjectValidator()
         self.file_handler = FileHandler()
+        self.output_dir = None
+        self.spec_source = spec_source
+
+        # Per-stage latency, token and cost instrumentation, optionally exported as OTLP/JSON spans
+        self.metrics = RunMetrics()
+        self.otel_file = otel_file
+
+        # Stage fingerprints of a previous run let unchanged stages reuse its outputs
+        if previous_project_dir:
+            self.fingerprints = StageFingerprints.load(previous_project_dir)
+        else:
+            self.fingerprints = StageFingerprints()
+        self.implementation_spec = StageFingerprints.implementation_spec(project_spec)
+
+        # Completed stages and loop states are journaled in the project directory; resuming
+        # a failed run reuses the stages its journal recorded
+        self.resume_dir = resume_dir
+        self.journal = None
+        self.workspace = None
+        if resume_dir:
+            self.journal = CheckpointJournal(resume_dir)
+            if self.journal.run is None:
+                raise ValueError(f"No checkpoint journal found in '{resume_dir}'")
+            previous_stages = dict(self.fingerprints.previous_stages)
+            previous_stages.update(self.journal.stages)
+            self.fingerprints = StageFingerprints(previous_stages=previous_stages)
+
+        # Cache of LLM outputs keyed on role, prompt and model; a shared instance may be passed in
+        if use_cache and llm_cache is None:
+            llm_cache = LLMCache()
+        self.llm_cache = llm_cache if use_cache else None
+
+        # Token limits for the code and feedback put into review, fix and docs prompts
+        self.context_budget = context_budget or ContextBudget()
+
+        # 'patch': fixes come back as search/replace edits applied locally; 'rewrite': the whole file
+        if fix_mode not in ('patch', 'rewrite'):
+            raise ValueError(f"Unknown fix mode: {fix_mode}")
+        self.fix_mode = fix_mode
+
+        # Skip the LLM review for Python code that passes the local static checks
+        self.trust_static_gate = trust_static_gate
+
+        # 'auto': the manifest is built locally from the specification and the ManifestAgent
+        # is only asked when the local classification is unsure; 'local': never ask; 'llm': always ask
+        if manifest_mode not in ('auto', 'local', 'llm'):
+            raise ValueError(f"Unknown manifest mode: {manifest_mode}")
+        self.manifest_mode = manifest_mode
+
+        # Python tests are written from the IDL while the code is generated and reviewed; only
+        # the tests that no longer match the code are then updated
+        self.speculative_tests = speculative_tests
+
+        # A successful earlier run of a similar specification can seed the manifest, IDL and
+        # code, which are then only edited for the differences. None turns this off; it is
+        # also off for incremental runs, which reuse their previous run's stages instead.
+        self.warm_start_threshold = None if previous_project_dir else warm_start_threshold
+        # The warm-start run chosen when the generation started; a resumed run gets it from
+        # its journal and reuses it rather than searching again
+        self.warm_start_dir = warm_start_dir
+        self.warm_start = None
 
         # Verify OPENAI_API_KEY is set
         if not os.getenv('OPENAI_API_KEY'):
             raise ValueError("OPENAI_API_KEY environment variable is not set")
 
-        # Initialize agents
+        # Initialize agents, reusing a prebuilt set when one is provided (e.g. in batch mode)
+        if agents is None:
+            agents = ProjectWorkflow.create_agents(routing=model_routing)
+
+        # Streaming writes tokens to each stage's output file as they arrive. The agents, and
+        # their LLMs, may be shared with other workflows, so this workflow streams with copies.
+        self.progress_callback = progress_callback
+        self.stream = stream and install_handlers()
+        if stream and not self.stream:
+            logger.warning("This crewai version does not emit stream events; streaming is disabled")
+        if self.stream:
+            agents = {name: enable_streaming(agent) for name, agent in agents.items()}
+
+        self.manifest_agent = agents['manifest_agent']
+        self.idl_agent = agents['idl_agent']
+        self.code_agent = agents['code_agent']
+        self.run_agent = agents['run_agent']
+        self.test_agent = agents['test_agent']
+        self.docs_agent = agents['docs_agent']
+        self.fix_code_agent = agents['fix_code_agent']
+        self.run_and_test_agent = agents['run_and_test_agent']
+        self.review_agent = agents['review_agent']
+
+        # Agents routed to a stronger model take over once enough review or test rounds have failed
+        self.escalated_agents = {name: agents[f"{name}_escalated"] for name in ModelRouting.AGENTS
+                                 if f"{name}_escalated" in agents}
+        self.model_routing = model_routing
+        self.escalate_after = model_routing.escalate_after if model_routing else 1
+        self.failed_rounds = 0
+
+    @staticmethod
+    def create_agents(pytest_workers=0, llm=None, routing=None):
+        """
+        Creates the full set of agents used by the workflow.
+        `pytest_workers` > 0 runs generated tests in a pool of warm pytest workers.
+        `llm` overrides the default model of every agent (e.g. a stand-in LLM for benchmarks).
+        `routing` (a ModelRouting) gives each agent its own model; agents with an escalation
+        model get a second instance under '<name>_escalated'.
+        """
         logger.info("Initializing agents...")
-        self.manifest_agent = ManifestAgent.create()
-        self.idl_agent = IDLAgent.create()
-        self.code_agent = CodeAgent.create()
-        self.run_agent = RunAgent.create()
-        self.test_agent = TestAgent.create()
-        self.docs_agent = DocsAgent.create()
-        self.fix_code_agent = FixCodeAgent.create()
-        self.run_and_test_agent = RunAndTestAgent.create()
-        # New review agent
-        self.review_agent = ReviewAgent.create()
+        factories = {
+            'manifest_agent': ManifestAgent.create,
+            'idl_agent': IDLAgent.create,
+            'code_agent': CodeAgent.create,
+            'run_agent': RunAgent.create,
+            'test_agent': TestAgent.create,
+            'docs_agent': DocsAgent.create,
+            'fix_code_agent': FixCodeAgent.create,
+            'run_and_test_agent': lambda llm: RunAndTestAgent.create(pytest_workers=pytest_workers, llm=llm),
+            'review_agent': ReviewAgent.create,
+        }
+        if llm is None:
+            # Every agent and workflow in the process shares one pooled, rate-limited HTTP client
+            get_shared_transport()
+        if llm is not None or routing is None:
+            agents = {name: create(llm=llm) for name, create in factories.items()}
+        else:
+            logger.info(f"Model routing: {routing.describe()}")
+            agents = {name: create(llm=routing.llm(name)) for name, create in factories.items()}
+            for name, create in factories.items():
+                escalated_llm = routing.llm(name, escalated=True)
+                if escalated_llm is not None:
+                    agents[f"{name}_escalated"] = create(llm=escalated_llm)
         logger.info("Agents initialized successfully")
+        return agents
 
-    def execute_orig(self):
+    def execute(self):
         """
         Executes the complete project generation workflow with enhanced testing and iteration.
         """
-        try:
-            logger.info("Starting project generation workflow")
-            logger.info(f"Processing specification:\n{self.project_spec}")
-
-            # Validate initial specification
-            logger.info("Validating project specification")
-            self.validator.validate_specification(self.project_spec)
-
-            # Create tasks with proper dependencies
-            logger.info("Creating agent tasks")
-
-            # Create and execute manifest task first
-            manifest_task = ManifestAgent.create_task(self.manifest_agent, self.project_spec)
-            logger.info("Manifest task created")
-
-            # Execute manifest task separately to get file paths
-            manifest_crew = Crew(
-                agents=[self.manifest_agent],
-                tasks=[manifest_task],
-                verbose=True
-            )
-            manifest_result = manifest_crew.kickoff()
-            logger.info("Manifest task executed")
-
-            # Parse manifest output with proper error handling
-            try:
-                manifest_output = manifest_result[0] if isinstance(manifest_result, list) else manifest_result
-                print(f"---------------->manifest {manifest_output} <----------------")
-                if not manifest_output:
-                    raise ValueError("Manifest task returned no output")
-                manifest_data = json.loads(str(manifest_output))
-                logger.info(f"Manifest data: {manifest_data}")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Error parsing manifest output: {str(e)}")
-                manifest_data = {
-                    "implementation_file": "src/app.py",
-                    "test_file": "tests/test_app.py",
-                    "docs_file": "docs/README.md",
-                    "interface_file": "src/app.idl",
-                    "run_script": "build_and_run.sh",
-                }
-                logger.info(f"Using default manifest data: {manifest_data}")
-
-            # Extract file paths from manifest
-            implementation_file = manifest_data.get('implementation_file', 'src/app.py')
-            test_file = manifest_data.get('test_file', 'src/test_app.py')
-            docs_file = manifest_data.get('docs_file', 'src/README.md')
-            interface_file = manifest_data.get('interface_file', 'src/app.idl')
-            run_script_file = manifest_data.get('run_script', 'build_and_run.sh')
-
-            relative_project_directory = "./src"
-            implementation_file = relative_project_directory + '/' + implementation_file
-            test_file = relative_project_directory + '/' + test_file
-            docs_file = relative_project_directory + '/' + docs_file
-            interface_file = relative_project_directory + '/' + interface_file
-            run_script_file = relative_project_directory + '/' + run_script_file
-
-            logger.info(f"--------------------------------------------")
-            logger.info(f"implementation_file file: {implementation_file}")
-            logger.info(f"test_file file: {test_file}")
-            logger.info(f"docs_file file: {docs_file}")
-            logger.info(f"interface_file file: {interface_file}")
-            logger.info(f"run_script_file file: {run_script_file}")
-
-            # Create required directories
-            os.makedirs(os.path.dirname(implementation_file), exist_ok=True)
-            os.makedirs(os.path.dirname(test_file), exist_ok=True)
-            os.makedirs(os.path.dirname(docs_file), exist_ok=True)
-            os.makedirs(os.path.dirname(interface_file), exist_ok=True)
-            os.makedirs(os.path.dirname(run_script_file), exist_ok=True)
-
-            # IDL Task
-            idl_task = IDLAgent.create_task(
-                self.idl_agent,
-                self.project_spec,
-                output_file=interface_file
-            )
-            logger.info("IDL task created")
-
-            # Code Task
-            code_task = CodeAgent.create_task(
-                self.code_agent,
-                self.project_spec,
-                idl_task.output if hasattr(idl_task, "output") else "",
-                output_file=implementation_file
-            )
-            logger.info("Code task created")
-
-            # Run Task
-            run_task = RunAgent.create_task(
-                self.run_agent,
-                self.project_spec,
-                idl_task.output if hasattr(idl_task, 'output') else "",
-                output_file=run_script_file
-            )
-            logger.info("run task created")
+        self.metrics = RunMetrics()
 
-            # Test Task
-            test_task = TestAgent.create_task(
-                self.test_agent,
-                code_file=implementation_file,
-                code=code_task.output if hasattr(code_task, 'output') else "",
-                output_file=test_file
-            )
-            logger.info("Test task created")
-
-            # Documentation Task
-            docs_task = DocsAgent.create_task(
-                self.docs_agent,
-                f"""Project Documentation:
-                           Specification: {self.project_spec}
-                           Implementation: {code_task.output if hasattr(code_task, 'output') else ""}
-                           Testing: {test_task.output if hasattr(test_task, 'output') else ""}""",
-                output_file=docs_file
-            )
-            logger.info("Documentation task created")
-
-            max_iterations = 1
-            iteration = 0
-            final_generated_files = {}
-
-            while iteration < max_iterations:
-                iteration += 1
-                logger.info(f"Project Generation Iteration {iteration}")
-
-                # Create and execute crew tasks
-                crew = Crew(
-                    agents=[self.idl_agent, self.code_agent, self.test_agent, self.docs_agent, self.run_agent],
-                    tasks=[idl_task, code_task, test_task, docs_task, run_task],
-                    verbose=True
-                )
-
-                # After getting the crew results
-                results = crew.kickoff()
-                logger.info(f"results = {results}")
-                #debug: user_input = input("Enter something: ")  # Prompts user and stores input in variable
-
-                # Initial processing
-                generated_files = self._process_results(results)
-
-                # Store the code output immediately
-                if implementation_file not in generated_files:
-                    # Get the code from the results directly if possible
-                    code_output = next((r for r in results if isinstance(r, str) and 'def' in r), None)
-                    if code_output:
-                        generated_files[implementation_file] = code_output
-                        logger.info(f"Stored generated code in {implementation_file}")
-
-                ## Implement Reviews ##
-                # Introduce a review loop (i.e. iterative review until approved or a maximum iteration count)
-                max_review_iterations = 2
-                review_iteration = 0
-                review_approved = False
-
-                while review_iteration < max_review_iterations and not review_approved:
-                    # Execute the workflow and get results
-                    logger.info("Executing crew tasks")
-                    results = crew.kickoff()
-                    generated_files = self._process_results(results)
-                    logger.info("Crew tasks completed")
-
-                    # Before reviewing the code, add better error handling
-                    generated_code = generated_files.get(implementation_file)
-                    if not generated_code:
-                        logger.error(f"Failed to find generated code at path: {implementation_file}")
-                        logger.error(f"Available files: {list(generated_files.keys())}")
-                        generated_code = "" # Provide empty string as fallback
-
-                    # Create and execute the review task
-                    review_task = ReviewAgent.create_task(self.review_agent, generated_code)
-                    review_crew = Crew(
-                        agents=[self.review_agent],
-                        tasks=[review_task],
-                        verbose=True
-                    )
-                    review_result = review_crew.kickoff()
-                    review_output = self._extract_content(review_result)
-                    logger.info(f"Review output:\n{review_output}")
-
-                    if "Approved" in review_output:
-                        review_approved = True
-                        logger.info("Code review approved the generated code.")
-                    else:
-                        # If review suggests revisions, use the FixCodeAgent
-                        logger.info("Code review requested revisions. Fixing code...")
-
-                        # Before calling fix_code_agent
-                        logger.info(f"Code state before fix: {len(generated_code) if generated_code else 'empty'}")
-                        fix_code_task = FixCodeAgent.create_task(
-                            self.fix_code_agent,
-                            generated_code,  # The current code
-                            review_output,  # Review feedback
-                            implementation_file  # Where to save the fixed code
-                        )
-
-                        fix_code_crew = Crew(
-                            agents=[self.fix_code_agent],
-                            tasks=[fix_code_task],
-                            verbose=True
-                        )
-
-                        fix_results = fix_code_crew.kickoff()
-                        # Later when processing fixes
-                        generated_files = self._process_results(fix_results, generated_files)
-
-                        review_iteration += 1
-
-                if not review_approved:
-                    logger.warning(f"Maximum review iterations reached({review_iteration}). Proceeding with the last generated files.")
-
-                # Run tests with the RunAndTestAgent
-                if implementation_file.endswith('.py'):
-                    logger.info("Running execution and testing")
-                    run_and_test_task = RunAndTestAgent.create_task(
-                        self.run_and_test_agent,
-                        implementation_file,
-                        test_file,
-                        output_file=os.path.join(os.path.dirname(implementation_file), "execution_result.txt")
-                    )
-
-                    run_test_crew = Crew(
-                        agents=[self.run_and_test_agent],
-                        tasks=[run_and_test_task],
-                        verbose=True
-                    )
-                    run_test_result = run_test_crew.kickoff()
-
-                    # Analyze test results
-                    test_output = self._extract_content(run_test_result)
-
-                    # Check if tests passed
-                    if "ALL TESTS PASSED" in test_output:
-                        logger.info("Tests passed successfully!")
-                        break
-                    else:
-                        logger.info(f"Tests failed on iteration {iteration}. Regenerating...")
-
-                        # Analyze failure and update tasks
-
-                        fix_code_task = FixCodeAgent.create_task(
-                            self.fix_code_agent,
-                            generated_code,  # The current code
-                            test_output,  # Review feedback
-                            implementation_file  # Where to save the fixed code
-                        )
+        # Reserve the project directory up front so the checkpoint journal can live in it
+        if self.resume_dir:
+            self.output_dir = self.resume_dir
+            logger.info(f"Resuming generation in {self.output_dir} "
+                        f"({len(self.journal.stages)} stages already completed)")
+        else:
+            self.output_dir = self.file_handler.reserve_project_dir()
+            self.journal = CheckpointJournal(self.output_dir)
+
+        # A resumed run continues from the warm start its journal recorded, or from none
+        if self.warm_start_dir:
+            self.warm_start = self._load_warm_start(self.warm_start_dir)
+        elif not self.resume_dir:
+            self.warm_start = self._find_warm_start()
+            self.warm_start_dir = self.warm_start['project_dir'] if self.warm_start else None
+        self.journal.start(self.project_spec, self.spec_source, self.journal_options())
+
+        # Crew output files go to a private workspace rather than the shared ./src, so that
+        # several runs can go at once; its logs are kept in the project directory
+        self.workspace = Workspace.create()
+        try:
+            with self.metrics.activate(), self.workspace.activate():
+                return self._execute()
+        finally:
+            # A published project already holds the logs
+            self.workspace.finish(self.output_dir, published=self.journal.completed)
 
-                        fix_code_crew = Crew(
-                            agents=[self.fix_code_agent],
-                            tasks=[fix_code_task],
-                            verbose=True
-                        )
+    def journal_options(self):
+        """
+        Workflow options that affect stage outputs, recorded so a resumed run uses the same ones.
+        """
+        return {'fix_mode': self.fix_mode, 'trust_static_gate': self.trust_static_gate,
+                'manifest_mode': self.manifest_mode, 'speculative_tests': self.speculative_tests,
+                'warm_start_threshold': self.warm_start_threshold, 'warm_start_dir': self.warm_start_dir,
+                'model_routing': self.model_routing.to_dict() if self.model_routing else None}
 
-                        fix_results = fix_code_crew.kickoff()
+    def _find_warm_start(self):
+        """
+        Looks up the indexed run of the most similar specification that succeeded, is still on
+        disk and targets the same language. Returns its specification changes and stage
+        outputs, or None.
+        """
+        if self.warm_start_threshold is None:
+            return None
+        try:
+            match = self.file_handler.generation_index().most_similar(self.project_spec, self.warm_start_threshold)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not search the generation index for a warm start: {e}")
+            return None
+        if match is None:
+            return None
+
+        run, similarity = match
+        if ManifestAgent.determine_language(run['spec']) != ManifestAgent.determine_language(self.project_spec):
+            return None
+        return self._load_warm_start(run['project_dir'], run, similarity)
+
+    def _load_warm_start(self, project_dir, run=None, similarity=None):
+        """
+        Loads the specification changes and stage outputs of the run in project_dir, looking
+        the run up in the generation index unless given. Returns None when it is gone.
+        """
+        try:
+            run = run or self.file_handler.generation_index().query_dir(project_dir)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the warm-start run from the generation index: {e}")
+            return None
+        if run is None:
+            logger.warning(f"Warm-start run {project_dir} is no longer indexed; continuing without it")
+            return None
+        try:
+            stages = StageFingerprints.load(project_dir).previous_stages
+        except FileNotFoundError:
+            logger.warning(f"Warm-start run {project_dir} is no longer on disk; continuing without it")
+            return None
+
+        logger.info(f"Warm start from {project_dir}" +
+                    (f" (specification similarity {similarity:.2f})" if similarity is not None else ""))
+        return {
+            'project_dir': project_dir,
+            'similarity': similarity,
+            'stages': stages,
+            'spec_changes': SpecSimilarity.describe_changes(
+                StageFingerprints.implementation_spec(run['spec']), self.implementation_spec
+            ),
+        }
+
+    def _warm_output(self, stage):
+        """
+        Output of a stage in the warm-start run, or None.
+        """
+        if self.warm_start is None:
+            return None
+        return self.warm_start['stages'].get(stage, {}).get('output')
 
-                        # Update the generated code with the fixed version
-                        generated_code = self._extract_content(fix_results)
-                        generated_files[implementation_file] = generated_code
+    def _warm_code(self):
+        """
+        The final implementation of the warm-start run: after its test fixes, its review fixes,
+        or as first generated.
+        """
+        for stage in ('run_and_test', 'review'):
+            state = self._warm_output(stage)
+            if isinstance(state, dict) and state.get('code'):
+                return state['code']
+        return self._warm_output('code')
 
+    def _warm_stage(self, stage, previous_output, output_file, changes):
+        """
+        Runs a stage by editing the warm-start run's output for the given changes with the
+        FixCodeAgent (as a patch in patch mode). Without changes the output is reused as is.
+        The code and file stages run at the same time, so each uses its own copy of the agent.
+        """
+        def compute():
+            if not changes:
+                self._write_output_file(output_file, previous_output)
+                return previous_output
+            feedback = ("This file was written for a previous version of the project. Update it to the new "
+                        "version, changing only what the following differences require:\n" + changes)
+            return self._fix_code(previous_output, feedback, output_file, stage=stage, copy_agent=True)
+
+        return self._cached_stage(
+            stage,
+            ['warm start', StageFingerprints.agent_config(self.fix_code_agent), self.fix_mode, previous_output, changes],
+            compute,
+            output_file=output_file
+        )
+
+    def _manifest_stage(self, manifest_task):
+        """
+        Runs the manifest stage: a warm start keeps the file layout of the similar run; otherwise
+        the manifest is built locally unless the mode or a low classification confidence calls
+        for the ManifestAgent.
+        """
+        previous_manifest = self._warm_output('manifest')
+        if previous_manifest:
+            return self._warm_stage('manifest', previous_manifest, manifest_task.output_file, "")
 
-            # Final check
-            if iteration >= max_iterations:
-                logger.warning("Maximum iterations reached without successful test pass")
+        if self.manifest_mode != 'llm':
+            manifest, confidence = ManifestAgent.local_manifest(self.project_spec)
+            if self.manifest_mode == 'local' or confidence >= ManifestAgent.LOCAL_CONFIDENCE:
+                logger.info(f"Using the local {manifest['language']} manifest (confidence {confidence:.2f})")
 
-            final_generated_files = generated_files
+                def compute():
+                    output = json.dumps(manifest, indent=2)
+                    self._write_output_file(manifest_task.output_file, output)
+                    return output
 
-            # Process and save generated files
-            output_dir = self.file_handler.save_project_files(final_generated_files)
-            logger.info(f"Project generation completed. Output directory: {output_dir}")
+                return self._cached_stage('manifest', ['local manifest', self.project_spec], compute,
+                                          output_file=manifest_task.output_file)
+            logger.info(f"Local manifest confidence {confidence:.2f} is low; asking the ManifestAgent")
 
-            return final_generated_files
+        return self._run_stage('manifest', self.manifest_agent, manifest_task, [self.implementation_spec])
 
-        except Exception as e:
-            logger.error(f"Error in project generation: {str(e)}", exc_info=True)
-            raise
-
-    def execute(self):
+    def _parse_manifest(self, manifest_output, output_file):
         """
-        Executes the complete project generation workflow with enhanced testing and iteration.
+        Extracts the manifest from the stage output and validates it. An invalid manifest gets
+        one repair round with the ManifestAgent, given the error; if the repaired one is invalid
+        too, the local manifest is used. The manifest is written back to the output file as JSON.
         """
+        try:
+            manifest_data = self._load_manifest(manifest_output)
+        except ValueError as error:
+            logger.warning(f"Error parsing manifest output: {error}")
+            manifest_data = None
+            if manifest_output and manifest_output.strip():
+                repair_task = ManifestAgent.create_repair_task(self.manifest_agent, manifest_output, error, output_file)
+                repaired = self._run_stage('manifest_repair', self.manifest_agent, repair_task,
+                                           [manifest_output, str(error)])
+                try:
+                    manifest_data = self._load_manifest(repaired)
+                    logger.info("Manifest repaired")
+                except ValueError as repair_error:
+                    logger.error(f"Error parsing the repaired manifest: {repair_error}")
+            if manifest_data is None:
+                manifest_data = ManifestAgent.local_manifest(self.project_spec)[0]
+                logger.info(f"Using the local manifest data: {manifest_data}")
+
+        self._write_output_file(output_file, json.dumps(manifest_data, indent=2))
+        return manifest_data
+
+    @staticmethod
+    def _load_manifest(output):
+        manifest = JsonExtractor.extract(output)
+        ProjectValidator.validate_manifest(manifest)
+        return manifest
+
+    def _execute(self):
         try:
             logger.info("Starting project generation workflow")
             logger.info(f"Processing specification:\n{self.project_spec}")
@@ -352,36 +399,21 @@ class ProjectWorkflow:
             logger.info("Creating agent tasks")
 
             # Create and execute manifest task first
-            manifest_task = ManifestAgent.create_task(self.manifest_agent, self.project_spec)
+            manifest_task = ManifestAgent.create_task(
+                self.manifest_agent,
+                self.project_spec,
+                output_file=self.workspace.path('src/manifest.json')
+            )
             logger.info("Manifest task created")
 
             # Execute manifest task separately to get file paths
-            manifest_crew = Crew(
-                agents=[self.manifest_agent],
-                tasks=[manifest_task],
-                verbose=True
-            )
-            manifest_result = manifest_crew.kickoff()
+            manifest_output = self._manifest_stage(manifest_task)
             logger.info("Manifest task executed")
 
             # Parse manifest output with proper error handling
-            try:
-                manifest_output = manifest_result[0] if isinstance(manifest_result, list) else manifest_result
-                print(f"---------------->manifest {manifest_output} <----------------")
-                if not manifest_output:
-                    raise ValueError("Manifest task returned no output")
-                manifest_data = json.loads(str(manifest_output))
-                logger.info(f"Manifest data: {manifest_data}")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Error parsing manifest output: {str(e)}")
-                manifest_data = {
-                    "implementation_file": "src/app.py",
-                    "test_file": "tests/test_app.py",
-                    "docs_file": "docs/README.md",
-                    "interface_file": "src/app.idl",
-                    "run_script": "build_and_run.sh",
-                }
-                logger.info(f"Using default manifest data: {manifest_data}")
+            logger.debug(f"Manifest output: {manifest_output}")
+            manifest_data = self._parse_manifest(manifest_output, manifest_task.output_file)
+            logger.info(f"Manifest data: {manifest_data}")
 
             # Extract file paths from manifest
             implementation_file = manifest_data.get('implementation_file', 'src/app.py')
@@ -390,7 +422,7 @@ class ProjectWorkflow:
             interface_file = manifest_data.get('interface_file', 'src/app.idl')
             run_script_file = manifest_data.get('run_script', 'build_and_run.sh')
 
-            relative_project_directory = "./src"
+            relative_project_directory = self.workspace.src_dir
             implementation_file = relative_project_directory + '/' + implementation_file
             test_file = relative_project_directory + '/' + test_file
             docs_file = relative_project_directory + '/' + docs_file
@@ -420,216 +452,130 @@ class ProjectWorkflow:
             os.makedirs(os.path.dirname(interface_file), exist_ok=True)
             os.makedirs(os.path.dirname(run_script_file), exist_ok=True)
 
+            # Every other file in the manifest's file-mapping gets its own code task
+            project_files, mapped_files = self._mapped_files(manifest_data, relative_project_directory)
+            logger.info(f"Additional files from the file-mapping: {list(mapped_files)}")
+
             max_iterations = 1
             iteration = 0
             final_generated_files = {}
             current_generated_code = ""  # Track the current generated code
+            review_state, test_state = None, None
 
             while iteration < max_iterations:
                 iteration += 1
                 logger.info(f"Project Generation Iteration {iteration}")
 
-                # IDL Task
-                idl_task = IDLAgent.create_task(
-                    self.idl_agent,
-                    self.project_spec,
-                    output_file=interface_file
+                # Generation stages form a dependency graph rooted at the manifest:
+                # IDL -> {code -> {review, test -> docs}, run script}. Ready stages run concurrently.
+                # Speculative Python tests only need the IDL, so they overlap with code and review.
+                speculative_tests = self.speculative_tests and implementation_file.endswith('.py')
+                scheduler = StageScheduler(max_workers=self.max_parallel_stages)
+                scheduler.add_stage('idl', lambda inputs: self._idl_stage(interface_file))
+                scheduler.add_stage(
+                    'code',
+                    lambda inputs: self._code_stage(inputs['idl'], implementation_file, project_files),
+                    depends_on=['idl']
                 )
-                logger.info("IDL task created")
-
-                # Execute IDL task first to get the IDL output
-                idl_crew = Crew(
-                    agents=[self.idl_agent],
-                    tasks=[idl_task],
-                    verbose=True
+                # Mapped files only share the IDL as context, so they are generated concurrently
+                for file_path, description in mapped_files.items():
+                    scheduler.add_stage(
+                        self._file_stage_name(file_path),
+                        lambda inputs, file_path=file_path, description=description: self._file_stage(
+                            inputs['idl'], file_path, description, project_files
+                        ),
+                        depends_on=['idl']
+                    )
+                if speculative_tests:
+                    scheduler.add_stage(
+                        'test',
+                        lambda inputs: self._speculative_test_stage(inputs['idl'], implementation_file, test_file),
+                        depends_on=['idl']
+                    )
+                else:
+                    scheduler.add_stage(
+                        'test',
+                        lambda inputs: self._test_stage(inputs['code'], implementation_file, test_file),
+                        depends_on=['code']
+                    )
+                scheduler.add_stage(
+                    'run',
+                    lambda inputs: self._run_script_stage(inputs['idl'], run_script_file),
+                    depends_on=['idl']
                 )
-                idl_result = idl_crew.kickoff()
-                idl_output = self._extract_content(idl_result)
-
-                # Code Task
-                code_task = CodeAgent.create_task(
-                    self.code_agent,
-                    self.project_spec,
-                    str(idl_output),
-                    output_file=implementation_file
+                scheduler.add_stage(
+                    'docs',
+                    lambda inputs: self._docs_stage(inputs['code'], inputs['test'], docs_file),
+                    depends_on=['code', 'test']
                 )
-                logger.info("Code task created")
-
-                code_crew = Crew(
-                    agents=[self.code_agent],
-                    tasks=[code_task],
-                    verbose=True
+                # The review loop only needs the code, so it overlaps with test, docs and run script generation
+                scheduler.add_stage(
+                    'review',
+                    lambda inputs: self._review_stage(inputs['code'], implementation_file, project_files),
+                    depends_on=['code']
                 )
-                code_result = code_crew.kickoff()
-                current_generated_code = self._extract_content(code_result)
+                stage_results = scheduler.run()
+                self.metrics.record_queue_times(scheduler.queue_seconds)
+
+                idl_output = stage_results['idl']
+                current_generated_code = stage_results['code']
+                test_output = stage_results['test']
+                run_output = stage_results['run']
+                docs_output = stage_results['docs']
                 logger.info(f"Generated code length: {len(current_generated_code) if current_generated_code else 0}")
 
-                test_task = TestAgent.create_task(
-                    self.test_agent,
-                    code_file=implementation_file,
-                    code=current_generated_code,
-                    output_file=test_file
-                )
-                logger.info("Test task created")
-
-                # Execute test task
-                test_crew = Crew(
-                    agents=[self.test_agent],
-                    tasks=[test_task],
-                    verbose=True
-                )
-                test_result = test_crew.kickoff()
-                test_output = self._extract_content(test_result)
-
-                # Run Task
-                run_task = RunAgent.create_task(
-                    self.run_agent,
-                    self.project_spec,
-                    str(idl_output),
-                    output_file=run_script_file
-                )
-                logger.info("run task created")
-
-                # Execute run task
-                run_crew = Crew(
-                    agents=[self.run_agent],
-                    tasks=[run_task],
-                    verbose=True
-                )
-                run_result = run_crew.kickoff()
-                run_output = self._extract_content(run_result)
-
-                # Documentation Task
-                docs_task = DocsAgent.create_task(
-                    self.docs_agent,
-                    f"""Project Documentation:
-                               Specification: {self.project_spec}
-                               Implementation: {current_generated_code}
-                               Testing: {test_output}""",
-                    output_file=docs_file
-                )
-                logger.info("Documentation task created")
-
-                # Execute docs task
-                docs_crew = Crew(
-                    agents=[self.docs_agent],
-                    tasks=[docs_task],
-                    verbose=True
-                )
-                docs_result = docs_crew.kickoff()
-                docs_output = self._extract_content(docs_result)
                 # Combine all results
                 all_results = [idl_output, current_generated_code, test_output, docs_output, run_output]
 
                 # Process results with the correct file paths
                 generated_files = self._process_results(all_results, existing_files=None, file_paths=file_paths)
+                for file_path in mapped_files:
+                    file_output = self._extract_content(stage_results[self._file_stage_name(file_path)])
+                    if file_output:
+                        generated_files[file_path] = file_output
 
                 ## Implement Reviews ##
-                max_review_iterations = 2
-                review_iteration = 0
-                review_approved = False
-
-                while review_iteration < max_review_iterations and not review_approved:
-                    review_iteration += 1
-                    logger.info(f"Review iteration {review_iteration}")
-
-                    # Before reviewing the code, ensure we have the current code
-                    if not current_generated_code:
-                        logger.error("No generated code available for review")
-                        break
-
-                    # Create and execute the review task
-                    review_task = ReviewAgent.create_task(self.review_agent, current_generated_code)
-                    review_crew = Crew(
-                        agents=[self.review_agent],
-                        tasks=[review_task],
-                        verbose=True
-                    )
-                    review_result = review_crew.kickoff()
-                    review_output = self._extract_content(review_result)
-                    logger.info(f"Review output:\n{review_output}")
-
-                    if "Approved" in review_output:
-                        review_approved = True
-                        logger.info("Code review approved the generated code.")
-                    else:
-                        # If review suggests revisions, use the FixCodeAgent
-                        logger.info("Code review requested revisions. Fixing code...")
-                        logger.info(
-                            f"Code state before fix: {len(current_generated_code) if current_generated_code else 'empty'}")
-
-                        fix_code_task = FixCodeAgent.create_task(
-                            self.fix_code_agent,
-                            current_generated_code,  # Pass the current code
-                            review_output,  # Review feedback
-                            implementation_file  # Where to save the fixed code
-                        )
-
-                        fix_code_crew = Crew(
-                            agents=[self.fix_code_agent],
-                            tasks=[fix_code_task],
-                            verbose=True
-                        )
-
-                        fix_results = fix_code_crew.kickoff()
-                        # Update the current generated code with the fixed version
-                        current_generated_code =  self._extract_content(fix_results)
-
-                        # Update the generated files with the fixed code
-                        generated_files[implementation_file] = current_generated_code
-                        logger.info(
-                            f"Code fixed, new length: {len(current_generated_code) if current_generated_code else 'empty'}")
-
-                if not review_approved:
-                    logger.warning("Maximum review iterations reached. Proceeding with the last generated files.")
+                review_state = stage_results['review']
+                if review_state['code'] != current_generated_code:
+                    current_generated_code = review_state['code']
+                    generated_files[implementation_file] = current_generated_code
+                    self._write_output_file(implementation_file, current_generated_code)
 
                 # Run tests with the RunAndTestAgent
                 if implementation_file.endswith('.py'):
-                    logger.info("Running execution and testing")
-                    run_and_test_task = RunAndTestAgent.create_task(
-                        self.run_and_test_agent,
-                        implementation_file,
-                        test_file,
-                        output_file=os.path.join(os.path.dirname(implementation_file), "execution_result.txt")
+                    # Speculative tests were written against the IDL, the others against the code before review
+                    test_output = self._reconcile_tests(
+                        'test_reconcile', test_output, current_generated_code, implementation_file, test_file,
+                        previous_code=None if speculative_tests else stage_results['code']
                     )
-
-                    run_test_crew = Crew(
-                        agents=[self.run_and_test_agent],
-                        tasks=[run_and_test_task],
-                        verbose=True
+                    generated_files[test_file] = test_output
+
+                    test_state = self._cached_stage(
+                        'run_and_test',
+                        [
+                            StageFingerprints.agent_config(self.run_and_test_agent),
+                            StageFingerprints.agent_config(self.fix_code_agent),
+                            *self._escalation_configs(),
+                            self.fix_mode,
+                            current_generated_code,
+                            test_output,
+                        ],
+                        lambda: self._run_and_test_loop(current_generated_code, implementation_file, test_file, iteration)
                     )
-                    run_test_result = run_test_crew.kickoff()
-
-                    # Analyze test results
-                    test_output = self._extract_content(run_test_result)
+                    if test_state['code'] != current_generated_code:
+                        # Keep the saved tests in line with the fixed code
+                        test_output = self._reconcile_tests(
+                            'test_reconcile_fix', test_output, test_state['code'], implementation_file, test_file,
+                            previous_code=current_generated_code
+                        )
+                        generated_files[test_file] = test_output
+                        current_generated_code = test_state['code']
+                        generated_files[implementation_file] = current_generated_code
+                        self._write_output_file(implementation_file, current_generated_code)
 
-                    # Check if tests passed
-                    if "ALL TESTS PASSED" in test_output:
-                        logger.info("Tests passed successfully!")
+                    if test_state['passed']:
                         final_generated_files = generated_files
                         break
-                    else:
-                        logger.info(f"Tests failed on iteration {iteration}. Regenerating...")
-
-                        # Use FixCodeAgent to fix test failures
-                        fix_code_task = FixCodeAgent.create_task(
-                            self.fix_code_agent,
-                            current_generated_code,  # The current code
-                            test_output,  # Test failure feedback
-                            implementation_file  # Where to save the fixed code
-                        )
-
-                        fix_code_crew = Crew(
-                            agents=[self.fix_code_agent],
-                            tasks=[fix_code_task],
-                            verbose=True
-                        )
-
-                        fix_results = fix_code_crew.kickoff()
-
-                        # Update the current generated code with the fixed version
-                        current_generated_code = self._extract_content(fix_results)
-                        generated_files[implementation_file] = current_generated_code
 
                 final_generated_files = generated_files
 
@@ -639,15 +585,569 @@ class ProjectWorkflow:
                 final_generated_files = generated_files
 
             # Process and save generated files
-            output_dir = self.file_handler.save_project_files(final_generated_files)
-            logger.info(f"Project generation completed. Output directory: {output_dir}")
+            def write_run_files(staging_dir):
+                # Reports are staged with the project so they are published together
+                self.fingerprints.save(staging_dir, spec_source=self.spec_source)
+                self.metrics.write_reports(staging_dir)
+                self.workspace.stage_logs(staging_dir, self.output_dir)
+
+            self.metrics.finish()
+            self.output_dir = self.file_handler.save_project_files(
+                final_generated_files,
+                project_dir=self.output_dir,
+                src_directory=self.workspace.src_dir,
+                before_publish=write_run_files,
+                run_info=self._run_info(manifest_data, review_state, test_state)
+            )
+            if self.otel_file:
+                self.metrics.write_otel(self.otel_file)
+            self.journal.complete()
+            logger.info(f"Project generation completed. Output directory: {self.output_dir}")
+            if self.llm_cache:
+                logger.info(f"LLM cache stats: {self.llm_cache.stats()}")
 
             return final_generated_files
 
         except Exception as e:
             logger.error(f"Error in project generation: {str(e)}", exc_info=True)
+            logger.error(f"Completed stages are checkpointed; continue with: python main.py --resume {self.output_dir}")
             raise
 
+    def _run_info(self, manifest_data, review_state, test_state):
+        """
+        What the generation index records about this run.
+        """
+        summary = self.metrics.summary()
+        return {
+            'spec': self.project_spec,
+            'spec_source': self.spec_source,
+            'manifest': manifest_data,
+            'tests_passed': test_state['passed'] if test_state else None,
+            'tests': test_state['tests'] if test_state else None,
+            'review_approved': review_state['approved'] if review_state else None,
+            'review_iterations': review_state['iterations'] if review_state else None,
+            'test_fix_attempts': summary['stages'].get('test_fix', {}).get('calls', 0),
+            'metrics': summary,
+        }
+
+    def _run_crew(self, agent, task, cacheable=True, stage=None):
+        """
+        Executes a single-task crew and returns the extracted text output.
+        Outputs are served from and stored in the LLM cache when it is enabled.
+        """
+        stage = stage or agent.role
+        with self.metrics.crew_kickoff(stage, agent.role, LLMCache.model_params(agent).get('model')) as record:
+            cache_key = None
+            if self.llm_cache and cacheable:
+                cache_key = self.llm_cache.key_for(agent, task)
+                cached_output = self.llm_cache.get(cache_key)
+                if cached_output is not None:
+                    logger.info(f"LLM cache hit for '{agent.role}'")
+                    record['cache_hit'] = True
+                    self._write_output_file(getattr(task, 'output_file', None), cached_output)
+                    return cached_output
+
+            crew = Crew(
+                agents=[agent],
+                tasks=[task],
+                verbose=True
+            )
+            if self.stream:
+                streaming = stream_stage(stage, getattr(task, 'output_file', None), self.progress_callback)
+            else:
+                streaming = contextlib.nullcontext()
+            with streaming:
+                crew_output = crew.kickoff()
+            self.metrics.record_token_usage(record, crew_output)
+            output = self._extract_content(crew_output)
+
+        if cache_key and output:
+            self.llm_cache.put(cache_key, output, role=agent.role)
+        return output
+
+    def _run_stage(self, stage, agent, task, inputs, cacheable=True):
+        """
+        Runs a single-crew stage unless its inputs match the previous run.
+        The fingerprint covers the agent configuration, the task's expected output and the stage inputs.
+        """
+        return self._cached_stage(
+            stage,
+            [StageFingerprints.agent_config(agent), task.expected_output, inputs],
+            lambda: self._run_crew(agent, task, cacheable=cacheable, stage=stage),
+            output_file=getattr(task, 'output_file', None)
+        )
+
+    def _cached_stage(self, stage, inputs, compute, output_file=None):
+        """
+        Returns the previous run's output for a stage whose inputs are unchanged,
+        otherwise computes it. The stage fingerprint is recorded either way.
+        """
+        fingerprint = StageFingerprints.fingerprint(stage, inputs)
+        output = self.fingerprints.lookup(stage, fingerprint)
+        if output is not None:
+            logger.info(f"Stage '{stage}' inputs unchanged, reusing previous output")
+            self._write_output_file(output_file, output)
+            self.metrics.record_reuse(stage)
+            self._report_progress(stage, 'reused')
+        else:
+            self._report_progress(stage, 'started')
+            output = compute()
+            self._report_progress(stage, 'completed')
+        self.fingerprints.record(stage, fingerprint, output)
+        if self.journal and self.journal.stages.get(stage, {}).get('fingerprint') != fingerprint:
+            self.journal.record_stage(stage, fingerprint, output)
+        return output
+
+    def _loop_state(self, loop, input_code):
+        """
+        Returns the journaled state of a loop that was interrupted with the same input, or None.
+        """
+        state = self.journal.loop_state(loop, input_code) if self.journal else None
+        if state:
+            logger.info(f"Resuming the {loop} loop from its checkpoint: {list(state)}")
+        return state
+
+    def _checkpoint_loop(self, loop, input_code, state):
+        if self.journal:
+            self.journal.record_loop(loop, input_code, state)
+
+    def _report_progress(self, stage, event, detail=None):
+        """
+        Forwards a stage progress event to the progress callback, if any.
+        """
+        if self.progress_callback:
+            self.progress_callback(stage, event, detail)
+
+    def _review_stage(self, code, implementation_file, project_files=None):
+        """
+        Runs the review loop on the generated code unless it is unchanged since the previous run.
+        """
+        return self._cached_stage(
+            'review',
+            [
+                StageFingerprints.agent_config(self.review_agent),
+                StageFingerprints.agent_config(self.fix_code_agent),
+                *self._escalation_configs(),
+                self.fix_mode,
+                self.trust_static_gate,
+                project_files,
+                code,
+            ],
+            lambda: self._review_loop(code, implementation_file, project_files)
+        )
+
+    def _review_loop(self, code, implementation_file, project_files=None):
+        """
+        Reviews the code and applies fixes until it is approved or the iteration limit is reached.
+        Python code first goes through the static gate: code that fails it is fixed without
+        a review (at most max_static_fixes times per loop, outside the review iterations), and
+        code that passes it skips the review when the gate is trusted.
+        Returns the final code and the review verdict.
+        """
+        max_review_iterations = 2
+        # Gate fixes do not use up review iterations, but are capped on their own
+        max_static_fixes = 2
+        review_iteration = 0
+        static_fixes = 0
+        review_approved = False
+        reviewed_code = None
+
+        input_code = code
+        state = self._loop_state('review', input_code)
+        if state:
+            review_iteration, code, reviewed_code = state['iteration'], state['code'], state['reviewed_code']
+            static_fixes = state.get('static_fixes', 0)
+
+        while review_iteration < max_review_iterations and not review_approved:
+            review_iteration += 1
+            logger.info(f"Review iteration {review_iteration}")
+
+            # Before reviewing the code, ensure we have the current code
+            if not code:
+                logger.error("No generated code available for review")
+                break
+
+            gate = self._static_gate(code, implementation_file, project_files)
+            while gate is not None and not gate.passed and static_fixes < max_static_fixes:
+                static_fixes += 1
+                logger.info(f"Static gate failed, fixing before review ({static_fixes}/{max_static_fixes}):\n"
+                            f"{gate.report()}")
+                code = self._fix_code(code, gate.report(), implementation_file, stage='static_fix')
+                # The review of this iteration has not run yet
+                self._checkpoint_loop('review', input_code, {'iteration': review_iteration - 1, 'code': code,
+                                                             'reviewed_code': reviewed_code,
+                                                             'static_fixes': static_fixes})
+                gate = self._static_gate(code, implementation_file, project_files)
+            if gate is not None and not gate.passed:
+                logger.warning("Static gate still fails after the allowed fixes; leaving it to the review")
+            elif gate is not None and self.trust_static_gate:
+                logger.info("Static gate passed, skipping the LLM review")
+                review_approved = True
+                break
+
+            # Create and execute the review task. Over the budget, functions unchanged since the
+            # previous review are reduced to their signatures, which the task lists.
+            review_agent = self._agent('review_agent')
+            review_code = self.context_budget.compact_code('review', code, previous_code=reviewed_code)
+            review_task = ReviewAgent.create_task(
+                review_agent,
+                review_code,
+                output_file=self.workspace.path('report.txt'),
+                unchanged_functions=ContextBudget.collapsed_functions(review_code, ContextBudget.UNCHANGED_MARKER),
+                omitted_functions=ContextBudget.collapsed_functions(review_code, ContextBudget.OMITTED_MARKER)
+            )
+            reviewed_code = code
+            review_output = self._run_crew(review_agent, review_task, stage='review')
+            logger.info(f"Review output:\n{review_output}")
+
+            if "Approved" in review_output:
+                review_approved = True
+                logger.info("Code review approved the generated code.")
+            else:
+                # If review suggests revisions, use the FixCodeAgent
+                logger.info("Code review requested revisions. Fixing code...")
+                self._round_failed('review')
+                logger.info(f"Code state before fix: {len(code) if code else 'empty'}")
+
+                # Update the current generated code with the fixed version
+                code = self._fix_code(
+                    code,  # Pass the current code
+                    self.context_budget.compact_feedback(
+                        'review_fix', review_output, reserved=ContextBudget.count_tokens(code)
+                    ),  # Review feedback
+                    implementation_file,  # Where to save the fixed code
+                    stage='review_fix'
+                )
+                logger.info(f"Code fixed, new length: {len(code) if code else 'empty'}")
+                self._checkpoint_loop('review', input_code, {'iteration': review_iteration, 'code': code,
+                                                             'reviewed_code': reviewed_code,
+                                                             'static_fixes': static_fixes})
+
+        if not review_approved:
+            logger.warning("Maximum review iterations reached. Proceeding with the last generated files.")
+
+        return {'code': code, 'approved': review_approved, 'iterations': review_iteration}
+
+    def _run_and_test_loop(self, code, implementation_file, test_file, attempt=1):
+        """
+        Runs the tests of the code, and asks the FixCodeAgent for a fix when they fail.
+        The outcome is decided on the structured pytest result; the execution report is
+        written from it without an LLM round trip. Returns the resulting code and whether
+        the tests passed.
+        """
+        logger.info("Running execution and testing")
+        test_result = self._test_runner().run_tests(test_file)
+        logger.info(f"Test results: {test_result.summary()}")
+        self._write_output_file(
+            os.path.join(os.path.dirname(implementation_file), "execution_result.txt"),
+            test_result.summary() if test_result.success else test_result.failure_report()
+        )
+        if test_result.success:
+            logger.info("Tests passed successfully!")
+            return {'code': code, 'passed': True, 'tests': test_result.counts()}
+
+        RunAndTestAgent.log_test_failure(implementation_file, test_file, test_result, attempt,
+                                         log_file=self.workspace.test_log_file)
+        logger.info("Tests failed. Regenerating...")
+        self._round_failed('test')
+
+        # Use FixCodeAgent to fix test failures, passing only the failing tests' tracebacks
+        code = self._fix_code(
+            code,  # The current code
+            self.context_budget.compact_feedback(
+                'test_fix', test_result.failure_report(), reserved=ContextBudget.count_tokens(code)
+            ),  # Test failure feedback
+            implementation_file,  # Where to save the fixed code
+            stage='test_fix'
+        )
+        return {'code': code, 'passed': False, 'tests': test_result.counts()}
+
+    def _static_gate(self, code, implementation_file, project_files=None):
+        """
+        Runs the static gate on Python code. Returns None for other languages.
+        """
+        if not implementation_file.endswith('.py'):
+            return None
+        start = time.time()
+        result = StaticGate.check(code, implementation_file, project_root=self.workspace.src_dir,
+                                  project_files=project_files or ())
+        self.metrics.record_subprocess('static_gate', implementation_file, start, 0 if result.passed else 1)
+        return result
+
+    def _fix_code(self, code, feedback, implementation_file, stage, copy_agent=False):
+        """
+        Asks the FixCodeAgent to address the feedback and returns the fixed code.
+        In patch mode the agent only returns edits, which are applied to the current code;
+        a patch that does not apply falls back to a full rewrite of the file.
+        `copy_agent` uses a copy of the agent, for stages that run at the same time as others.
+        """
+        fix_code_agent = self._agent('fix_code_agent')
+        if copy_agent:
+            fix_code_agent = fix_code_agent.copy()
+        if self.fix_mode == 'patch' and code:
+            patch_task = FixCodeAgent.create_patch_task(
+                fix_code_agent, code, feedback, self.workspace.relative(implementation_file)
+            )
+            patch = self._run_crew(fix_code_agent, patch_task, stage=stage)
+            try:
+                fixed_code = PatchApplier.apply(code, patch, validate_python=implementation_file.endswith('.py'))
+            except PatchError as e:
+                logger.warning(f"Patch from '{stage}' could not be applied ({e}); falling back to a full rewrite")
+            else:
+                logger.info(f"Applied patch from '{stage}' ({len(patch)} chars) to {implementation_file}")
+                self._write_output_file(implementation_file, fixed_code)
+                return fixed_code
+
+        fix_code_task = FixCodeAgent.create_task(
+            fix_code_agent,
+            code,
+            feedback,
+            implementation_file
+        )
+        return self._run_crew(fix_code_agent, fix_code_task, stage=stage)
+
+    def _agent(self, name):
+        """
+        Returns the agent to use for `name`: its escalated instance once `escalate_after`
+        review or test rounds have failed, if it has one.
+        """
+        if self.failed_rounds >= self.escalate_after and name in self.escalated_agents:
+            return self.escalated_agents[name]
+        return getattr(self, name)
+
+    def _round_failed(self, kind):
+        self.failed_rounds += 1
+        if self.failed_rounds == self.escalate_after and self.escalated_agents:
+            logger.info(f"{self.failed_rounds} failed review or test rounds after this {kind} round; "
+                        f"escalating {sorted(self.escalated_agents)} to their stronger models")
+
+    def _escalation_configs(self):
+        """
+        Configurations of the escalated agents, part of the fingerprints of the stages that may use them.
+        """
+        return [StageFingerprints.agent_config(self.escalated_agents[name]) for name in sorted(self.escalated_agents)]
+
+    def _test_runner(self):
+        """
+        Returns the RunPythonGetOutput tool of the run-and-test agent.
+        """
+        for tool in self.run_and_test_agent.tools:
+            if isinstance(tool, RunPythonGetOutput):
+                return tool
+        return RunPythonGetOutput()
+
+    def _write_output_file(self, output_file, content):
+        """
+        Writes content to a stage's output file, as the crew would have done.
+        """
+        if not output_file:
+            return
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_file, 'w') as f:
+            f.write(content)
+
+    def _idl_stage(self, interface_file):
+        """
+        Generates the IDL specification for the project.
+        """
+        previous_idl = self._warm_output('idl')
+        if previous_idl:
+            return self._warm_stage('idl', previous_idl, interface_file, self.warm_start['spec_changes'])
+
+        idl_task = IDLAgent.create_task(
+            self.idl_agent,
+            self.project_spec,
+            output_file=interface_file
+        )
+        logger.info("IDL task created")
+        return self._run_stage('idl', self.idl_agent, idl_task, [self.implementation_spec])
+
+    def _code_stage(self, idl_output, implementation_file, project_files=None):
+        """
+        Generates the implementation from the specification and IDL.
+        """
+        previous_code = self._warm_code()
+        if previous_code:
+            return self._warm_stage('code', previous_code, implementation_file, self._warm_changes(idl_output))
+
+        code_task = CodeAgent.create_task(
+            self.code_agent,
+            self.project_spec,
+            str(idl_output),
+            output_file=implementation_file,
+            project_files=project_files
+        )
+        logger.info("Code task created")
+        return self._run_stage('code', self.code_agent, code_task,
+                               [self.implementation_spec, idl_output, project_files])
+
+    def _file_stage(self, idl_output, file_path, description, project_files):
+        """
+        Generates one additional file of the file-mapping. Each file uses its own copy
+        of the code agent so that several files can be generated at the same time.
+        """
+        stage = self._file_stage_name(file_path)
+        previous_file = self._warm_output(stage)
+        if previous_file:
+            return self._warm_stage(stage, previous_file, file_path, self._warm_changes(idl_output))
+
+        agent = self.code_agent.copy()
+        file_task = CodeAgent.create_file_task(
+            agent,
+            self.project_spec,
+            str(idl_output),
+            self.workspace.relative(file_path),
+            description,
+            project_files=project_files,
+            output_file=file_path
+        )
+        logger.info(f"Code task created for {file_path}")
+        return self._run_stage(stage, agent, file_task,
+                               [self.implementation_spec, idl_output, description, project_files])
+
+    def _warm_changes(self, idl_output):
+        """
+        Specification and IDL changes since the warm-start run, for editing its code.
+        """
+        idl_changes = SpecSimilarity.describe_changes(self._warm_output('idl') or "", str(idl_output), label="IDL")
+        return "\n".join(changes for changes in (self.warm_start['spec_changes'], idl_changes) if changes)
+
+    def _file_stage_name(self, file_path):
+        return f"file:{self.workspace.relative(file_path)}"
+
+    @staticmethod
+    def _mapped_files(manifest_data, project_directory):
+        """
+        Returns the manifest's file-mapping as {relative path: description}, and the entries
+        not produced by a fixed stage as {path in the project directory: description}.
+        Paths that are absolute or leave the project directory are ignored.
+        """
+        file_mapping = manifest_data.get('file-mapping')
+        if not isinstance(file_mapping, dict):
+            return {}, {}
+
+        fixed_files = {
+            os.path.normpath(str(manifest_data.get(key)))
+            for key in ('implementation_file', 'test_file', 'docs_file', 'interface_file', 'run_script',
+                        'review_file')
+            if manifest_data.get(key)
+        }
+        fixed_files.add(os.path.normpath('src/manifest.json'))
+
+        project_files, mapped_files = {}, {}
+        for path, description in file_mapping.items():
+            normalized = os.path.normpath(str(path).strip())
+            if os.path.isabs(normalized) or normalized.startswith('..') or normalized == '.':
+                logger.warning(f"Ignoring file-mapping entry outside the project: {path}")
+                continue
+            project_files[normalized] = str(description)
+            if normalized not in fixed_files:
+                mapped_files[os.path.join(project_directory, normalized)] = str(description)
+        return project_files, mapped_files
+
+    def _test_stage(self, code, implementation_file, test_file):
+        """
+        Generates the test suite for the generated implementation.
+        """
+        test_task = TestAgent.create_task(
+            self.test_agent,
+            code_file=self.workspace.relative(implementation_file),
+            code=code,
+            output_file=test_file
+        )
+        logger.info("Test task created")
+        return self._run_stage('test', self.test_agent, test_task, [code])
+
+    def _speculative_test_stage(self, idl_output, implementation_file, test_file):
+        """
+        Generates the test suite from the specification and IDL, concurrently with the code.
+        """
+        test_task = TestAgent.create_spec_task(
+            self.test_agent,
+            self.project_spec,
+            str(idl_output),
+            code_file=self.workspace.relative(implementation_file),
+            output_file=test_file
+        )
+        logger.info("Speculative test task created")
+        return self._run_stage('test', self.test_agent, test_task, [self.implementation_spec, idl_output])
+
+    def _reconcile_tests(self, stage, tests, code, implementation_file, test_file, previous_code=None):
+        """
+        Updates the tests that no longer match the code: the TestAgent returns edits for those
+        tests only, given the code's signatures. If the edits do not apply, the suite is
+        regenerated from the code. Returns the tests unchanged when none are stale.
+        """
+        code_file = self.workspace.relative(implementation_file)
+        stale = TestReconciler.stale_tests(code, tests, code_file, previous_code)
+        if not stale:
+            logger.info(f"Stage '{stage}': the tests match the code")
+            return tests
+        logger.info(f"Stage '{stage}': {len(stale)} stale tests\n{TestReconciler.describe(stale)}")
+
+        def compute():
+            reconcile_task = TestAgent.create_reconcile_task(
+                self.test_agent,
+                code_file,
+                ContextBudget.signatures(code, lambda name, source: True, TestReconciler.BODY_MARKER),
+                tests,
+                TestReconciler.describe(stale)
+            )
+            patch = self._run_crew(self.test_agent, reconcile_task, stage=stage)
+            try:
+                reconciled = PatchApplier.apply(tests, patch, validate_python=True)
+            except PatchError as e:
+                logger.warning(f"Test edits from '{stage}' could not be applied ({e}); regenerating the tests")
+                test_task = TestAgent.create_task(self.test_agent, code_file=code_file, code=code, output_file=test_file)
+                return self._run_crew(self.test_agent, test_task, stage=stage)
+            self._write_output_file(test_file, reconciled)
+            return reconciled
+
+        return self._cached_stage(
+            stage,
+            [StageFingerprints.agent_config(self.test_agent), code, tests, stale],
+            compute,
+            output_file=test_file
+        )
+
+    def _run_script_stage(self, idl_output, run_script_file):
+        """
+        Generates the build and run script. Only depends on the IDL output.
+        """
+        run_task = RunAgent.create_task(
+            self.run_agent,
+            self.project_spec,
+            str(idl_output),
+            output_file=run_script_file
+        )
+        logger.info("run task created")
+        return self._run_stage('run', self.run_agent, run_task, [self.implementation_spec, idl_output])
+
+    def _docs_stage(self, code, test_output, docs_file):
+        """
+        Generates the project documentation.
+        The implementation and tests are reduced to signatures and docstrings when they exceed the docs budget.
+        """
+        # The implementation gets at least half of the budget, the tests what is left
+        implementation = self.context_budget.compact_code(
+            'docs', code, reserved=ContextBudget.count_tokens(test_output) // 2
+        )
+        tests = self.context_budget.compact_code(
+            'docs', test_output, reserved=ContextBudget.count_tokens(implementation)
+        )
+        docs_task = DocsAgent.create_task(
+            self.docs_agent,
+            f"""Project Documentation:
+                       Specification: {self.project_spec}
+                       Implementation: {implementation}
+                       Testing: {tests}""",
+            output_file=docs_file
+        )
+        logger.info("Documentation task created")
+        return self._run_stage('docs', self.docs_agent, docs_task, [self.project_spec, code, test_output])
+
     def _process_results(self, results, existing_files=None, file_paths=None):
         """
         Process the results from the crew execution into file contents.
@@ -658,11 +1158,11 @@ class ProjectWorkflow:
             # Use provided file_paths or fall back to defaults
             if file_paths is None:
                 file_paths = {
-                    'implementation_file': './src/app.py',
-                    'test_file': './src/test_app.py',
-                    'docs_file': './src/README.md',
-                    'interface_file': './src/app.idl',
-                    'run_script': './src/build_and_run.sh'
+                    'implementation_file': self.workspace.path('app.py'),
+                    'test_file': self.workspace.path('test_app.py'),
+                    'docs_file': self.workspace.path('README.md'),
+                    'interface_file': self.workspace.path('app.idl'),
+                    'run_script': self.workspace.path('build_and_run.sh')
                 }
 
             # Extract content from results using the utility function
@@ -701,8 +1201,8 @@ class ProjectWorkflow:
                 logger.info(f"Processed run script to {file_paths['run_script']}")
 
             # Always add initialization files
-            generated_files['./src/src/__init__.py'] = '# Python package initialization'
-            generated_files['./src/tests/__init__.py'] = '# Python tests package initialization'
+            generated_files[self.workspace.path('src/__init__.py')] = '# Python package initialization'
+            generated_files[self.workspace.path('tests/__init__.py')] = '# Python tests package initialization'
 
             return generated_files
 
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageScheduler:
+    """
+    Runs workflow stages as a dependency graph.
+
+    Every stage whose dependencies have completed is submitted to a thread pool,
+    so independent stages (for example the run script and the code/test chain)
+    overlap instead of running strictly one after another.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.stages = {}
+        # Seconds each stage waited between becoming ready and starting on a worker
+        self.queue_seconds = {}
+
+    def add_stage(self, name, func, depends_on=()):
+        """
+        Registers a stage. `func` is called with a dict mapping each dependency
+        name to that dependency's result, and its return value becomes the
+        stage result.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered")
+        self.stages[name] = (func, tuple(depends_on))
+        return self
+
+    def _validate(self):
+        """
+        Ensures all dependencies exist and the graph has no cycles.
+        """
+        for name, (_, depends_on) in self.stages.items():
+            for dependency in depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name][1]:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def run(self):
+        """
+        Executes all stages and returns a dict of stage name -> result.
+        The first stage failure cancels stages that have not started yet and is re-raised.
+        """
+        self._validate()
+
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        try:
+            while pending or running:
+                ready = [name for name, (_, depends_on) in pending.items()
+                         if all(dependency in results for dependency in depends_on)]
+                for name in ready:
+                    func, depends_on = pending.pop(name)
+                    inputs = {dependency: results[dependency] for dependency in depends_on}
+                    logger.info(f"Starting stage '{name}'")
+                    # Run each stage in a copy of the caller's context so context variables propagate
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, self._run_stage, name, func, inputs, time.time())] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    logger.info(f"Stage '{name}' completed")
+        except Exception:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+        return results
+
+    def _run_stage(self, name, func, inputs, submitted_at):
+        self.queue_seconds[name] = time.time() - submitted_at
+        return func(inputs)